@@ -0,0 +1,485 @@
+# async_ingest.py
+# One asyncio event loop on one background thread ingests every scenario run.
+#
+# The GUIs used to start a thread per click that read a step1_demo subprocess
+# line by line, and the subprocess's stderr was a pipe nobody read, so a
+# chatty child could fill it and stall. IngestLoop runs each scenario with
+# asyncio.create_subprocess_exec (or on the warm worker_daemon, spoken to
+# over its authenticated socket), reads stdout and stderr of all of them concurrently, and
+# posts everything to a single callable, normally the post() of one
+# FrameRenderer queue:
+#   ("start", run_id, argv)
+#   ("events", run_id, [Event])     one batch per stdout chunk
+#   ("stderr", run_id, line)
+#   ("exit", run_id, returncode, trace path or None)
+# Twenty parallel runs cost the one loop thread plus one pipe pair each. On
+# Python < 3.12 the loop uses a pidfd child watcher, so reaping children
+# does not start a waiter thread per process either.
+#
+# RunDashboard is the Tk side: one card per run, side by side (status,
+# events, rate, last line, stderr tail, Cancel). It forwards the events of
+# the run in focus (the latest one, or a clicked card) to an ArrowFlowView.
+#
+#   python async_ingest.py --runs 20 -- --shm-race --increments 1000
+import argparse
+import asyncio
+import itertools
+import os
+import pickle
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+import ipc_events as ev
+from multiprocessing import AuthenticationError
+from worker_daemon import CHUNK, DEMO, HERE, connect, default_address
+
+STDERR_TAIL = 20  # stderr lines kept per run
+_MSG_LEN = struct.Struct("!i")  # multiprocessing.connection framing
+_MSG_LEN64 = struct.Struct("!Q")
+
+
+class _Run:
+    __slots__ = ("run_id", "argv", "proc", "writer", "task", "cancelled")
+
+    def __init__(self, run_id, argv):
+        self.run_id = run_id
+        self.argv = argv
+        self.proc = None     # asyncio subprocess, when run as a subprocess
+        self.writer = None   # StreamWriter to the worker daemon, when run there
+        self.task = None
+        self.cancelled = False
+
+
+class IngestLoop:
+    """Runs step1_demo scenarios concurrently on one asyncio thread; see module comment."""
+
+    def __init__(self, post, use_worker=True):
+        self.post = post
+        self.use_worker = use_worker
+        self._runs = {}
+        self._ids = itertools.count(1)
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._main, name="ipc-ingest", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _main(self):
+        asyncio.set_event_loop(self._loop)
+        if sys.version_info < (3, 12) and hasattr(os, "pidfd_open"):
+            # the default ThreadedChildWatcher waits for each child on its own thread
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(self._loop)
+            asyncio.set_child_watcher(watcher)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    # ---- any thread ------------------------------------------------------
+    def submit(self, argv, record=True, use_worker=None):
+        """Start `step1_demo.py <argv>`; returns its run id at once.
+
+        With record, the run is written to a fresh trace_file trace whose path
+        comes with its "exit" item.
+        """
+        run_id = next(self._ids)
+        use_worker = self.use_worker if use_worker is None else use_worker
+        self._loop.call_soon_threadsafe(self._start, run_id, list(argv), record, use_worker)
+        return run_id
+
+    def cancel(self, run_id):
+        self._loop.call_soon_threadsafe(self._cancel, run_id)
+
+    def active(self):
+        return len(self._runs)
+
+    def stop(self):
+        """Cancel every run and stop the loop thread."""
+        if not self._thread.is_alive():
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        fut.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    # ---- loop thread -----------------------------------------------------
+    def _start(self, run_id, argv, record, use_worker):
+        run = self._runs[run_id] = _Run(run_id, argv)
+        self.post(("start", run_id, argv))
+        run.task = self._loop.create_task(self._run(run, record, use_worker))
+
+    def _cancel(self, run_id):
+        run = self._runs.get(run_id)
+        if run is None or run.cancelled:
+            return
+        run.cancelled = True
+        if run.writer is not None:
+            run.writer.write(_frame(("cancel",)))
+        elif run.proc is not None and run.proc.returncode is None:
+            try:
+                os.killpg(run.proc.pid, signal.SIGTERM)  # the demo and everything it spawned
+            except ProcessLookupError:
+                pass
+
+    async def _shutdown(self):
+        for run_id in list(self._runs):
+            self._cancel(run_id)
+        tasks = [r.task for r in self._runs.values() if r.task is not None]
+        if tasks:
+            await asyncio.wait(tasks, timeout=5.0)
+
+    async def _run(self, run, record, use_worker):
+        writer = None
+        trace = None
+        returncode = None
+        try:
+            if record:
+                from trace_file import TraceWriter, new_trace_path
+                trace = new_trace_path(run.argv)
+                writer = TraceWriter(trace)
+            connection = None
+            if use_worker and sys.platform != "win32":
+                try:
+                    connection = await self._connect_worker(run)
+                except (OSError, EOFError, AuthenticationError):
+                    pass  # no worker (stale socket, unsafe run dir, wrong key): run a subprocess
+            if connection is not None:
+                returncode = await self._run_on_worker(run, connection, writer)
+            else:
+                returncode = await self._run_subprocess(run, writer)
+        except Exception as e:  # a broken run must not take the loop down
+            self.post(("stderr", run.run_id, f"{type(e).__name__}: {e}"))
+        finally:
+            if writer is not None:
+                writer.close()
+            del self._runs[run.run_id]
+            self.post(("exit", run.run_id, returncode, trace))
+
+    def _events(self, run, decoder, data, writer):
+        events = decoder.feed(data)
+        if events:
+            if writer is not None:
+                for event in events:
+                    writer.write(event)
+            self.post(("events", run.run_id, events))
+
+    async def _run_subprocess(self, run, writer):
+        run.proc = proc = await asyncio.create_subprocess_exec(
+            sys.executable, DEMO, *run.argv, cwd=HERE, start_new_session=True,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        if run.cancelled:
+            run.cancelled = False
+            self._cancel(run.run_id)
+
+        async def pump_stdout():
+            decoder = ev.EventDecoder()
+            while True:
+                chunk = await proc.stdout.read(CHUNK)
+                if not chunk:
+                    return
+                self._events(run, decoder, chunk, writer)
+
+        async def pump_stderr():
+            async for line in proc.stderr:
+                self.post(("stderr", run.run_id, line.decode("utf-8", "replace").rstrip()))
+
+        await asyncio.gather(pump_stdout(), pump_stderr())
+        return await proc.wait()
+
+    async def _connect_worker(self, run):
+        """Stream pair to the worker with the run already requested, or None if none runs.
+
+        The connect, the authkey challenge both ways and the ("run", argv)
+        request go through worker_daemon.connect() on a helper thread; only
+        then is the socket handed to asyncio, so nothing is unpickled from a
+        peer that has not proven it holds the key.
+        """
+        if not os.path.exists(default_address()):
+            return None
+
+        def handshake():
+            conn = connect()
+            try:
+                conn.send(("run", run.argv))
+                return socket.socket(fileno=os.dup(conn.fileno()))
+            finally:
+                conn.close()
+
+        sock = await asyncio.to_thread(handshake)
+        return await asyncio.open_unix_connection(sock=sock)
+
+    async def _run_on_worker(self, run, connection, writer):
+        """Same run on the warm worker: its multiprocessing.connection protocol, asynchronously."""
+        reader, run.writer = connection
+        if run.cancelled:
+            run.cancelled = False
+            self._cancel(run.run_id)
+        decoder = ev.EventDecoder()
+        try:
+            while True:
+                try:
+                    msg = await _read_message(reader)
+                except asyncio.IncompleteReadError:
+                    return None
+                if msg[0] == "data":
+                    self._events(run, decoder, msg[1], writer)
+                elif msg[0] == "exit":
+                    return msg[1]
+        finally:
+            run.writer.close()
+
+
+def _frame(obj):
+    data = pickle.dumps(obj)
+    return _MSG_LEN.pack(len(data)) + data
+
+
+async def _read_message(reader):
+    n = _MSG_LEN.unpack(await reader.readexactly(_MSG_LEN.size))[0]
+    if n == -1:
+        n = _MSG_LEN64.unpack(await reader.readexactly(_MSG_LEN64.size))[0]
+    return pickle.loads(await reader.readexactly(n))
+
+
+# ---------------------------------------------------------------------------
+# dashboard
+# ---------------------------------------------------------------------------
+class _Card:
+    __slots__ = ("run_id", "label", "started", "events", "stderr", "last", "returncode",
+                 "trace", "done", "widgets", "dirty")
+
+    def __init__(self, run_id, label):
+        self.run_id = run_id
+        self.label = label
+        self.started = time.monotonic()
+        self.events = 0
+        self.stderr = deque(maxlen=STDERR_TAIL)
+        self.last = ""
+        self.returncode = None
+        self.trace = None
+        self.done = None  # monotonic end time
+        self.widgets = None
+        self.dirty = True
+
+
+class RunDashboard:
+    """Side-by-side cards for every run of one IngestLoop, updated once per frame.
+
+    run(demo_args) starts a scenario and focuses it: its events go to `view`
+    (an ArrowFlowView) and its end sets the view's status. Clicking a card
+    focuses that run instead.
+    """
+
+    COLUMNS = 5
+    CARD_WIDTH = 200
+    CLOCK_MS = 1000  # running cards' elapsed time and rate, with or without new items
+
+    def __init__(self, parent, view=None, bg=None, use_worker=True):
+        import tkinter as tk
+        from frame_renderer import FrameRenderer
+
+        self._tk = tk
+        self.view = view
+        self.bg = bg
+        self.cards = {}
+        self.focus = None
+        self.frame = tk.Frame(parent, bg=bg)
+        head = tk.Frame(self.frame, bg=bg)
+        head.pack(fill="x")
+        self.summary = tk.Label(head, text="No runs", bg=bg, font=("Arial", 10, "bold"))
+        self.summary.pack(side="left", padx=4)
+        tk.Button(head, text="Clear finished", command=self.clear_finished).pack(side="right", padx=4)
+        self.board = tk.Frame(self.frame, bg=bg)
+        self.board.pack(fill="x")
+        self.renderer = FrameRenderer(self.frame, self._apply)
+        self.ingest = IngestLoop(self.renderer.post, use_worker=use_worker)
+        self.renderer.start()
+        self._clock_id = self.frame.after(self.CLOCK_MS, self._clock)
+
+    def pack(self, **kw):
+        self.frame.pack(**kw)
+
+    def grid(self, **kw):
+        self.frame.grid(**kw)
+
+    def run(self, demo_args, label=None):
+        """Start `step1_demo.py --events <demo_args>`; returns the run id."""
+        run_id = self.ingest.submit(["--events"] + list(demo_args))
+        self.cards[run_id] = _Card(run_id, label or " ".join(demo_args))
+        self._set_focus(run_id)
+        return run_id
+
+    def cancel(self, run_id):
+        self.ingest.cancel(run_id)
+
+    def close(self):
+        if self._clock_id is not None:
+            self.frame.after_cancel(self._clock_id)
+            self._clock_id = None
+        self.renderer.stop()
+        self.ingest.stop()
+
+    def clear_finished(self):
+        for run_id in [r for r, c in self.cards.items() if c.done is not None]:
+            card = self.cards.pop(run_id)
+            if card.widgets is not None:
+                card.widgets[0].destroy()
+        self._layout()
+
+    def _set_focus(self, run_id):
+        old, self.focus = self.focus, run_id
+        for rid in (old, run_id):
+            if rid in self.cards:
+                self.cards[rid].dirty = True
+        if self.view is not None and old != run_id:
+            # Applied now, not queued: the focused run's events are applied
+            # directly too, and a clear still in the view's queue would wipe them.
+            card = self.cards.get(run_id)
+            if card is not None and card.done is not None:
+                status = ("status", self._finished_text(card), "green" if card.returncode == 0 else "red")
+            else:
+                status = ("status", "Running...", "blue")
+            self.view.apply([("clear",), status])
+
+    def _finished_text(self, card):
+        if card.returncode == 0:
+            trace = f" (trace: {os.path.basename(card.trace)})" if card.trace else ""
+            return f"Finished{trace}"
+        tail = card.stderr[-1] if card.stderr else ""
+        return f"Failed (exit {card.returncode}) {tail}".rstrip()
+
+    def _apply(self, items):
+        focused = []
+        for item in items:
+            card = self.cards.get(item[1])
+            if card is None:
+                continue  # cleared already
+            card.dirty = True
+            tag = item[0]
+            if tag == "events":
+                card.events += len(item[2])
+                card.last = ev.format_event(item[2][-1])
+                if item[1] == self.focus:
+                    focused.extend(item[2])
+            elif tag == "stderr":
+                card.stderr.append(item[2])
+            elif tag == "exit":
+                card.returncode, card.trace = item[2], item[3]
+                card.done = time.monotonic()
+                if item[1] == self.focus and self.view is not None:
+                    if focused:
+                        self.view.apply(focused)
+                        focused = []
+                    self.view.status(self._finished_text(card), "green" if card.returncode == 0 else "red")
+        if focused and self.view is not None:
+            self.view.apply(focused)
+        self._redraw()
+
+    def _clock(self):
+        # The renderer only calls _apply when items arrive, so a quiet run
+        # would otherwise show a frozen elapsed time.
+        for card in self.cards.values():
+            if card.done is None:
+                card.dirty = True
+        self._redraw()
+        self._clock_id = self.frame.after(self.CLOCK_MS, self._clock)
+
+    def _redraw(self):
+        for card in self.cards.values():
+            if card.dirty:
+                self._draw(card)
+        running = sum(c.done is None for c in self.cards.values())
+        self.summary.configure(text=f"{running} running, {len(self.cards) - running} finished "
+                                    f"(1 ingest thread)")
+
+    def _layout(self):
+        for i, card in enumerate(self.cards.values()):
+            if card.widgets is not None:
+                card.widgets[0].grid(row=i // self.COLUMNS, column=i % self.COLUMNS, padx=3, pady=3,
+                                     sticky="n")
+
+    def _draw(self, card):
+        tk = self._tk
+        card.dirty = False
+        if card.widgets is None:
+            box = tk.Frame(self.board, bd=2, relief="groove", width=self.CARD_WIDTH)
+            title = tk.Label(box, text=f"#{card.run_id} {card.label}", font=("Arial", 9, "bold"),
+                             wraplength=self.CARD_WIDTH, anchor="w", justify="left")
+            title.pack(fill="x")
+            stats = tk.Label(box, font=("Arial", 9), anchor="w", justify="left")
+            stats.pack(fill="x")
+            last = tk.Label(box, font=("Courier", 8), wraplength=self.CARD_WIDTH, anchor="w",
+                            justify="left")
+            last.pack(fill="x")
+            err = tk.Label(box, font=("Courier", 8), fg="red", wraplength=self.CARD_WIDTH, anchor="w",
+                           justify="left")
+            err.pack(fill="x")
+            cancel = tk.Button(box, text="Cancel", command=lambda r=card.run_id: self.cancel(r))
+            cancel.pack(anchor="e")
+            for w in (box, title, stats, last):
+                w.bind("<Button-1>", lambda e, r=card.run_id: self._set_focus(r))
+            card.widgets = (box, title, stats, last, err, cancel)
+            self._layout()
+        box, title, stats, last, err, cancel = card.widgets
+        end = card.done if card.done is not None else time.monotonic()
+        elapsed = end - card.started
+        rate = card.events / elapsed if elapsed > 0 else 0.0
+        if card.done is None:
+            state, color = "running", "blue"
+        elif card.returncode == 0:
+            state, color = "done", "green"
+            cancel.configure(state="disabled")
+        else:
+            state, color = f"exit {card.returncode}", "red"
+            cancel.configure(state="disabled")
+        stats.configure(text=f"{state}  {elapsed:.1f}s\n{card.events} events ({rate:.0f}/s)", fg=color)
+        last.configure(text=card.last[:120])
+        err.configure(text="\n".join(list(card.stderr)[-3:]))
+        box.configure(bg="#E3F2FD" if card.run_id == self.focus else (self.bg or "#F0F0F0"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many scenarios concurrently on one ingest thread")
+    parser.add_argument("--runs", type=int, default=20, help="Concurrent runs")
+    parser.add_argument("--no-worker", action="store_true", help="Always start subprocesses")
+    # everything after the options is passed to step1_demo.py
+    args, demo_args = parser.parse_known_args(argv)
+    if demo_args[:1] == ["--"]:
+        demo_args = demo_args[1:]
+    demo_args = demo_args or ["--shm-race", "--increments", "1000"]
+
+    import queue
+    items = queue.SimpleQueue()
+    threads_before = threading.active_count()
+    loop = IngestLoop(items.put, use_worker=not args.no_worker)
+    t0 = time.perf_counter()
+    for _ in range(args.runs):
+        loop.submit(["--events"] + demo_args, record=False)
+    events = stderr = exited = failed = 0
+    peak_threads = 0
+    while exited < args.runs:
+        item = items.get()
+        peak_threads = max(peak_threads, threading.active_count() - threads_before)
+        if item[0] == "events":
+            events += len(item[2])
+        elif item[0] == "stderr":
+            stderr += 1
+        elif item[0] == "exit":
+            exited += 1
+            failed += item[2] != 0
+    elapsed = time.perf_counter() - t0
+    loop.stop()
+    row = {"runs": args.runs, "events": events, "stderr_lines": stderr, "failed": failed,
+           "elapsed_s": elapsed, "ingest_threads": peak_threads}
+    ev.info("ingest", f"[Ingest] {args.runs} concurrent runs of {' '.join(demo_args)}: {events} events, "
+                      f"{stderr} stderr lines, {failed} failed in {elapsed:.2f}s on {peak_threads} thread(s)")
+    ev.result("ingest", row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# backlog_monitor.py
+# Live backlog of pipes and Unix sockets: bytes written but not read yet.
+#
+# A pipe or socket whose backlog keeps growing is a bottleneck while it
+# happens, not only after a receiver notices old timestamps. The monitor
+# samples every source at a fixed interval:
+#   FdSource        an fd we hold (the demo's Pipe() ends): FIONREAD ioctl
+#   ProcPipeSource  a pipe of another process: /proc/<pid>/fd/<n> is reopened
+#                   read-only and non-blocking, then FIONREAD on our own fd
+#   UnixSocketSource  a socket of another process: sock_diag's receive queue
+#                   length, the same number FIONREAD (SIOCINQ) reports, since a
+#                   socket fd cannot be reopened through /proc
+# Holding the extra pipe read end means a writer won't see EPIPE while we
+# watch; sources are closed as soon as their channel disappears.
+#
+#   python backlog_monitor.py --name python --interval 0.05 --duration 10
+import argparse
+import array
+import fcntl
+import os
+import termios
+import threading
+import time
+from collections import deque
+
+import ipc_events as ev
+from proc_attach import PROC, ProcScanner, unix_sockets
+
+FIONREAD = getattr(termios, "FIONREAD", 0x541B)
+HISTORY = 600  # samples kept per source for plotting
+
+
+def unread_bytes(fd):
+    """Bytes waiting to be read on a pipe/socket/tty fd (FIONREAD)."""
+    buf = array.array("i", [0])
+    fcntl.ioctl(fd, FIONREAD, buf, True)
+    return buf[0]
+
+
+class FdSource:
+    """A pipe or socket fd owned by this process, e.g. Connection.fileno()."""
+
+    def __init__(self, name, fd):
+        self.name = name
+        self.fd = fd
+
+    def sample(self, sockets):
+        return unread_bytes(self.fd)
+
+    def close(self):
+        pass
+
+
+class ProcPipeSource:
+    """A pipe of another process, reopened through /proc/<pid>/fd/<fd>."""
+
+    def __init__(self, name, pid, fd):
+        self.name = name
+        self.fd = os.open(f"{PROC}/{pid}/fd/{fd}", os.O_RDONLY | os.O_NONBLOCK)
+
+    def sample(self, sockets):
+        return unread_bytes(self.fd)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class UnixSocketSource:
+    """Unread bytes over the given socket inodes (both ends of a pair), via sock_diag."""
+
+    needs_sockets = True
+
+    def __init__(self, name, inodes):
+        self.name = name
+        self.inodes = tuple(inodes)
+
+    def sample(self, sockets):
+        if sockets is None:
+            raise OSError("sock_diag unavailable")
+        return sum(sockets[i].rqueue for i in self.inodes if i in sockets)
+
+    def close(self):
+        pass
+
+
+def _pipe_fd(pid, inode):
+    """An fd number of pid that refers to pipe:[inode], or None."""
+    target = f"pipe:[{inode}]"
+    try:
+        fds = os.listdir(f"{PROC}/{pid}/fd")
+    except OSError:
+        return None
+    for fd in fds:
+        try:
+            if os.readlink(f"{PROC}/{pid}/fd/{fd}") == target:
+                return fd
+        except OSError:
+            continue
+    return None
+
+
+def channel_sources(topology, existing=None):
+    """Sources for the pipe and Unix socket channels of a proc_attach Topology.
+
+    Sources in `existing` (name -> source) are reused; pipes that can't be
+    reopened (gone, or not ours to inspect) are skipped.
+    """
+    existing = existing or {}
+    sources = {}
+    for ch in topology.channels:
+        if ch.label in existing:
+            sources[ch.label] = existing[ch.label]
+        elif ch.kind == "unix":
+            sources[ch.label] = UnixSocketSource(ch.label, ch.key)
+        elif ch.kind == "pipe":
+            # prefer a reader's fd; any fd on the inode sees the same buffer
+            for pid, _ in sorted(ch.ends, key=lambda e: e[1] != "read"):
+                fd = _pipe_fd(pid, ch.key)
+                if fd is None:
+                    continue
+                try:
+                    sources[ch.label] = ProcPipeSource(ch.label, pid, fd)
+                except OSError:
+                    continue
+                break
+    return sources
+
+
+class BacklogMonitor(threading.Thread):
+    """Samples unread bytes of every source every `interval` seconds.
+
+    Each reading is kept in history[name] as (seconds since start, bytes),
+    emitted as a SAMPLE event labelled "backlog" on the source's channel name
+    (when emit_events), and passed to on_sample(t, {name: bytes}). A source
+    that fails to sample reads -1 for that tick.
+    """
+
+    def __init__(self, sources=(), interval=0.05, emit_events=True, on_sample=None,
+                 history=HISTORY):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.emit_events = emit_events
+        self.on_sample = on_sample
+        self.history_len = history
+        self.sources = {s.name: s for s in sources}
+        self.history = {}
+        self.stats = {}  # name -> [samples, total, max]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def set_sources(self, sources):
+        """Replace the watched sources ({name: source}); dropped ones are closed."""
+        with self._lock:
+            old, self.sources = self.sources, dict(sources)
+        for name, src in old.items():
+            if self.sources.get(name) is not src:
+                src.close()
+
+    def sample_once(self, t):
+        with self._lock:
+            sources = list(self.sources.values())
+        sockets = None
+        if any(getattr(s, "needs_sockets", False) for s in sources):
+            sockets = unix_sockets()
+        readings = {}
+        for src in sources:
+            try:
+                value = src.sample(sockets)
+            except OSError:
+                value = -1
+            readings[src.name] = value
+            self.history.setdefault(src.name, deque(maxlen=self.history_len)).append((t, value))
+            if value >= 0:
+                st = self.stats.setdefault(src.name, [0, 0, 0])
+                st[0] += 1
+                st[1] += value
+                st[2] = max(st[2], value)
+            if self.emit_events:
+                ev.emit(ev.SAMPLE, src.name, "backlog", value=value)
+        if self.on_sample is not None:
+            self.on_sample(t, readings)
+        return readings
+
+    def run(self):
+        t0 = time.monotonic()
+        while not self._stop_event.is_set():
+            self.sample_once(time.monotonic() - t0)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self.set_sources({})
+
+    def summary(self):
+        """{name: {"samples", "max_bytes", "mean_bytes", "last_bytes"}}."""
+        out = {}
+        for name, (n, total, peak) in self.stats.items():
+            last = self.history[name][-1][1] if self.history.get(name) else 0
+            out[name] = {"samples": n, "max_bytes": peak, "mean_bytes": total / n if n else 0.0,
+                         "last_bytes": last}
+        return out
+
+
+# ---------------------------------------------------------------------------
+# plotting (works on any Tk canvas; no tkinter import needed here)
+# ---------------------------------------------------------------------------
+PLOT_COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b")
+
+
+class BacklogPlot:
+    """Backlog-over-time lines on a canvas, one per source, redrawn per frame.
+
+    add() only records; redraw() rescales to the last `window` seconds and the
+    largest backlog in view, and moves each series' single line item. With
+    skip_idle, a source gets a line only once it has a backlog at all.
+    """
+
+    def __init__(self, canvas, window=30.0, max_series=len(PLOT_COLORS), skip_idle=False):
+        self.canvas = canvas
+        self.window = window
+        self.max_series = max_series
+        self.skip_idle = skip_idle
+        self.series = {}  # name -> deque[(t, bytes)]
+        self._lines = {}
+        self._dirty = False
+        self._axis = canvas.create_text(5, 5, anchor="nw", text="backlog (bytes)", font=("Arial", 9))
+
+    def clear(self):
+        self.canvas.delete("backlog")
+        self.series.clear()
+        self._lines.clear()
+        self._dirty = False
+        self.canvas.itemconfigure(self._axis, text="backlog (bytes)")
+
+    def add(self, name, t, value):
+        if value < 0:
+            return
+        points = self.series.get(name)
+        if points is None:
+            if len(self.series) >= self.max_series or (self.skip_idle and not value):
+                return
+            points = self.series[name] = deque(maxlen=HISTORY)
+        points.append((t, value))
+        self._dirty = True
+
+    def redraw(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        if not any(self.series.values()):
+            return
+        c = self.canvas
+        width, height = c.winfo_width(), c.winfo_height()
+        if width <= 1:
+            width, height = int(c.cget("width")), int(c.cget("height"))
+        left, top, bottom = 60, 20, height - 15
+        t_end = max(pts[-1][0] for pts in self.series.values() if pts)
+        t_start = t_end - self.window
+        peak = max((v for pts in self.series.values() for t, v in pts if t >= t_start), default=0)
+        y_max = max(peak, 1)
+        x_scale = (width - left - 10) / self.window
+        y_scale = (bottom - top) / y_max
+        c.itemconfigure(self._axis, text=f"backlog (bytes), peak {peak} in last {self.window:.0f}s")
+        for i, (name, pts) in enumerate(self.series.items()):
+            coords = []
+            for t, v in pts:
+                if t >= t_start:
+                    coords += [left + (t - t_start) * x_scale, bottom - v * y_scale]
+            if len(coords) < 4:
+                coords += coords or [left, bottom]
+                coords += coords[-2:]
+            line = self._lines.get(name)
+            if line is None:
+                color = PLOT_COLORS[i % len(PLOT_COLORS)]
+                line = self._lines[name] = c.create_line(*coords, fill=color, width=2, tags="backlog")
+                c.create_text(width - 10, top + 12 * i, anchor="ne", text=name, fill=color,
+                              font=("Arial", 9), tags="backlog")
+            else:
+                c.coords(line, *coords)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sample pipe/Unix socket backlogs of live processes")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="Process id (repeatable)")
+    parser.add_argument("--name", action="append", default=[], help="Process name substring (repeatable)")
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between samples")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to watch")
+    args = parser.parse_args(argv)
+
+    topo = ProcScanner(args.pid, args.name).scan()
+    monitor = BacklogMonitor(interval=args.interval, emit_events=False)
+    monitor.set_sources(channel_sources(topo))
+    if not monitor.sources:
+        print("[Backlog] no shared pipes or Unix sockets between the selected processes")
+        return
+    monitor.start()
+    time.sleep(args.duration)
+    monitor.stop()
+    for name, s in sorted(monitor.summary().items(), key=lambda kv: -kv[1]["max_bytes"]):
+        print(f"[Backlog] {name}: max {s['max_bytes']} B, mean {s['mean_bytes']:.0f} B, "
+              f"last {s['last_bytes']} B over {s['samples']} samples")
+
+
+if __name__ == "__main__":
+    main()
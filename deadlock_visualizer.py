@@ -1,7 +1,9 @@
 import tkinter as tk
 import threading
-import time
-import random
+
+from deadlock_engine import WaitForGraph
+from dining_philosophers import STRATEGIES, DiningTable
+from frame_renderer import FrameRenderer
 
 
 THINKING = "thinking"
@@ -66,48 +68,117 @@ class DiningPhilosophersGUI:
             width=20, height=2, command=self.resolve_deadlock
         ).grid(row=0, column=1, padx=15)
 
+        self.strategy = tk.StringVar(value=STRATEGIES[0])
+        tk.OptionMenu(button_frame, self.strategy, *STRATEGIES).grid(row=0, column=2, padx=15)
+
+        tk.Button(
+            button_frame, text="Run Philosophers", bg="#2196F3", fg="white",
+            width=20, height=2, command=self.run_philosophers
+        ).grid(row=0, column=3, padx=15)
+
+        self.info = tk.Label(self.root, text="", bg="white", font=("Arial", 11))
+        self.info.pack()
+
         self.running = False
         self.deadlock_detected = False
+        self.graph = WaitForGraph()
+        self.deadlock = None
+        self.cycle_arrows = []
+        self.table = None
+        self.renderer = FrameRenderer(self.root, self._apply_frame)
+        self.renderer.start()
         self.root.mainloop()
 
+    def _state_of(self, pid):
+        if self.graph.in_deadlock(pid):
+            return DEADLOCK
+        held = len(self.graph.held.get(pid, ()))
+        if held == 2:
+            return EATING
+        if held or pid in self.graph.waiting:
+            return HUNGRY
+        return THINKING
+
+    def _sync_states(self):
+        for i in range(len(self.positions)):
+            self._set_state(i, self._state_of(i))
+
     def simulate_deadlock(self):
-        if self.running:
+        if self.running or self.table is not None:
             return
 
         self.running = True
         self.deadlock_detected = False
-        threading.Thread(target=self._deadlock_sequence).start()
-
-    def _deadlock_sequence(self):
-       
-        for i in range(5):
-            self._set_state(i, HUNGRY)
-            time.sleep(0.7)
-
-      
-        self._show_cycle()
-
-       
-        for i in range(5):
-            self._set_state(i, DEADLOCK)
-
-        self.deadlock_detected = True
-        self.running = False
+        self._clear_cycle()
+        self.graph = WaitForGraph()
+        self.deadlock = None
+        self._sync_states()
+        n = len(self.positions)
+        # left fork first, then the right one: the textbook way to deadlock
+        steps = [(i, i) for i in range(n)] + [(i, (i + 1) % n) for i in range(n)]
+        self._deadlock_step(steps, 0)
+
+    def _deadlock_step(self, steps, k):
+        if k == len(steps):
+            self.running = False
+            return
+        pid, fork = steps[k]
+        if pid not in self.graph.waiting:
+            deadlock = self.graph.request(pid, fork)
+            if deadlock:
+                self.deadlock = deadlock
+                self.deadlock_detected = True
+                self._show_cycle(deadlock)
+        self._sync_states()
+        self.root.after(350, self._deadlock_step, steps, k + 1)
+
+    def run_philosophers(self):
+        """Real philosopher threads and fork locks; states arrive through the renderer."""
+        if self.running or self.table is not None:
+            return
+        self._clear_cycle()
+        self.deadlock = None
+        self.deadlock_detected = False
+        post = self.renderer.post
+        self.table = DiningTable(
+            len(self.positions), self.strategy.get(), think_s=0.5, eat_s=0.5, timeout_s=0.4, reach_s=0.3,
+            on_state=lambda pid, state: post(("state", pid, state)),
+            on_deadlock=lambda d: post(("deadlock", d)))
+        self.graph = self.table.graph
+        self.info.config(text=f"Running {self.strategy.get()}...", fg="blue")
+        table = self.table
+        threading.Thread(target=lambda: post(("done", table.run(duration=30.0))), daemon=True).start()
+
+    def _apply_frame(self, items):
+        latest = {}
+        for item in items:
+            if item[0] == "state":
+                latest[item[1]] = item[2]
+            elif item[0] == "deadlock":
+                self._show_cycle(item[1])
+            elif item[0] == "done":
+                row = item[1]
+                self.table = None
+                ttd = row["time_to_deadlock_s"]
+                self.info.config(text=f"{row['strategy']}: {row['meals']} meals, "
+                                      f"{row['meals_per_s']:.2f} meals/s, {row['starved']} starved"
+                                      + (f", deadlock after {ttd:.2f}s" if ttd is not None else ""),
+                                 fg="red" if ttd is not None else "green")
+        for pid, state in latest.items():
+            self._set_state(pid, state)
 
     def resolve_deadlock(self):
-        if not self.deadlock_detected:
+        # A live table handles its own deadlocks (or runs into them); only the
+        # simulated graph is resolved by hand.
+        if not self.deadlock_detected or self.deadlock is None or self.table is not None:
             return
 
-     
-        chosen = random.randint(0, 4)
-        self._set_state(chosen, EATING)
-        time.sleep(0.5)
-
-     
-        for i in range(5):
-            if i != chosen:
-                self._set_state(i, THINKING)
-
+        victim, freed = self.graph.resolve(self.deadlock)
+        self.info.config(text=f"Aborted P{victim}; forks handed to: " + ", ".join(
+            f"F{fork} -> P{pid}" for fork, pid in freed.items() if pid is not None), fg="green")
+        self._clear_cycle()
+        self._sync_states()
+        self.deadlock = None
         self.deadlock_detected = False
 
    
@@ -130,31 +201,33 @@ class DiningPhilosophersGUI:
         self.canvas.itemconfig(self.state_labels[idx], text=f"P{idx} - {texts[state]}")
         self.canvas.update()
 
-    def _show_cycle(self):
-        arrows = []
-        for i in range(5):
-            x1, y1 = self.positions[i]
-            x2, y2 = self.positions[(i+1) % 5]
+    def _clear_cycle(self):
+        for a in self.cycle_arrows:
+            self.canvas.delete(a)
+        self.cycle_arrows = []
+
+    def _show_cycle(self, deadlock):
+        procs, forks = deadlock.processes, deadlock.resources
+        for i, pid in enumerate(procs):
+            x1, y1 = self.positions[pid]
+            x2, y2 = self.positions[procs[(i + 1) % len(procs)]]
 
             a = self.canvas.create_line(
                 x1, y1, x2, y2, arrow=tk.LAST, width=3, fill="orange"
             )
-            arrows.append(a)
-            self.canvas.update()
-            time.sleep(0.4)
+            self.cycle_arrows.append(a)
 
-       
-        for _ in range(3):
-            for a in arrows:
-                self.canvas.itemconfig(a, fill="red")
-            self.canvas.update()
-            time.sleep(0.3)
-
-            for a in arrows:
-                self.canvas.itemconfig(a, fill="orange")
-            self.canvas.update()
-            time.sleep(0.3)
+        self.info.config(text="Cycle: " + " -> ".join(
+            f"P{p} waits F{f}" for p, f in zip(procs, forks)) + f" -> P{procs[0]}", fg="red")
+        self._flash_cycle(6)
 
+    def _flash_cycle(self, remaining):
+        if not remaining or not self.cycle_arrows:
+            return
+        color = "red" if remaining % 2 == 0 else "orange"
+        for a in self.cycle_arrows:
+            self.canvas.itemconfig(a, fill=color)
+        self.root.after(300, self._flash_cycle, remaining - 1)
 
 if __name__ == "__main__":
     DiningPhilosophersGUI()
@@ -0,0 +1,338 @@
+# dining_philosophers.py
+# Dining philosophers run for real: N threads, one lock per fork, and a
+# pluggable pickup strategy. Every fork request/acquire/release is mirrored
+# into a deadlock_engine.WaitForGraph, so a deadlock is detected (and timed)
+# the moment it forms instead of being assumed.
+#
+# Strategies:
+#   naive         left fork, then right fork; deadlocks sooner or later
+#   ordered       lower-numbered fork first (resource ordering)
+#   waiter        an arbitrator admits at most N-1 philosophers to the table
+#   timeout       take left, try right with a timeout, back off and retry
+#   chandy_misra  clean/dirty forks handed over on request (Chandy-Misra)
+#
+# Philosopher i uses forks i (left) and (i + 1) % N (right).
+import random
+import threading
+import time
+
+import ipc_events as ev
+from deadlock_engine import WaitForGraph
+from latency_hist import LatencyHistogram
+
+CHANNEL = "dining"
+STRATEGIES = ("naive", "ordered", "waiter", "timeout", "chandy_misra")
+
+THINKING = "thinking"
+HUNGRY = "hungry"
+EATING = "eating"
+DEADLOCK = "deadlock"
+
+POLL_S = 0.05            # blocked acquires wake this often to notice stop()
+BACKOFF_BASE_S = 0.001
+BACKOFF_MAX_S = 0.05
+REACH_S = 0.005          # pause between the first and second fork; widens the deadlock window
+
+
+class _Fork:
+    """A fork lock whose owner changes and graph updates happen atomically."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.owner = None
+
+
+class _CMFork:
+    """Chandy-Misra fork: owned by one neighbour, clean or dirty."""
+
+    def __init__(self, owner):
+        self.cond = threading.Condition()
+        self.owner = owner
+        self.dirty = True
+        self.requested_by = None
+
+
+class DiningTable:
+    """One run of N philosopher threads under a strategy.
+
+    on_state(pid, state) is called from the philosopher threads on every
+    state change; on_deadlock(deadlock) when the wait-for graph closes a cycle.
+    """
+
+    def __init__(self, n=5, strategy="naive", think_s=0.01, eat_s=0.01, timeout_s=0.02,
+                 reach_s=REACH_S, on_state=None, on_deadlock=None, seed=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy {strategy!r} (choose from {', '.join(STRATEGIES)})")
+        if n < 2:
+            raise ValueError("need at least two philosophers")
+        self.n = n
+        self.strategy = strategy
+        self.think_s = think_s
+        self.eat_s = eat_s
+        self.timeout_s = timeout_s
+        self.reach_s = reach_s
+        self.on_state = on_state
+        self.on_deadlock = on_deadlock
+        self.seed = seed
+        self.graph = WaitForGraph()
+        self.forks = [_Fork() for _ in range(n)]
+        self.waiter = threading.BoundedSemaphore(n - 1)
+        # fork f is shared by philosophers f and f-1; start it with the lower id
+        # so the Chandy-Misra precedence graph is acyclic
+        self.cm_forks = [_CMFork(min(f, (f - 1) % n)) for f in range(n)]
+        if strategy == "chandy_misra":
+            for f, fork in enumerate(self.cm_forks):
+                self.graph.request(fork.owner, f)
+        self.eating = [False] * n
+        self.meals = [0] * n
+        self.retries = [0] * n
+        self.waits = [LatencyHistogram() for _ in range(n)]
+        self.held = [[] for _ in range(n)]
+        self.deadlocks = []
+        self._stop = threading.Event()
+        self._start_ns = 0
+        self.time_to_deadlock_s = None
+
+    def forks_of(self, i):
+        return i, (i + 1) % self.n
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- state / deadlock reporting --------------------------------------
+    def _set(self, i, state):
+        if self.on_state:
+            self.on_state(i, state)
+
+    def _deadlocked(self, deadlock):
+        self.deadlocks.append(deadlock)
+        if self.time_to_deadlock_s is None:
+            self.time_to_deadlock_s = (deadlock.detected_ns - self._start_ns) / 1e9
+        if self.on_deadlock:
+            self.on_deadlock(deadlock)
+        for pid in deadlock.processes:
+            self._set(pid, DEADLOCK)
+        if self.strategy != "timeout":
+            self._stop.set()  # nobody in the cycle can make progress again
+
+    # ---- lock-based strategies --------------------------------------------
+    def _take(self, i, f, timeout=None):
+        """Acquire fork f for i, mirrored into the graph. False on timeout or stop."""
+        fork = self.forks[f]
+        with fork.cond:
+            if fork.owner is not None:
+                deadlock = self.graph.request(i, f)
+                if deadlock:
+                    self._deadlocked(deadlock)
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while fork.owner is not None:
+                    wait = POLL_S if deadline is None else min(POLL_S, deadline - time.monotonic())
+                    if self._stop.is_set() or wait <= 0:
+                        self.graph.cancel(i)
+                        return False
+                    fork.cond.wait(wait)
+                fork.owner = i
+                self.graph.acquire(i, f)
+            else:
+                fork.owner = i
+                self.graph.request(i, f)
+        self.held[i].append(f)
+        return True
+
+    def _drop(self, i, f):
+        self.held[i].remove(f)
+        fork = self.forks[f]
+        with fork.cond:
+            fork.owner = None
+            self.graph.release(i, f)
+            fork.cond.notify()
+
+    def _drop_all(self, i):
+        for f in reversed(self.held[i]):
+            self._drop(i, f)
+
+    def _pick_up_locks(self, i, rng):
+        left, right = self.forks_of(i)
+        if self.strategy == "ordered":
+            left, right = min(left, right), max(left, right)
+        if self.strategy == "waiter":
+            while not self.waiter.acquire(timeout=POLL_S):
+                if self._stop.is_set():
+                    return False
+        if self.strategy != "timeout":
+            if self._take(i, left) and self._reach() and self._take(i, right):
+                return True
+            self._drop_all(i)
+            if self.strategy == "waiter":
+                self.waiter.release()
+            return False
+
+        attempt = 0
+        while not self._stop.is_set():
+            if self._take(i, left) and self._reach():
+                if self._take(i, right, timeout=self.timeout_s):
+                    return True
+                self._drop(i, left)
+            attempt += 1
+            self.retries[i] += 1
+            # randomized exponential backoff so neighbours don't retry in lockstep
+            time.sleep(rng.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt)))
+        self._drop_all(i)
+        return False
+
+    def _reach(self):
+        if self.reach_s:
+            time.sleep(self.reach_s)
+        return True
+
+    def _put_down_locks(self, i):
+        self._drop_all(i)
+        if self.strategy == "waiter":
+            self.waiter.release()
+
+    # ---- Chandy-Misra ------------------------------------------------------
+    def _cm_take(self, i, f):
+        fork = self.cm_forks[f]
+        with fork.cond:
+            waiting = False
+            while fork.owner != i:
+                owner = fork.owner
+                if fork.dirty and not self.eating[owner]:
+                    # the holder must give up a dirty fork it isn't eating with
+                    self.graph.release(owner, f)
+                    fork.owner, fork.dirty = i, False
+                    if fork.requested_by == i:
+                        fork.requested_by = None
+                    self.graph.acquire(i, f)
+                    break
+                if not waiting:
+                    waiting = True
+                    fork.requested_by = i
+                    deadlock = self.graph.request(i, f)
+                    if deadlock:
+                        self._deadlocked(deadlock)
+                if self._stop.is_set():
+                    if fork.requested_by == i:
+                        fork.requested_by = None
+                    self.graph.cancel(i)
+                    return False
+                fork.cond.wait(POLL_S)
+        return True
+
+    def _pick_up_cm(self, i):
+        a, b = sorted(self.forks_of(i))
+        while not self._stop.is_set():
+            if not (self._cm_take(i, a) and self._reach() and self._cm_take(i, b)):
+                return False
+            fa, fb = self.cm_forks[a], self.cm_forks[b]
+            with fa.cond, fb.cond:
+                if fa.owner == i and fb.owner == i:
+                    self.eating[i] = True
+                    return True
+            self.retries[i] += 1  # a dirty fork was taken meanwhile; ask again
+        return False
+
+    def _put_down_cm(self, i):
+        a, b = sorted(self.forks_of(i))
+        fa, fb = self.cm_forks[a], self.cm_forks[b]
+        with fa.cond, fb.cond:
+            self.eating[i] = False
+            for f, fork in ((a, fa), (b, fb)):
+                fork.dirty = True
+                req = fork.requested_by
+                if req is not None and req != i:
+                    # hand the fork straight to the neighbour who asked for it
+                    self.graph.release(i, f)
+                    fork.owner, fork.dirty, fork.requested_by = req, False, None
+                    self.graph.acquire(req, f)
+                fork.cond.notify_all()
+
+    # ---- philosopher thread ----------------------------------------------
+    def _philosopher(self, i):
+        rng = random.Random(None if self.seed is None else self.seed * 100003 + i)
+        cm = self.strategy == "chandy_misra"
+        while not self._stop.is_set():
+            self._set(i, THINKING)
+            time.sleep(rng.uniform(0, 2 * self.think_s))
+            if self._stop.is_set():
+                break
+            self._set(i, HUNGRY)
+            t0 = time.monotonic_ns()
+            if not (self._pick_up_cm(i) if cm else self._pick_up_locks(i, rng)):
+                break
+            self.waits[i].record(time.monotonic_ns() - t0)
+            self.meals[i] += 1
+            self._set(i, EATING)
+            time.sleep(rng.uniform(0, 2 * self.eat_s))
+            if cm:
+                self._put_down_cm(i)
+            else:
+                self._put_down_locks(i)
+
+    def run(self, duration=5.0):
+        """Run for `duration` seconds (or until a deadlock stops the table); returns the result row."""
+        threads = [threading.Thread(target=self._philosopher, args=(i,), daemon=True,
+                                    name=f"philosopher-{i}") for i in range(self.n)]
+        self._start_ns = time.monotonic_ns()
+        for t in threads:
+            t.start()
+        self._stop.wait(duration)
+        elapsed = (time.monotonic_ns() - self._start_ns) / 1e9
+        self._stop.set()
+        for t in threads:
+            t.join()
+        return self.summary(elapsed)
+
+    def summary(self, elapsed):
+        waits = LatencyHistogram()
+        for h in self.waits:
+            waits.merge(h)
+        total = sum(self.meals)
+        squares = sum(m * m for m in self.meals)
+        lat = waits.summary()
+        return {
+            "strategy": self.strategy,
+            "philosophers": self.n,
+            "elapsed_s": elapsed,
+            "meals": total,
+            "meals_per_s": total / elapsed if elapsed else 0.0,
+            "min_meals": min(self.meals),
+            "max_meals": max(self.meals),
+            "starved": sum(1 for m in self.meals if m == 0),
+            # Jain's index: 1.0 when every philosopher ate equally often
+            "fairness": total * total / (self.n * squares) if squares else 0.0,
+            "wait_p50_ns": lat["p50_ns"],
+            "wait_p99_ns": lat["p99_ns"],
+            "wait_max_ns": lat["max_ns"],
+            "retries": sum(self.retries),
+            "deadlocks": len(self.deadlocks),
+            "time_to_deadlock_s": self.time_to_deadlock_s,
+            "deadlock_cycle": list(self.deadlocks[0].processes) if self.deadlocks else None,
+            "meals_by_philosopher": self.meals,
+        }
+
+
+def run_strategy(strategy, n=5, duration=5.0, think_s=0.01, eat_s=0.01, reach_s=REACH_S, seed=None):
+    table = DiningTable(n, strategy, think_s=think_s, eat_s=eat_s, reach_s=reach_s, seed=seed)
+    row = table.run(duration)
+    if row["deadlocks"] and strategy != "timeout":
+        ev.info(CHANNEL, f"[Dining] {strategy}: deadlock after {row['time_to_deadlock_s']:.3f}s, "
+                         f"cycle of {len(row['deadlock_cycle'])} philosophers")
+    ev.result(CHANNEL, row)
+    return row
+
+
+def run_comparison(strategies=STRATEGIES, n=5, duration=5.0, think_s=0.01, eat_s=0.01,
+                   reach_s=REACH_S, seed=None):
+    """Run each strategy with the same table size and timings; one table of results."""
+    rows = [run_strategy(s, n, duration, think_s, eat_s, reach_s, seed) for s in strategies]
+    ev.info(CHANNEL, f"[Dining] {n} philosophers, think ~{think_s * 1e3:g}ms, eat ~{eat_s * 1e3:g}ms, "
+                     f"{duration:g}s per strategy")
+    ev.info(CHANNEL, f"{'strategy':<13} {'meals/s':>9} {'min':>6} {'max':>6} {'starved':>7} "
+                     f"{'fair':>5} {'wait p50':>9} {'wait p99':>9} {'deadlock':>9}")
+    for r in rows:
+        ttd = f"{r['time_to_deadlock_s']:.3f}s" if r["time_to_deadlock_s"] is not None else "-"
+        ev.info(CHANNEL, f"{r['strategy']:<13} {r['meals_per_s']:>9.1f} {r['min_meals']:>6} "
+                         f"{r['max_meals']:>6} {r['starved']:>7} {r['fairness']:>5.2f} "
+                         f"{r['wait_p50_ns'] / 1e6:>7.2f}ms {r['wait_p99_ns'] / 1e6:>7.2f}ms {ttd:>9}")
+    return rows
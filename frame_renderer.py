@@ -0,0 +1,159 @@
+# frame_renderer.py
+# Frame-coalesced rendering on the Tk main loop.
+# Worker threads only post() into a thread-safe queue; once per frame the
+# main loop drains everything that arrived and applies it as one visual update.
+import json
+import queue
+
+import ipc_events as ev
+
+FRAME_MS = 33           # ~30 frames per second
+MAX_ITEMS_PER_FRAME = 50000
+ARROW_HOLD_MS = 250     # how long an arrow stays lit after the last activity
+
+ARROW_COLORS = {"ok": "green", "bottleneck": "yellow", "race": "red", "drop": "orange"}
+_SEVERITY_RANK = {"ok": 0, "drop": 1, "bottleneck": 2, "race": 3}
+
+# Which side of the IPC box an event belongs to (A -> IPC or IPC -> B)
+_OUTBOUND = {ev.SEND, ev.PUT, ev.WRITE}
+
+
+class FrameRenderer:
+    """Drain a thread-safe queue once per frame and hand the batch to on_frame."""
+
+    def __init__(self, widget, on_frame, interval_ms=FRAME_MS):
+        self.widget = widget
+        self.on_frame = on_frame
+        self.interval_ms = interval_ms
+        self._queue = queue.SimpleQueue()
+        self._after_id = None
+
+    def post(self, item):
+        """Thread-safe: may be called from any thread."""
+        self._queue.put(item)
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        items = []
+        try:
+            while len(items) < MAX_ITEMS_PER_FRAME:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            if items:
+                self.on_frame(items)
+        finally:
+            # A failing frame is reported by Tk but must not stop later frames
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+
+class ArrowFlowView:
+    """Coalesces IPC events into the output box, status label and flow arrows.
+
+    Items posted are either ipc_events.Event objects or ("status", text, fg)
+    tuples. One frame produces one log update and at most one color change
+    per arrow, no matter how many events arrived in it. A measured race (RACE
+    event with lost updates) keeps the arrows red until the next clear().
+    With a plot (backlog_monitor.BacklogPlot), "backlog" SAMPLE events are
+    added to it and it is redrawn once per frame. With locks
+    (lock_profiler.LockTimeline), RESULT rows are offered to it the same way.
+    """
+
+    def __init__(self, widget, log_view, status_label, canvas=None, arrows=(), plot=None, locks=None):
+        self.log_view = log_view
+        self.plot = plot
+        self.locks = locks
+        self.status_label = status_label
+        self.canvas = canvas
+        self.arrows = list(arrows)
+        self._reset_id = None
+        self._sticky = False
+        self.renderer = FrameRenderer(widget, self._apply)
+        self.renderer.start()
+
+    def post(self, item):
+        self.renderer.post(item)
+
+    def status(self, text, fg):
+        self.renderer.post(("status", text, fg))
+
+    def clear(self):
+        self.renderer.post(("clear",))
+
+    def apply(self, items):
+        """Apply a batch right away; for callers already on the Tk main loop."""
+        self._apply(items)
+
+    def _apply(self, items):
+        entries = []
+        worst = {}  # arrow index -> severity
+        status = None
+        for item in items:
+            if isinstance(item, ev.Event):
+                if item.kind == ev.SAMPLE and item.label == "backlog" and self.plot is not None:
+                    self.plot.add(item.channel, item.ts_ns / 1e9, item.value)
+                elif item.kind == ev.RESULT and self.locks is not None:
+                    self.locks.add(json.loads(item.label))
+                entries.append((str(item.pid), ev.KIND_NAMES.get(item.kind, "?"),
+                                ev.format_event(item)))
+                if item.kind == ev.RACE and self.arrows:
+                    sev = ev.severity(item)
+                    self._sticky = self._sticky or sev == "race"
+                    for side in range(len(self.arrows)):
+                        worst[side] = sev
+                elif ev.is_transfer(item) and self.arrows:
+                    side = 0 if item.kind in _OUTBOUND else len(self.arrows) - 1
+                    sev = ev.severity(item)
+                    if _SEVERITY_RANK[sev] >= _SEVERITY_RANK[worst.get(side, "ok")]:
+                        worst[side] = sev
+            elif item[0] == "status":
+                status = item
+            elif item[0] == "clear":
+                entries = []
+                worst = {}
+                self.log_view.clear()
+                if self.plot is not None:
+                    self.plot.clear()
+                if self.locks is not None:
+                    self.locks.clear()
+                if self._sticky:
+                    self._sticky = False
+                    self._reset_arrows()
+
+        if entries:
+            self.log_view.extend(entries)
+        if self.plot is not None:
+            self.plot.redraw()
+        if self.locks is not None:
+            self.locks.redraw()
+        if status is not None:
+            self.status_label.config(text=status[1], fg=status[2])
+        if worst:
+            self._light(worst)
+
+    def _light(self, worst):
+        if self._sticky:
+            worst = dict.fromkeys(range(len(self.arrows)), "race")
+        for side, sev in worst.items():
+            self.canvas.itemconfig(self.arrows[side], fill=ARROW_COLORS[sev], width=3)
+        if self._reset_id is not None:
+            self.canvas.after_cancel(self._reset_id)
+            self._reset_id = None
+        if not self._sticky:
+            self._reset_id = self.canvas.after(ARROW_HOLD_MS, self._reset_arrows)
+
+    def _reset_arrows(self):
+        if self._reset_id is not None:
+            self.canvas.after_cancel(self._reset_id)
+        self._reset_id = None
+        for arrow in self.arrows:
+            self.canvas.itemconfig(arrow, fill="black", width=2)
@@ -0,0 +1,250 @@
+# graph_canvas.py
+# Scalable process/resource graph drawing on a Tk canvas.
+# The layout is computed once per node set and cached. State changes are only
+# recorded when they arrive and are applied in one pass per frame, without
+# canvas.update(). When zoomed out, each cluster of nodes collapses into one
+# box colored by its most severe state, so a frame touches at most one item
+# per cluster. Drag with the left button to pan, use the wheel to zoom.
+import math
+
+from frame_renderer import FRAME_MS
+
+CIRCLE_MAX = 40          # up to this many nodes: a single ring
+CLUSTER_SIZE = 25        # nodes per cluster in larger layouts
+MIN_CELL = 90            # minimum cluster cell size in pixels
+LABEL_MAX = 40           # per-node text labels only for graphs this small
+LOD_SCALE = 0.6          # zoom factor below which clusters collapse
+ZOOM_STEP = 1.15
+
+
+def layout(n, width, height):
+    """Positions and node radius for n nodes, plus the clusters they fall into.
+
+    Returns (positions, radius, clusters) where clusters is a list of
+    (center, half_size, [node indexes]).
+    """
+    cx, cy = width / 2, height / 2
+    if n <= CIRCLE_MAX:
+        ring = min(width, height) * 0.38
+        radius = max(6, min(40, ring * math.pi / max(n, 1) * 0.6))
+        positions = [(cx + ring * math.sin(2 * math.pi * i / n),
+                      cy - ring * math.cos(2 * math.pi * i / n)) for i in range(n)]
+        return positions, radius, [((cx, cy), ring + radius, list(range(n)))]
+
+    k = math.ceil(n / CLUSTER_SIZE)
+    cols = max(1, round(math.sqrt(k * width / height)))
+    rows = math.ceil(k / cols)
+    cell = max(MIN_CELL, min(width / cols, height / rows))
+    ring = cell * 0.36
+    radius = max(2, min(8, ring * math.pi / CLUSTER_SIZE * 0.6))
+    positions = []
+    clusters = []
+    for c in range(k):
+        members = list(range(c * CLUSTER_SIZE, min(n, (c + 1) * CLUSTER_SIZE)))
+        ccx = (c % cols + 0.5) * cell
+        ccy = (c // cols + 0.5) * cell
+        for j in range(len(members)):
+            a = 2 * math.pi * j / len(members)
+            positions.append((ccx + ring * math.sin(a), ccy - ring * math.cos(a)))
+        clusters.append(((ccx, ccy), cell * 0.45, members))
+    return positions, radius, clusters
+
+
+class GraphCanvas:
+    """Draws nodes 0..n-1 and directed edges on `canvas` with batched updates.
+
+    colors maps state -> fill color; severity lists states from most to least
+    severe and decides a collapsed cluster's color; texts maps state -> label
+    word for the per-node labels of small graphs.
+    """
+
+    def __init__(self, canvas, colors, severity, texts=None, default=None):
+        self.canvas = canvas
+        self.colors = colors
+        self.rank = {state: len(severity) - i for i, state in enumerate(severity)}
+        self.texts = texts or {}
+        self.default = default if default is not None else severity[-1]
+        self._layouts = {}
+        self.n = 0
+        self.pos = []
+        self.items = []
+        self.labels = []
+        self.cluster_of = []
+        self.clusters = []
+        self.cluster_items = []
+        self.cluster_counts = []
+        self.state = []
+        self._pending = {}
+        self._dirty_clusters = set()
+        self._stale = set()
+        self._edges = {}
+        self.scale = 1.0
+        self._ox = self._oy = 0.0
+        self.collapsed = False
+        self._after_id = None
+        canvas.bind("<ButtonPress-1>", lambda e: canvas.scan_mark(e.x, e.y))
+        canvas.bind("<B1-Motion>", lambda e: canvas.scan_dragto(e.x, e.y, gain=1))
+        canvas.bind("<MouseWheel>", lambda e: self.zoom(ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP, e.x, e.y))
+        canvas.bind("<Button-4>", lambda e: self.zoom(ZOOM_STEP, e.x, e.y))
+        canvas.bind("<Button-5>", lambda e: self.zoom(1 / ZOOM_STEP, e.x, e.y))
+
+    # ---- building ----------------------------------------------------------
+    def _size(self):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1:  # not mapped yet: use the requested size
+            width = int(self.canvas.cget("width"))
+            height = int(self.canvas.cget("height"))
+        return width, height
+
+    def set_nodes(self, n):
+        """(Re)build the drawing for n nodes; the layout for (n, size) is cached."""
+        c = self.canvas
+        c.delete("graph")
+        width, height = self._size()
+        key = (n, width, height)
+        if key not in self._layouts:
+            self._layouts[key] = layout(n, width, height)
+        positions, radius, clusters = self._layouts[key]
+        self.n = n
+        self.pos = positions
+        self.scale, self._ox, self._oy = 1.0, 0.0, 0.0
+        self.collapsed = False
+        self._pending.clear()
+        self._dirty_clusters.clear()
+        self._stale.clear()
+        self._edges.clear()
+        self.state = [self.default] * n
+        fill = self.colors[self.default]
+        width_px = 2 if n <= LABEL_MAX else 1
+        self.items = [c.create_oval(x - radius, y - radius, x + radius, y + radius, fill=fill,
+                                    outline="black", width=width_px, tags=("graph", "node"))
+                      for x, y in positions]
+        self.labels = []
+        if n <= LABEL_MAX:
+            word = self.texts.get(self.default, self.default)
+            self.labels = [c.create_text(x, y + radius + 18, text=f"P{i} - {word}", font=("Arial", 11),
+                                         tags=("graph", "label"))
+                           for i, (x, y) in enumerate(positions)]
+        self.clusters = clusters
+        self.cluster_of = [0] * n
+        self.cluster_items = []
+        self.cluster_counts = []
+        for ci, ((x, y), half, members) in enumerate(clusters):
+            for m in members:
+                self.cluster_of[m] = ci
+            rect = c.create_rectangle(x - half, y - half, x + half, y + half, fill=fill, outline="black",
+                                      state="hidden", tags=("graph", "cluster"))
+            text = c.create_text(x, y, text=f"{len(members)}", state="hidden", tags=("graph", "cluster"))
+            self.cluster_items.append((rect, text))
+            self.cluster_counts.append({self.default: len(members)})
+        bbox = c.bbox("graph")
+        if bbox:
+            c.configure(scrollregion=(bbox[0] - 50, bbox[1] - 50, bbox[2] + 50, bbox[3] + 50))
+
+    def position(self, node):
+        """Current canvas coordinates of a node (layout position after zoom)."""
+        x, y = self.pos[node]
+        return x * self.scale + self._ox, y * self.scale + self._oy
+
+    # ---- state updates -----------------------------------------------------
+    def set_state(self, node, state):
+        """Record a state change; it is drawn on the next frame."""
+        self._pending[node] = state
+        if self._after_id is None:
+            self._after_id = self.canvas.after(FRAME_MS, self.flush)
+
+    def flush(self):
+        """Apply every state change since the last frame in one pass."""
+        self._after_id = None
+        pending, self._pending = self._pending, {}
+        c = self.canvas
+        for node, state in pending.items():
+            if node >= self.n:
+                continue
+            old = self.state[node]
+            if old == state:
+                continue
+            self.state[node] = state
+            ci = self.cluster_of[node]
+            counts = self.cluster_counts[ci]
+            counts[old] -= 1
+            counts[state] = counts.get(state, 0) + 1
+            self._dirty_clusters.add(ci)
+            if self.collapsed:
+                self._stale.add(node)
+                continue
+            c.itemconfigure(self.items[node], fill=self.colors[state])
+            if self.labels:
+                c.itemconfigure(self.labels[node], text=f"P{node} - {self.texts.get(state, state)}")
+        if self.collapsed:
+            self._draw_clusters()
+
+    def _worst(self, counts):
+        return max((s for s, k in counts.items() if k), key=lambda s: self.rank.get(s, 0))
+
+    def _draw_clusters(self):
+        c = self.canvas
+        for ci in self._dirty_clusters:
+            counts = self.cluster_counts[ci]
+            worst = self._worst(counts)
+            rect, text = self.cluster_items[ci]
+            c.itemconfigure(rect, fill=self.colors[worst])
+            total = len(self.clusters[ci][2])
+            c.itemconfigure(text, text=f"{counts[worst]}/{total} {self.texts.get(worst, worst)}")
+        self._dirty_clusters.clear()
+
+    # ---- edges -------------------------------------------------------------
+    def set_edges(self, edges, color="orange"):
+        """Show exactly these (from, to) arrows; unchanged ones are kept."""
+        c = self.canvas
+        wanted = set(edges)
+        for edge in list(self._edges):
+            if edge not in wanted:
+                c.delete(self._edges.pop(edge))
+        state = "hidden" if self.collapsed else "normal"
+        for a, b in edges:
+            if (a, b) in self._edges or a >= self.n or b >= self.n:
+                continue
+            x1, y1 = self.position(a)
+            x2, y2 = self.position(b)
+            self._edges[(a, b)] = c.create_line(x1, y1, x2, y2, arrow="last", width=3 if self.n <= LABEL_MAX else 1,
+                                                fill=color, state=state, tags=("graph", "edge"))
+
+    def color_edges(self, color):
+        self.canvas.itemconfigure("edge", fill=color)
+
+    # ---- pan / zoom --------------------------------------------------------
+    def zoom(self, factor, x, y):
+        """Zoom by factor around window point (x, y); collapses clusters when far out."""
+        c = self.canvas
+        cx, cy = c.canvasx(x), c.canvasy(y)
+        c.scale("graph", cx, cy, factor, factor)
+        self.scale *= factor
+        self._ox = cx + (self._ox - cx) * factor
+        self._oy = cy + (self._oy - cy) * factor
+        bbox = c.bbox("graph")
+        if bbox:
+            c.configure(scrollregion=(bbox[0] - 50, bbox[1] - 50, bbox[2] + 50, bbox[3] + 50))
+        self._update_lod()
+
+    def _update_lod(self):
+        collapse = self.scale < LOD_SCALE and len(self.clusters) > 1
+        if collapse == self.collapsed:
+            return
+        self.collapsed = collapse
+        c = self.canvas
+        detail, summary = ("hidden", "normal") if collapse else ("normal", "hidden")
+        for tag in ("node", "label", "edge"):
+            c.itemconfigure(tag, state=detail)
+        c.itemconfigure("cluster", state=summary)
+        if collapse:
+            self._dirty_clusters.update(range(len(self.clusters)))
+            self._draw_clusters()
+        else:
+            for node in self._stale:
+                state = self.state[node]
+                c.itemconfigure(self.items[node], fill=self.colors[state])
+                if self.labels:
+                    c.itemconfigure(self.labels[node], text=f"P{node} - {self.texts.get(state, state)}")
+            self._stale.clear()
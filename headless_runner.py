@@ -0,0 +1,199 @@
+# headless_runner.py
+# Runs any demo scenario without a GUI and prints one machine-readable result.
+# The scenario runs as `step1_demo.py --events ...` in a subprocess; its binary
+# event stream is decoded and folded into counts, timings, latency stats,
+# bottlenecks and races. Nothing here imports tkinter, so it works on build
+# servers; --jsonl appends one line per run so results can be compared across
+# commits.
+#
+#   python headless_runner.py pipe -p sender_delay=0.1 -p messages=50
+#   python headless_runner.py shm-nolock --jsonl results.jsonl
+import argparse
+import datetime
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import ipc_events as ev
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEMO = os.path.join(HERE, "step1_demo.py")
+
+SCENARIOS = {
+    "pipe": ["--pipe"],
+    "pipe-backlog": ["--pipe", "--sender-delay", "0.01", "--receiver-delay", "0.05",
+                     "--messages", "60", "--backlog-interval", "0.02"],
+    "queue": ["--queue"],
+    "shm": ["--shm"],
+    "shm-nolock": ["--shm-nolock"],
+    "shm-race": ["--shm-race"],
+    "shm-seqlock": ["--shm-seqlock"],
+    "shm-wakeup": ["--shm-wakeup"],
+    "shm-scan": ["--shm-scan"],
+    "lock-profile": ["--lock-profile", "mutex,rw,sharded", "--duration", "1"],
+    "dining": ["--dining", "naive,ordered,waiter,timeout,chandy_misra"],
+    "pipe-bench": ["--pipe-bench"],
+    "queue-bench": ["--queue-bench"],
+    "transport-bench": ["--bench", "pipe,queue,shm-ring"],
+    "scaling": ["--scaling", "queue,simplequeue,pipe,shm-ring", "--max-procs", "2", "--count", "5000"],
+    "slab-bench": ["--slab-bench", "--sizes", "64K,1M,16M", "--count", "20"],
+}
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True,
+                             text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def scenario_argv(scenario, params=None):
+    """step1_demo.py arguments for a scenario name plus {"sender_delay": 0.1, ...} params."""
+    if scenario not in SCENARIOS:
+        raise ValueError(f"unknown scenario {scenario!r} (choose from {', '.join(SCENARIOS)})")
+    argv = ["--events"] + SCENARIOS[scenario]
+    for key, value in (params or {}).items():
+        argv += [f"--{key.replace('_', '-')}", str(value)]
+    return argv
+
+
+class ResultCollector:
+    """Folds a stream of events into the summary dict the runner emits."""
+
+    def __init__(self):
+        self.counts = {}
+        self.pids = set()
+        self.first_ts = None
+        self.last_ts = None
+        self.bottlenecks = 0
+        self.drops = 0
+        self.races = []
+        self.latency = {}
+        self.results = []
+
+    def add(self, event):
+        name = ev.KIND_NAMES.get(event.kind, str(event.kind))
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.pids.add(event.pid)
+        if self.first_ts is None:
+            self.first_ts = event.ts_ns
+        self.last_ts = event.ts_ns
+        if event.flags & ev.FLAG_BOTTLENECK:
+            self.bottlenecks += 1
+        if event.flags & ev.FLAG_DROP:
+            self.drops += 1
+        if event.kind == ev.RACE:
+            self.races.append({"channel": event.channel, "label": event.label,
+                               "expected": event.size, "lost_updates": event.value})
+        elif event.kind == ev.LATENCY:
+            summary = json.loads(event.label)
+            summary.pop("buckets", None)
+            self.latency.setdefault(event.channel, []).append(summary)
+        elif event.kind == ev.RESULT:
+            self.results.append(json.loads(event.label))
+
+    def summary(self):
+        return {
+            "events": self.counts,
+            "processes": len(self.pids),
+            "event_span_s": (self.last_ts - self.first_ts) / 1e9 if self.first_ts is not None else 0.0,
+            "bottlenecks": self.bottlenecks,
+            "drops": self.drops,
+            "races": self.races,
+            "race_detected": any(r["lost_updates"] > 0 for r in self.races),
+            "latency": self.latency,
+            "results": self.results,
+        }
+
+
+def run_scenario(scenario, params=None, timeout=None, python=sys.executable, extra_env=None):
+    """Run one scenario to completion and return its result dict."""
+    argv = scenario_argv(scenario, params)
+    env = dict(os.environ, **(extra_env or {}))
+    started = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    collector = ResultCollector()
+    t0 = time.monotonic()
+    cpu0 = os.times()
+    # Own session, so a timeout kills the demo's children too: they hold the
+    # stdout pipe open and reading would otherwise block until they finish.
+    proc = subprocess.Popen([python, DEMO] + argv, cwd=HERE, env=env, start_new_session=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    watchdog = threading.Timer(timeout, _kill) if timeout else None
+    if watchdog:
+        watchdog.start()
+    # Drain stderr on its own thread so a chatty child can never stall on a full pipe
+    err_chunks = []
+    err_reader = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+    err_reader.start()
+    try:
+        for event in ev.read_events(proc.stdout):
+            collector.add(event)
+        proc.wait()
+        err_reader.join()
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        proc.stdout.close()
+        proc.stderr.close()
+    stderr = b"".join(err_chunks).decode("utf-8", "replace")
+    cpu1 = os.times()
+
+    result = {
+        "scenario": scenario,
+        "params": params or {},
+        "commit": git_commit(),
+        "started_at": started,
+        "wall_s": time.monotonic() - t0,
+        "cpu_s": (cpu1.children_user - cpu0.children_user) + (cpu1.children_system - cpu0.children_system),
+        "returncode": proc.returncode,
+        "timed_out": timed_out.is_set(),
+    }
+    result.update(collector.summary())
+    if stderr.strip():
+        result["stderr_tail"] = stderr.strip().splitlines()[-20:]
+    return result
+
+
+def parse_params(pairs):
+    params = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        params[key.replace("-", "_")] = value
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run IPC scenarios headless and emit JSON results")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="Scenario parameter passed to step1_demo.py, e.g. -p sender_delay=0.1")
+    parser.add_argument("--timeout", type=float, default=None, help="Kill the scenario after this many seconds")
+    parser.add_argument("--jsonl", default=None, help="Append the result as one line to this file")
+    args = parser.parse_args(argv)
+
+    result = run_scenario(args.scenario, parse_params(args.param), timeout=args.timeout)
+    line = json.dumps(result, separators=(",", ":"))
+    if args.jsonl:
+        with open(args.jsonl, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    print(line if args.jsonl else json.dumps(result, indent=2))
+    return 0 if result["returncode"] == 0 and not result["timed_out"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# ipc_bench.py
+# Shared benchmark harness for the IPC transports.
+# A transport provides a sender and a receiver function that move `count`
+# messages of `size` bytes and report their own timings to a results queue;
+# the harness runs them in two processes and turns the timings into
+# msgs/s, MB/s and CPU time per message. run_comparison() runs several
+# transports at the same sizes so their rows line up in one table.
+from multiprocessing import Process, Queue
+import queue
+import time
+
+import ipc_events as ev
+from latency_hist import format_summary
+
+DEFAULT_SIZES = [8, 64, 512, 4 * 1024, 32 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+TARGET_BYTES = 64 * 1024 * 1024   # data volume each size aims to move
+MAX_COUNT = 20000
+MIN_COUNT = 20
+
+_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+
+
+def parse_size(text):
+    """'8', '4K', '1MB' -> bytes."""
+    text = text.strip().upper()
+    num = text.rstrip("KMGB")
+    return int(float(num) * _UNITS[text[len(num):]])
+
+
+def format_size(n):
+    for unit, scale in (("MB", 1024 ** 2), ("KB", 1024)):
+        if n >= scale:
+            return f"{n / scale:g}{unit}"
+    return f"{n}B"
+
+
+def default_count(size):
+    return max(MIN_COUNT, min(MAX_COUNT, TARGET_BYTES // max(size, 1)))
+
+
+def report(role, start_ns, end_ns, cpu0, results, **extra):
+    """Called by transport endpoints at the end of a run."""
+    row = {"role": role, "start_ns": start_ns, "end_ns": end_ns,
+           "cpu_s": time.process_time() - cpu0}
+    row.update(extra)
+    results.put(row)
+
+
+def run_pair(transport, mode, sender, receiver, tx, rx, size, count):
+    """Run one sender/receiver pair and summarise it as a result row."""
+    results = Queue()
+    p_recv = Process(target=receiver, args=(rx, size, count, mode, results))
+    p_send = Process(target=sender, args=(tx, size, count, mode, results))
+    p_recv.start()
+    p_send.start()
+    rows = {}
+    while len(rows) < 2:
+        try:
+            row = results.get(timeout=1.0)
+        except queue.Empty:
+            # An endpoint that died (e.g. a sender's TimeoutError) never reports.
+            failed = [p for p in (p_send, p_recv) if p.exitcode not in (None, 0)]
+            if failed:
+                for p in (p_send, p_recv):
+                    p.terminate()
+                    p.join()
+                raise RuntimeError(f"{transport}/{mode} benchmark endpoint exited with code {failed[0].exitcode}")
+            continue
+        rows[row["role"]] = row
+    p_send.join()
+    p_recv.join()
+
+    send, recv = rows["sender"], rows["receiver"]
+    elapsed = max(recv["end_ns"] - send["start_ns"], 1) / 1e9
+    result = {
+        "transport": transport,
+        "mode": mode,
+        "size": size,
+        "count": count,
+        "elapsed_s": elapsed,
+        "msgs_per_s": count / elapsed,
+        "mb_per_s": count * size / elapsed / 1e6,
+        "cpu_us_per_msg": (send["cpu_s"] + recv["cpu_s"]) / count * 1e6,
+    }
+    for row in (send, recv):
+        for key, value in row.items():
+            if key not in ("role", "start_ns", "end_ns", "cpu_s"):
+                result[key] = value
+    ev.result("bench", result)
+    return result
+
+
+def format_table(results):
+    lines = [f"{'transport':<10} {'mode':<8} {'size':>8} {'count':>7} "
+             f"{'msgs/s':>11} {'MB/s':>9} {'cpu us/msg':>11} {'p50 us':>9} {'p99 us':>9}"]
+    for r in results:
+        lat = r.get("latency")
+        p50 = f"{lat['p50_ns'] / 1e3:>9.1f}" if lat else f"{'-':>9}"
+        p99 = f"{lat['p99_ns'] / 1e3:>9.1f}" if lat else f"{'-':>9}"
+        lines.append(f"{r['transport']:<10} {r['mode']:<8} {format_size(r['size']):>8} {r['count']:>7} "
+                     f"{r['msgs_per_s']:>11.0f} {r['mb_per_s']:>9.1f} {r['cpu_us_per_msg']:>11.2f} {p50} {p99}")
+    for r in results:
+        if r.get("latency"):
+            lines.append(format_summary(r["latency"], f"{r['transport']}/{r['mode']}/{format_size(r['size'])} "))
+    return lines
+
+
+TRANSPORTS = ("pipe", "queue", "shm-ring")
+
+
+def run_comparison(transports=TRANSPORTS, sizes=None, count=None):
+    """Run each transport's benchmark at equal sizes/counts and return all rows."""
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+    results = []
+    for name in transports:
+        if name == "pipe":
+            from pipe_simulation import run_benchmark
+        elif name == "queue":
+            from message_queue_sim import run_benchmark
+        elif name == "shm-ring":
+            from shm_ring import run_benchmark
+        else:
+            raise ValueError(f"unknown transport {name!r} (choose from {', '.join(TRANSPORTS)})")
+        results.extend(run_benchmark(sizes=sizes, count=count))
+    results.sort(key=lambda r: (r["size"], r["transport"], r["mode"]))
+    for line in format_table(results):
+        ev.info("bench", line)
+    return results
@@ -0,0 +1,287 @@
+# ipc_events.py
+# Typed IPC events and the compact length-prefixed binary channel the demos emit.
+# Every frame is a little-endian u32 body length followed by the body:
+#   kind(u8) flags(u8) pid(u32) ts_ns(i64, monotonic) size(u32) value(i64)
+#   channel_len(u8) channel(utf-8) label_len(u16) label(utf-8)
+# Human-readable text is just one view of these events (format_event).
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+SEND = 1
+RECV = 2
+PUT = 3
+GET = 4
+LOCK_ACQUIRE = 5
+READ = 6
+WRITE = 7
+DONE = 8
+INFO = 9
+LATENCY = 10  # label carries a latency_hist summary as JSON
+SAMPLE = 11   # periodic metric sample: label = metric name, value = reading
+RACE = 12     # measured lost updates: value = lost, size = expected total
+RESULT = 13   # machine-readable scenario/benchmark result: label = JSON object
+
+KIND_NAMES = {
+    SEND: "send",
+    RECV: "recv",
+    PUT: "put",
+    GET: "get",
+    LOCK_ACQUIRE: "lock-acquire",
+    READ: "read",
+    WRITE: "write",
+    DONE: "done",
+    INFO: "info",
+    LATENCY: "latency",
+    SAMPLE: "sample",
+    RACE: "race",
+    RESULT: "result",
+}
+
+FLAG_BOTTLENECK = 0x01  # receiver saw latency above the demo threshold
+FLAG_DROP = 0x02        # item could not be delivered (e.g. queue full)
+FLAG_UNSYNC = 0x04      # shared-memory access made without a lock
+FLAG_END = 0x08         # termination token / end of stream
+
+Event = namedtuple("Event", "kind flags pid ts_ns size value channel label")
+
+_LEN = struct.Struct("<I")
+_FIXED = struct.Struct("<BBIqIq")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+
+ENV_MODE = "IPC_EVENTS"  # "binary" -> frames on stdout, anything else -> text
+
+_ROLES = {
+    SEND: "Sender",
+    RECV: "Receiver",
+    PUT: "Producer",
+    GET: "Consumer",
+    WRITE: "Writer",
+    READ: "Reader",
+}
+
+
+def encode(event):
+    """Encode one event as a complete length-prefixed frame.
+
+    Raises ValueError for a label over 64 KiB: RESULT and LATENCY labels are
+    JSON, and a cut one would no longer parse.
+    """
+    channel = event.channel.encode("utf-8")[:255]
+    label = event.label.encode("utf-8")
+    if len(label) > 0xFFFF:
+        raise ValueError(f"{KIND_NAMES.get(event.kind, event.kind)} event label is {len(label)} bytes "
+                         f"(at most {0xFFFF} fit in a frame)")
+    body = b"".join((
+        _FIXED.pack(event.kind, event.flags, event.pid, event.ts_ns, event.size, event.value),
+        _U8.pack(len(channel)), channel,
+        _U16.pack(len(label)), label,
+    ))
+    return _LEN.pack(len(body)) + body
+
+
+def decode(body):
+    """Decode a frame body (without its length prefix) into an Event."""
+    kind, flags, pid, ts_ns, size, value = _FIXED.unpack_from(body, 0)
+    pos = _FIXED.size
+    clen = body[pos]
+    pos += 1
+    channel = bytes(body[pos:pos + clen]).decode("utf-8", "replace")
+    pos += clen
+    llen = _U16.unpack_from(body, pos)[0]
+    pos += 2
+    label = bytes(body[pos:pos + llen]).decode("utf-8", "replace")
+    return Event(kind, flags, pid, ts_ns, size, value, channel, label)
+
+
+class EventDecoder:
+    """Incremental decoder: feed arbitrary byte chunks, get whole events back."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def feed(self, data):
+        self._buf += data
+        events = []
+        pos = 0
+        buf = self._buf
+        while len(buf) - pos >= _LEN.size:
+            n = _LEN.unpack_from(buf, pos)[0]
+            end = pos + _LEN.size + n
+            if end > len(buf):
+                break
+            events.append(decode(memoryview(buf)[pos + _LEN.size:end]))
+            pos = end
+        if pos:
+            del buf[:pos]
+        return events
+
+
+def read_events(stream):
+    """Yield events from a binary file object until EOF."""
+    while True:
+        head = stream.read(_LEN.size)
+        if len(head) < _LEN.size:
+            return
+        n = _LEN.unpack(head)[0]
+        body = stream.read(n)
+        if len(body) < n:
+            return
+        yield decode(body)
+
+
+def format_event(event):
+    """Render an event as the human-readable line the demos used to print."""
+    kind, flags, label = event.kind, event.flags, event.label
+    role = _ROLES.get(kind, "")
+    if kind in (READ, WRITE):
+        role += "-NoLock" if flags & FLAG_UNSYNC else "-Lock"
+    if kind == SEND:
+        return f"[{role}] sent: {label} ({event.size}B, t={event.ts_ns / 1e9:.3f})"
+    if kind == RECV:
+        latency = event.value / 1e9
+        if flags & FLAG_BOTTLENECK:
+            return f"⚠️ [{role}] Bottleneck detected! latency={latency:.3f}s for message '{label}'"
+        return f"[{role}] received: {label} (latency={latency:.3f}s)"
+    if kind == PUT:
+        if flags & FLAG_DROP:
+            return f"⚠️ [{role}] Queue full! couldn't put '{label}' within {event.value / 1e9:.1f}s"
+        return f"[{role}] put: {label}"
+    if kind == GET:
+        if flags & FLAG_END:
+            return f"[{role}] received termination token. Exiting."
+        return f"[{role}] got: {label}"
+    if kind == WRITE:
+        return f"[{role}] wrote {event.value}"
+    if kind == READ:
+        return f"[{role}] read {event.value}"
+    if kind == LOCK_ACQUIRE:
+        return f"[{label}] acquired lock (waited {event.value / 1e6:.3f}ms)"
+    if kind == DONE:
+        return f"[{label}] done."
+    if kind == RACE:
+        expected = event.size or 1
+        return (f"[Race] {label}: {event.value} lost updates out of {event.size} "
+                f"({event.value / expected:.2%})")
+    if kind == RESULT:
+        row = json.loads(label)
+        return f"[{event.channel}] result: " + ", ".join(
+            f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in row.items() if isinstance(v, (int, float, str)))
+    if kind == SAMPLE:
+        return f"[{event.channel}] {label}={event.value}"
+    if kind == LATENCY:
+        from latency_hist import format_summary
+        return format_summary(json.loads(label), f"[{event.channel}] ")
+    return label
+
+
+def severity(event):
+    """Classify an event for visualisation: "bottleneck", "race", "drop" or "ok".
+
+    "race" is reserved for measured lost updates (RACE events with value > 0);
+    an unsynchronized access on its own is not proof of a race.
+    """
+    if event.kind == RACE:
+        return "race" if event.value > 0 else "ok"
+    if event.flags & FLAG_BOTTLENECK:
+        return "bottleneck"
+    if event.flags & FLAG_DROP:
+        return "drop"
+    return "ok"
+
+
+def is_transfer(event):
+    """True for events that move data through an IPC channel."""
+    return event.kind in _ROLES
+
+
+class _TextSink:
+    def write(self, event):
+        # Single write + flush so lines from concurrent processes don't interleave
+        sys.stdout.write(format_event(event) + "\n")
+        sys.stdout.flush()
+
+
+def _record_lock(fd):
+    """fcntl.lockf if the fd takes POSIX record locks, else None (no fcntl,
+    or e.g. a pipe on a system that refuses them)."""
+    try:
+        import fcntl
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        fcntl.lockf(fd, fcntl.LOCK_UN)
+    except (ImportError, OSError):
+        return None
+    return fcntl
+
+
+class _BinarySink:
+    # A pipe keeps a single write of up to PIPE_BUF bytes whole, but a frame
+    # can be up to ~64 KiB (RESULT/LATENCY JSON), and a bigger write can be
+    # split and interleaved with other writers sharing the pipe -- small
+    # frames included. So every frame is written under a POSIX record lock on
+    # the fd, which all emitting processes take, plus a thread lock because
+    # record locks are per process. Where record locks aren't available, only
+    # frames up to PIPE_BUF are guaranteed whole.
+    def __init__(self, fd):
+        self.fd = fd
+        self._threads = threading.Lock()
+        self._fcntl = _record_lock(fd)
+
+    def write(self, event):
+        frame = memoryview(encode(event))
+        with self._threads:
+            if self._fcntl:
+                self._fcntl.lockf(self.fd, self._fcntl.LOCK_EX)
+            try:
+                while frame:
+                    frame = frame[os.write(self.fd, frame):]
+            finally:
+                if self._fcntl:
+                    self._fcntl.lockf(self.fd, self._fcntl.LOCK_UN)
+
+
+_sink = None
+
+
+def _get_sink():
+    global _sink
+    if _sink is None:
+        if os.environ.get(ENV_MODE) == "binary":
+            sys.stdout.flush()
+            _sink = _BinarySink(sys.stdout.fileno())
+        else:
+            _sink = _TextSink()
+    return _sink
+
+
+def emit(kind, channel, label="", size=0, value=0, flags=0):
+    """Record one IPC event from the calling process."""
+    _get_sink().write(Event(kind, flags, os.getpid(), time.monotonic_ns(),
+                            size, value, channel, label))
+
+
+def latency(channel, hist):
+    """Emit a latency histogram summary (p50..p99.9, max, plot buckets)."""
+    emit(LATENCY, channel, json.dumps(hist.summary(), separators=(",", ":")), value=hist.count)
+
+
+def result(channel, row):
+    """Emit a machine-readable result row (any JSON-serializable dict)."""
+    emit(RESULT, channel, json.dumps(row, separators=(",", ":")))
+
+
+def info(channel, text):
+    """Emit a free-form INFO line (status messages, banners)."""
+    emit(INFO, channel, text)
+
+
+if __name__ == "__main__":
+    # Headless consumer: python step1_demo.py --events --pipe | python ipc_events.py
+    for ev in read_events(sys.stdin.buffer):
+        print(format_event(ev), flush=True)
@@ -0,0 +1,139 @@
+# latency_hist.py
+# Fixed-size, log-bucketed latency histogram (HDR-style) on nanosecond values.
+# Values below 2**SUB_BITS are counted exactly; above that every power of two
+# is split into 2**(SUB_BITS-1) linear sub-buckets, so the relative error is
+# below 1 / 2**(SUB_BITS-1) (~1.6% with the default 7 bits). Recording is O(1)
+# and memory never grows, so a histogram can run for hours and histograms from
+# different processes can be merged by adding their counts.
+import array
+import json
+import math
+
+SUB_BITS = 7
+MAX_BITS = 44          # values up to 2**44 ns (~4.9 hours); larger ones clamp to the top bucket
+PERCENTILES = (50, 90, 99, 99.9)
+
+_HALF = 1 << (SUB_BITS - 1)
+_LINEAR = 1 << SUB_BITS
+_MAX_VALUE = (1 << MAX_BITS) - 1
+
+
+def _index(value):
+    if value < _LINEAR:
+        return value
+    e = value.bit_length() - SUB_BITS
+    return e * _HALF + (value >> e)
+
+
+def _bounds(index):
+    """Lowest and highest value that land in bucket `index`."""
+    if index < _LINEAR:
+        return index, index
+    e = index // _HALF - 1
+    m = index - e * _HALF
+    return m << e, ((m + 1) << e) - 1
+
+
+_BUCKETS = _index(_MAX_VALUE) + 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = array.array("Q", bytes(8 * _BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value_ns):
+        """Record one latency sample in nanoseconds (negative values count as 0)."""
+        if value_ns < 0:
+            value_ns = 0
+        elif value_ns > _MAX_VALUE:
+            value_ns = _MAX_VALUE
+        self.counts[_index(value_ns)] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+        if self.min is None or value_ns < self.min:
+            self.min = value_ns
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        return self
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0-100)."""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(p / 100.0 * self.count))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(_bounds(i)[1], self.max)
+        return self.max
+
+    def octaves(self):
+        """Counts folded into power-of-two buckets: [(upper_ns, count), ...] -- compact enough to plot."""
+        folded = {}
+        for i, c in enumerate(self.counts):
+            if c:
+                upper = _bounds(i)[1]
+                key = (1 << upper.bit_length()) - 1
+                folded[key] = folded.get(key, 0) + c
+        return sorted(folded.items())
+
+    def summary(self):
+        """Plain dict with count/min/mean/max, the standard percentiles and plot buckets."""
+        out = {
+            "count": self.count,
+            "min_ns": self.min or 0,
+            "mean_ns": self.total / self.count if self.count else 0,
+            "max_ns": self.max,
+        }
+        for p in PERCENTILES:
+            out[f"p{p:g}_ns"] = self.percentile(p)
+        out["buckets"] = self.octaves()
+        return out
+
+    def to_bytes(self):
+        """Serialize for sending between processes (see from_bytes)."""
+        head = json.dumps([self.count, self.total, self.min, self.max]).encode()
+        return len(head).to_bytes(4, "little") + head + self.counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        n = int.from_bytes(data[:4], "little")
+        hist = cls()
+        hist.count, hist.total, hist.min, hist.max = json.loads(bytes(data[4:4 + n]))
+        hist.counts = array.array("Q")
+        hist.counts.frombytes(bytes(data[4 + n:]))
+        return hist
+
+
+def format_summary(summary, name=""):
+    """One-line text view of a summary(): p50/p90/p99/p99.9/max in adaptive units."""
+    def fmt(ns):
+        if ns >= 1e9:
+            return f"{ns / 1e9:.2f}s"
+        if ns >= 1e6:
+            return f"{ns / 1e6:.2f}ms"
+        if ns >= 1e3:
+            return f"{ns / 1e3:.1f}us"
+        return f"{ns:.0f}ns"
+
+    parts = [f"{name}latency n={summary['count']}"]
+    for p in PERCENTILES:
+        parts.append(f"p{p:g}={fmt(summary[f'p{p:g}_ns'])}")
+    parts.append(f"max={fmt(summary['max_ns'])}")
+    return " ".join(parts)
+
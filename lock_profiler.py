@@ -0,0 +1,560 @@
+# lock_profiler.py
+# Instrumented locks for the shared-memory scenarios: how long processes wait
+# for a lock, how long they hold it and how often they find it already taken.
+#
+# ProfiledLock wraps a multiprocessing.Lock. acquire() first tries the lock
+# without blocking; only when that fails is the acquisition counted as
+# contended and the process blocks. release() records request, acquire and
+# release times into a LockStats: one row of 64-bit counters per process in a
+# RawArray (acquisitions, contended, shared, total/max wait, total/max hold)
+# followed by a ring of that process's last `timeline` acquisitions. A process
+# claims its row once, under a small claim lock, and is the row's only writer
+# from then on, so recording is a handful of array stores after the lock has
+# been released, outside the critical section. Timestamps are CLOCK_MONOTONIC
+# and therefore comparable across processes.
+#
+# Variants for comparison, all recording into one LockStats:
+#   mutex    one ProfiledLock around every access
+#   rw       ProfiledRWLock: many readers or one writer, writers preferred
+#   sharded  ShardedLock: `shards` ProfiledLocks, the record index picks one
+# run_comparison() drives the same read-mostly workload on a shared table of
+# records through each variant. profile() turns the counters into a summary
+# (contention ratio, wait/hold mean and max, per process) plus a timeline,
+# which LockTimeline draws on any Tk canvas.
+#
+#   python lock_profiler.py --variants mutex,rw,sharded --procs 4 --duration 2
+import argparse
+import os
+import random
+import time
+from multiprocessing import Barrier, Condition, Lock, Process, Queue, RawArray, RawValue
+
+import ipc_events as ev
+
+CHANNEL = "locks"
+VARIANTS = ("mutex", "rw", "sharded")
+MAX_PROCS = 32          # rows per LockStats; processes beyond that are not recorded
+TIMELINE = 256          # acquisitions kept per process
+EXPORT = 1200           # timeline entries carried in a profile (it must fit one event label)
+SHARDS = 4
+RECORDS = 16
+RECORD_WORDS = 8
+DEFAULT_READ_RATIO = 0.8
+DEFAULT_HOLD_US = 20
+DEFAULT_THINK_US = 20
+
+FIELDS = ("pid", "acquisitions", "contended", "shared", "wait_ns", "max_wait_ns", "hold_ns", "max_hold_ns")
+_PID, _ACQ, _CONT, _SHARED, _WAIT, _MAX_WAIT, _HOLD, _MAX_HOLD = range(len(FIELDS))
+_ENTRY = 4  # t_request, t_acquired, t_released, flags
+
+FLAG_CONTENDED = 1
+FLAG_SHARED = 2
+
+_pid = os.getpid()  # kept current in forked children, so record() needs no getpid() call
+
+
+def _after_fork():
+    global _pid
+    _pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only; spawned children re-import anyway
+    os.register_at_fork(after_in_child=_after_fork)
+
+WAIT_COLOR = "#F44336"
+HOLD_COLOR = "#4CAF50"
+SHARED_COLOR = "#2196F3"
+
+
+class LockStats:
+    """Per-process lock counters and timelines in shared memory.
+
+    Create it before starting the processes that use it; it travels to them
+    like any multiprocessing primitive. Each process records from one thread.
+    """
+
+    def __init__(self, max_procs=MAX_PROCS, timeline=TIMELINE):
+        self.max_procs = max_procs
+        self.timeline = timeline
+        self.row = len(FIELDS) + timeline * _ENTRY
+        self.counters = RawArray("q", max_procs * self.row)
+        self._used = RawValue("i", 0)
+        self._claim = Lock()
+        self._pid = None
+        self._base = -1
+
+    def _slot(self):
+        self._pid = _pid
+        with self._claim:
+            slot = self._used.value
+            if slot < self.max_procs:
+                self._used.value = slot + 1
+                self._base = slot * self.row
+                self.counters[self._base + _PID] = self._pid
+            else:
+                self._base = -1
+        return self._base
+
+    def record(self, t_request, t_acquired, t_released, flags):
+        """Add one acquisition of the calling process."""
+        base = self._base if self._pid == _pid else self._slot()
+        if base < 0:
+            return
+        c = self.counters
+        wait = t_acquired - t_request
+        hold = t_released - t_acquired
+        n = c[base + _ACQ]
+        c[base + _ACQ] = n + 1
+        if flags & FLAG_CONTENDED:
+            c[base + _CONT] += 1
+        if flags & FLAG_SHARED:
+            c[base + _SHARED] += 1
+        c[base + _WAIT] += wait
+        if wait > c[base + _MAX_WAIT]:
+            c[base + _MAX_WAIT] = wait
+        c[base + _HOLD] += hold
+        if hold > c[base + _MAX_HOLD]:
+            c[base + _MAX_HOLD] = hold
+        e = base + len(FIELDS) + (n % self.timeline) * _ENTRY
+        c[e] = t_request
+        c[e + 1] = t_acquired
+        c[e + 2] = t_released
+        c[e + 3] = flags
+
+    def rows(self):
+        """One dict of counters per recording process, with its timeline oldest first."""
+        c = self.counters
+        out = []
+        for slot in range(min(self._used.value, self.max_procs)):
+            base = slot * self.row
+            row = dict(zip(FIELDS, c[base:base + len(FIELDS)]))
+            n = row["acquisitions"]
+            ring = base + len(FIELDS)
+            row["timeline"] = [tuple(c[ring + (i % self.timeline) * _ENTRY:ring + (i % self.timeline + 1) * _ENTRY])
+                               for i in range(max(0, n - self.timeline), n)]
+            out.append(row)
+        return out
+
+
+class ProfiledLock:
+    """multiprocessing.Lock that records wait and hold times into a LockStats."""
+
+    def __init__(self, stats=None, lock=None):
+        self.stats = stats if stats is not None else LockStats()
+        self._lock = lock if lock is not None else Lock()
+        self._held = (0, 0, 0)
+        self.last_wait_ns = 0
+
+    def acquire(self, block=True, timeout=None):
+        t0 = time.monotonic_ns()
+        if self._lock.acquire(False):
+            flags = 0
+        elif block and self._lock.acquire(True, timeout):
+            flags = FLAG_CONTENDED
+        else:
+            return False
+        t1 = time.monotonic_ns()
+        self._held = (t0, t1, flags)
+        self.last_wait_ns = t1 - t0
+        return True
+
+    def release(self):
+        t0, t1, flags = self._held
+        t2 = time.monotonic_ns()
+        self._lock.release()
+        self.stats.record(t0, t1, t2, flags)
+
+    def read(self, key=None):
+        return self
+
+    def write(self, key=None):
+        return self
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Guard:
+    def __init__(self, lock, shared):
+        self.lock = lock
+        self.shared = shared
+
+    def __enter__(self):
+        self.lock.acquire(self.shared)
+        return self.lock
+
+    def __exit__(self, *exc):
+        self.lock.release(self.shared)
+
+
+class ProfiledRWLock:
+    """Readers-writer lock: many readers or one writer, recorded like ProfiledLock.
+
+    A Condition guards the reader count and writer flags in shared memory.
+    Writers are preferred: once one waits, new readers queue behind it, so a
+    steady stream of readers cannot starve the writers.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats if stats is not None else LockStats()
+        self._cond = Condition(Lock())
+        self._state = RawArray("i", 3)  # active readers, writer active, writers waiting
+        self._held = (0, 0, 0)
+        self.last_wait_ns = 0
+
+    def acquire(self, shared=False):
+        t0 = time.monotonic_ns()
+        cond, s = self._cond, self._state
+        flags = FLAG_SHARED if shared else 0
+        if not cond.acquire(False):
+            flags |= FLAG_CONTENDED
+            cond.acquire()
+        try:
+            if shared:
+                if s[1] or s[2]:
+                    flags |= FLAG_CONTENDED
+                    while s[1] or s[2]:
+                        cond.wait()
+                s[0] += 1
+            else:
+                if s[0] or s[1]:
+                    flags |= FLAG_CONTENDED
+                    s[2] += 1
+                    while s[0] or s[1]:
+                        cond.wait()
+                    s[2] -= 1
+                s[1] = 1
+        finally:
+            cond.release()
+        t1 = time.monotonic_ns()
+        self._held = (t0, t1, flags)
+        self.last_wait_ns = t1 - t0
+        return True
+
+    def release(self, shared=False):
+        t0, t1, flags = self._held
+        t2 = time.monotonic_ns()
+        with self._cond:
+            if shared:
+                self._state[0] -= 1
+                if not self._state[0]:
+                    self._cond.notify_all()
+            else:
+                self._state[1] = 0
+                self._cond.notify_all()
+        self.stats.record(t0, t1, t2, flags)
+
+    def read(self, key=None):
+        return _Guard(self, True)
+
+    def write(self, key=None):
+        return _Guard(self, False)
+
+
+class ShardedLock:
+    """`shards` ProfiledLocks sharing one LockStats; integer keys pick a shard."""
+
+    def __init__(self, stats=None, shards=SHARDS):
+        self.stats = stats if stats is not None else LockStats()
+        self.locks = [ProfiledLock(self.stats) for _ in range(shards)]
+
+    def shard(self, key):
+        return self.locks[key % len(self.locks)]
+
+    def read(self, key):
+        return self.shard(key)
+
+    def write(self, key):
+        return self.shard(key)
+
+
+def make_lock(variant, stats=None, shards=SHARDS):
+    if variant == "mutex":
+        return ProfiledLock(stats)
+    if variant == "rw":
+        return ProfiledRWLock(stats)
+    if variant == "sharded":
+        return ShardedLock(stats, shards)
+    raise ValueError(f"unknown lock variant {variant!r} (choose from {', '.join(VARIANTS)})")
+
+
+def profile(stats, lock, elapsed_s=None, roles=None):
+    """Summary of a LockStats: totals, one row per process and a timeline.
+
+    The timeline starts where every process's ring is still complete, keeps
+    the last EXPORT acquisitions from there and is in microseconds from its
+    first request: [[process index, request, acquired, released, flags]].
+    """
+    roles = roles or {}
+    rows = stats.rows()
+    procs = []
+    for r in rows:
+        n = r["acquisitions"]
+        procs.append({
+            "pid": r["pid"],
+            "role": roles.get(r["pid"], f"pid {r['pid']}"),
+            "acquisitions": n,
+            "contended": r["contended"],
+            "shared": r["shared"],
+            "contention": r["contended"] / n if n else 0.0,
+            "wait_ms_mean": r["wait_ns"] / n / 1e6 if n else 0.0,
+            "wait_ms_max": r["max_wait_ns"] / 1e6,
+            "hold_ms_mean": r["hold_ns"] / n / 1e6 if n else 0.0,
+            "hold_ms_max": r["max_hold_ns"] / 1e6,
+        })
+
+    wrapped = [r["timeline"][0][0] for r in rows if r["acquisitions"] > stats.timeline]
+    entries = sorted((e[0], i, e[1], e[2], e[3]) for i, r in enumerate(rows) for e in r["timeline"])
+    if wrapped:
+        entries = [e for e in entries if e[0] >= max(wrapped)]
+    entries = entries[-EXPORT:]
+    origin = entries[0][0] if entries else 0
+    timeline = [[i, (req - origin) // 1000, (acq - origin) // 1000, (rel - origin) // 1000, flags]
+                for req, i, acq, rel, flags in entries]
+
+    acquisitions = sum(r["acquisitions"] for r in rows)
+    contended = sum(r["contended"] for r in rows)
+    wait_ns = sum(r["wait_ns"] for r in rows)
+    hold_ns = sum(r["hold_ns"] for r in rows)
+    return {
+        "lock": lock,
+        "processes": len(rows),
+        "acquisitions": acquisitions,
+        "contended": contended,
+        "contention_ratio": contended / acquisitions if acquisitions else 0.0,
+        "wait_ms_mean": wait_ns / acquisitions / 1e6 if acquisitions else 0.0,
+        "wait_ms_max": max((p["wait_ms_max"] for p in procs), default=0.0),
+        "hold_ms_mean": hold_ns / acquisitions / 1e6 if acquisitions else 0.0,
+        "hold_ms_max": max((p["hold_ms_max"] for p in procs), default=0.0),
+        "elapsed_s": elapsed_s,
+        "procs": procs,
+        "timeline": timeline,
+    }
+
+
+def format_profile(p):
+    lines = [f"[Locks] {p['lock']}: {p['acquisitions']} acquisitions, {p['contention_ratio']:.1%} contended, "
+             f"wait mean {p['wait_ms_mean']:.3f}ms max {p['wait_ms_max']:.3f}ms, "
+             f"hold mean {p['hold_ms_mean']:.3f}ms max {p['hold_ms_max']:.3f}ms",
+             f"{'process':<14} {'pid':>7} {'acquired':>9} {'contended':>9} {'wait mean':>10} "
+             f"{'wait max':>10} {'hold mean':>10} {'hold max':>10}"]
+    for r in p["procs"]:
+        lines.append(f"{r['role']:<14} {r['pid']:>7} {r['acquisitions']:>9} {r['contention']:>9.1%} "
+                     f"{r['wait_ms_mean']:>8.3f}ms {r['wait_ms_max']:>8.3f}ms "
+                     f"{r['hold_ms_mean']:>8.3f}ms {r['hold_ms_max']:>8.3f}ms")
+    return lines
+
+
+def report(p, channel=CHANNEL):
+    """Emit the summary table as INFO lines and the whole profile as a RESULT."""
+    for line in format_profile(p):
+        ev.info(channel, line)
+    ev.result(channel, p)
+
+
+# ---- comparison workload ----------------------------------------------------
+def _spin(us):
+    end = time.perf_counter() + us / 1e6
+    while time.perf_counter() < end:
+        pass
+
+
+def table_worker(lock, table, records, read_ratio, hold_us, think_us, duration, idx, barrier, results):
+    """Read or rewrite random records of `table` under `lock` until the deadline.
+
+    A write stores the new value into the first half of the record, works for
+    hold_us and then fills the second half, so a read that is not excluded
+    from a write sees a torn record.
+    """
+    rnd = random.Random(idx)
+    half = RECORD_WORDS // 2
+    reads = writes = torn = 0
+    barrier.wait()
+    start = time.monotonic()
+    deadline = start + duration
+    while time.monotonic() < deadline:
+        key = rnd.randrange(records)
+        base = key * RECORD_WORDS
+        if rnd.random() < read_ratio:
+            with lock.read(key):
+                words = table[base:base + RECORD_WORDS]
+                _spin(hold_us)
+            torn += words.count(words[0]) != RECORD_WORDS
+            reads += 1
+        else:
+            with lock.write(key):
+                value = table[base] + 1
+                for i in range(base, base + half):
+                    table[i] = value
+                _spin(hold_us)
+                for i in range(base + half, base + RECORD_WORDS):
+                    table[i] = value
+            writes += 1
+        _spin(think_us)
+    results.put({"worker": idx, "pid": os.getpid(), "reads": reads, "writes": writes, "torn": torn,
+                 "elapsed_s": time.monotonic() - start})
+
+
+def run_variant(variant, procs=4, duration=2.0, read_ratio=DEFAULT_READ_RATIO, hold_us=DEFAULT_HOLD_US,
+                think_us=DEFAULT_THINK_US, records=RECORDS, shards=SHARDS):
+    """Run the table workload under one lock variant and report its profile."""
+    lock = make_lock(variant, LockStats(), shards)
+    table = RawArray("q", records * RECORD_WORDS)
+    barrier = Barrier(procs)
+    results = Queue()
+    workers = [Process(target=table_worker,
+                       args=(lock, table, records, read_ratio, hold_us, think_us, duration, i, barrier, results))
+               for i in range(procs)]
+    for w in workers:
+        w.start()
+    rows = sorted((results.get() for _ in workers), key=lambda r: r["worker"])
+    for w in workers:
+        w.join()
+    elapsed = max(r["elapsed_s"] for r in rows)
+    p = profile(lock.stats, variant, elapsed, roles={r["pid"]: f"worker {r['worker']}" for r in rows})
+    ops = sum(r["reads"] + r["writes"] for r in rows)
+    p.update(reads=sum(r["reads"] for r in rows), writes=sum(r["writes"] for r in rows),
+             ops_per_s=ops / elapsed if elapsed else 0.0, torn_reads=sum(r["torn"] for r in rows),
+             read_ratio=read_ratio, hold_us=hold_us, shards=shards if variant == "sharded" else 1)
+    report(p)
+    return p
+
+
+def format_comparison(profiles):
+    lines = [f"{'lock':<8} {'ops/s':>10} {'contended':>10} {'wait mean':>10} {'wait max':>10} "
+             f"{'hold mean':>10} {'torn':>6}"]
+    for p in profiles:
+        lines.append(f"{p['lock']:<8} {p['ops_per_s']:>10.0f} {p['contention_ratio']:>10.1%} "
+                     f"{p['wait_ms_mean']:>8.3f}ms {p['wait_ms_max']:>8.3f}ms "
+                     f"{p['hold_ms_mean']:>8.3f}ms {p['torn_reads']:>6}")
+    return lines
+
+
+def run_comparison(variants=VARIANTS, procs=4, duration=2.0, read_ratio=DEFAULT_READ_RATIO,
+                   hold_us=DEFAULT_HOLD_US, think_us=DEFAULT_THINK_US, records=RECORDS, shards=SHARDS):
+    profiles = [run_variant(v, procs, duration, read_ratio, hold_us, think_us, records, shards)
+                for v in variants]
+    ev.info(CHANNEL, f"[Locks] {procs} procs, {records} records, {read_ratio:.0%} reads, "
+                     f"{hold_us}us hold, {duration:g}s per variant")
+    for line in format_comparison(profiles):
+        ev.info(CHANNEL, line)
+    return profiles
+
+
+# ---- Tk view ---------------------------------------------------------------------
+class LockTimeline:
+    """Contention summary and per-process wait/hold timeline of each lock profile.
+
+    add() takes any RESULT row and keeps the ones that are lock profiles (the
+    newest per lock); redraw() draws one band per profile, one row per process:
+    red from request to acquisition, green (blue for shared holds) while held.
+    """
+
+    def __init__(self, canvas, max_profiles=len(VARIANTS)):
+        self.canvas = canvas
+        self.max_profiles = max_profiles
+        self.profiles = {}  # lock -> profile
+        self._dirty = False
+
+    def clear(self):
+        self.canvas.delete("locks")
+        self.profiles.clear()
+
+    def add(self, row):
+        if "lock" not in row or "timeline" not in row:
+            return
+        self.profiles.pop(row["lock"], None)
+        self.profiles[row["lock"]] = row
+        while len(self.profiles) > self.max_profiles:
+            del self.profiles[next(iter(self.profiles))]
+        self._dirty = True
+
+    def show(self, row):
+        self.add(row)
+        self.redraw()
+
+    def redraw(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        c = self.canvas
+        c.delete("locks")
+        width, height = c.winfo_width(), c.winfo_height()
+        if width <= 1:
+            width, height = int(c.cget("width")), int(c.cget("height"))
+        font = ("Arial", 9)
+        y = 5
+        for p in self.profiles.values():
+            rate = f", {p['ops_per_s']:.0f} ops/s" if "ops_per_s" in p else ""
+            c.create_text(5, y, anchor="nw", font=font, tags="locks",
+                          text=f"{p['lock']}: {p['acquisitions']} acquisitions, "
+                               f"{p['contention_ratio']:.1%} contended, wait mean {p['wait_ms_mean']:.3f}ms "
+                               f"(max {p['wait_ms_max']:.3f}ms), hold mean {p['hold_ms_mean']:.3f}ms{rate}")
+            y += 15
+        for k, (text, color) in enumerate((("waiting", WAIT_COLOR), ("holding", HOLD_COLOR),
+                                           ("holding (shared)", SHARED_COLOR))):
+            c.create_text(width - 10, 5 + 15 * k, anchor="ne", text=text, fill=color, font=font, tags="locks")
+        if not self.profiles:
+            return
+        left, right = 110, width - 10
+        top = max(y, 50) + 5
+        band = (height - top) / len(self.profiles)
+        for p in self.profiles.values():
+            procs, timeline = p["procs"], p["timeline"]
+            span = max((e[3] for e in timeline), default=0) or 1
+            scale = (right - left) / span
+            c.create_text(5, top, anchor="nw", text=f"{p['lock']}  ({span / 1000:.1f}ms shown)",
+                          font=("Arial", 9, "bold"), tags="locks")
+            row_h = min(18.0, (band - 20) / max(1, len(procs)))
+            for i, r in enumerate(procs):
+                c.create_text(left - 5, top + 16 + (i + 0.5) * row_h, anchor="e", font=("Arial", 8),
+                              text=f"{r['role']} {r['contention']:.0%}", tags="locks")
+            for i, req, acq, rel, flags in timeline:
+                y0 = top + 16 + i * row_h + 1
+                y1 = y0 + row_h - 2
+                x_req, x_acq, x_rel = left + req * scale, left + acq * scale, left + rel * scale
+                if flags & FLAG_CONTENDED and x_acq - x_req >= 1:
+                    c.create_rectangle(x_req, y0, x_acq, y1, fill=WAIT_COLOR, width=0, tags="locks")
+                c.create_rectangle(x_acq, y0, max(x_rel, x_acq + 1), y1, width=0, tags="locks",
+                                   fill=SHARED_COLOR if flags & FLAG_SHARED else HOLD_COLOR)
+            top += band
+
+
+def show_plot(profiles):
+    import tkinter as tk
+    root = tk.Tk()
+    root.title("Lock contention")
+    canvas = tk.Canvas(root, width=1000, height=200 + 150 * len(profiles), bg="white")
+    canvas.pack(fill="both", expand=True)
+    root.update_idletasks()
+    timeline = LockTimeline(canvas, max_profiles=len(profiles))
+    for p in profiles:
+        timeline.add(p)
+    timeline.redraw()
+    root.mainloop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lock contention profile of mutex, reader-writer and sharded locks")
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--procs", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per variant")
+    parser.add_argument("--read-ratio", type=float, default=DEFAULT_READ_RATIO)
+    parser.add_argument("--hold-us", type=int, default=DEFAULT_HOLD_US, help="Work inside the lock")
+    parser.add_argument("--think-us", type=int, default=DEFAULT_THINK_US, help="Work between acquisitions")
+    parser.add_argument("--records", type=int, default=RECORDS)
+    parser.add_argument("--shards", type=int, default=SHARDS)
+    parser.add_argument("--plot", action="store_true", help="Show the timelines in a Tk window")
+    args = parser.parse_args(argv)
+    profiles = run_comparison(tuple(args.variants.split(",")), args.procs, args.duration, args.read_ratio,
+                              args.hold_us, args.think_us, args.records, args.shards)
+    if args.plot:
+        show_plot(profiles)
+
+
+if __name__ == "__main__":
+    main()
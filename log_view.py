@@ -0,0 +1,235 @@
+# log_view.py
+# Bounded, virtualized log pane replacing the ever-growing ScrolledText boxes.
+# LogBuffer keeps a fixed-capacity tail in memory and spills older lines to a
+# file on disk (with sparse offsets so they can be paged back in). LogView
+# renders only the rows that are visible and can filter by process or kind.
+import array
+import os
+import tempfile
+import tkinter as tk
+from collections import deque
+
+DEFAULT_CAPACITY = 20000   # lines kept in memory
+CHECKPOINT_EVERY = 1024    # one file offset remembered per this many spilled lines
+ALL = "all"
+
+
+class LogBuffer:
+    """Append-only log of (source, kind, text) entries with an on-disk spill file."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, spill_path=None):
+        self.capacity = capacity
+        self.tail = deque()
+        self.spilled = 0
+        self._spill_path = spill_path
+        self._owns_spill = spill_path is None
+        self._spill = None
+        self._offsets = array.array("q")
+        self._page_no = -1
+        self._page = []
+
+    def __len__(self):
+        return self.spilled + len(self.tail)
+
+    def append(self, source, kind, text):
+        self.tail.append((source, kind, text))
+        if len(self.tail) > self.capacity:
+            self._spill_entry(self.tail.popleft())
+
+    def extend(self, entries):
+        for source, kind, text in entries:
+            self.append(source, kind, text)
+
+    def _spill_entry(self, entry):
+        if self._spill is None:
+            if self._spill_path is None:
+                fd, self._spill_path = tempfile.mkstemp(prefix="ipc_log_", suffix=".log")
+                self._owns_spill = True
+                self._spill = os.fdopen(fd, "w+b")
+            else:
+                self._spill = open(self._spill_path, "w+b")
+        if self.spilled % CHECKPOINT_EVERY == 0:
+            self._spill.seek(0, os.SEEK_END)
+            self._offsets.append(self._spill.tell())
+        source, kind, text = entry
+        line = "\t".join((source, kind, text.replace("\n", " "))) + "\n"
+        self._spill.write(line.encode("utf-8"))
+        self.spilled += 1
+
+    def _load_page(self, page_no):
+        """Page one checkpoint block of spilled lines back into memory."""
+        self._spill.flush()
+        self._spill.seek(self._offsets[page_no])
+        count = min(CHECKPOINT_EVERY, self.spilled - page_no * CHECKPOINT_EVERY)
+        page = []
+        for _ in range(count):
+            source, kind, text = self._spill.readline().decode("utf-8").rstrip("\n").split("\t", 2)
+            page.append((source, kind, text))
+        self._spill.seek(0, os.SEEK_END)
+        self._page_no, self._page = page_no, page
+
+    def get(self, index):
+        if index >= self.spilled:
+            return self.tail[index - self.spilled]
+        page_no = index // CHECKPOINT_EVERY
+        if page_no != self._page_no or index % CHECKPOINT_EVERY >= len(self._page):
+            self._load_page(page_no)
+        return self._page[index % CHECKPOINT_EVERY]
+
+    def clear(self):
+        self.close()
+        self.tail.clear()
+        self.spilled = 0
+        self._offsets = array.array("q")
+        self._page_no, self._page = -1, []
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            if self._owns_spill:
+                try:
+                    os.remove(self._spill_path)
+                except OSError:
+                    pass
+                self._spill_path = None
+
+
+class LogView(tk.Frame):
+    """Virtualized log pane: a fixed-size Text that only ever holds the visible rows.
+
+    With no filter the scrollbar spans the whole log (spilled + in memory).
+    With a process/kind filter it spans the matching lines of the in-memory tail.
+    """
+
+    def __init__(self, parent, height=20, width=100, capacity=DEFAULT_CAPACITY,
+                 spill_path=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.buffer = LogBuffer(capacity, spill_path)
+        self.rows = height
+        self.first = 0
+        self.follow = True
+        self._matches = None     # filtered indices into buffer.tail, or None
+
+        bar = tk.Frame(self)
+        bar.pack(fill="x")
+        tk.Label(bar, text="Process:").pack(side="left")
+        self.source_var = tk.StringVar(value=ALL)
+        self.source_menu = tk.OptionMenu(bar, self.source_var, ALL)
+        self.source_menu.pack(side="left")
+        tk.Label(bar, text="Event:").pack(side="left")
+        self.kind_var = tk.StringVar(value=ALL)
+        self.kind_menu = tk.OptionMenu(bar, self.kind_var, ALL)
+        self.kind_menu.pack(side="left")
+        self.count_label = tk.Label(bar, text="0 lines")
+        self.count_label.pack(side="right")
+        self.source_var.trace_add("write", lambda *_: self._filter_changed())
+        self.kind_var.trace_add("write", lambda *_: self._filter_changed())
+        self._sources = set()
+        self._kinds = set()
+
+        body = tk.Frame(self)
+        body.pack(fill="both", expand=True)
+        self.text = tk.Text(body, height=height, width=width, wrap="none")
+        self.scrollbar = tk.Scrollbar(body, command=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", fill="both", expand=True)
+        self.text.bind("<MouseWheel>", lambda e: self._scroll_lines(-3 if e.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda e: self._scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda e: self._scroll_lines(3))
+
+    # ---- data -------------------------------------------------------
+    def extend(self, entries):
+        """Append (source, kind, text) entries; redraws at most once."""
+        entries = list(entries)
+        self.buffer.extend(entries)
+        for source, kind, _ in entries:
+            if source not in self._sources:
+                self._sources.add(source)
+                self.source_menu["menu"].add_command(
+                    label=source, command=tk._setit(self.source_var, source))
+            if kind not in self._kinds:
+                self._kinds.add(kind)
+                self.kind_menu["menu"].add_command(
+                    label=kind, command=tk._setit(self.kind_var, kind))
+        if self._matches is not None:
+            self._rebuild_matches()
+        self.refresh()
+
+    def clear(self):
+        self.buffer.clear()
+        self.first = 0
+        self.follow = True
+        filtered = self.source_var.get() != ALL or self.kind_var.get() != ALL
+        self._matches = [] if filtered else None
+        # Start the menus over; an active filter keeps its own entry
+        self._sources = self._reset_menu(self.source_menu, self.source_var)
+        self._kinds = self._reset_menu(self.kind_menu, self.kind_var)
+        self.refresh()
+
+    def _reset_menu(self, option_menu, var):
+        menu = option_menu["menu"]
+        menu.delete(0, "end")
+        keep = {var.get()} - {ALL}
+        for label in [ALL] + sorted(keep):
+            menu.add_command(label=label, command=tk._setit(var, label))
+        return keep
+
+    # ---- filtering ----------------------------------------------------
+    def _filter_changed(self):
+        if self.source_var.get() == ALL and self.kind_var.get() == ALL:
+            self._matches = None
+        else:
+            self._rebuild_matches()
+        self.follow = True
+        self.refresh()
+
+    def _rebuild_matches(self):
+        source, kind = self.source_var.get(), self.kind_var.get()
+        self._matches = [
+            i for i, (s, k, _) in enumerate(self.buffer.tail)
+            if (source == ALL or s == source) and (kind == ALL or k == kind)
+        ]
+
+    def _total(self):
+        return len(self.buffer) if self._matches is None else len(self._matches)
+
+    def _line(self, i):
+        if self._matches is None:
+            return self.buffer.get(i)[2]
+        return self.buffer.tail[self._matches[i]][2]
+
+    # ---- scrolling / rendering ------------------------------------------
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.first = int(float(amount) * self._total())
+        elif unit == "pages":
+            self.first += int(amount) * self.rows
+        else:
+            self.first += int(amount)
+        self.follow = self.first >= self._total() - self.rows
+        self.refresh()
+
+    def _scroll_lines(self, n):
+        self._on_scroll("scroll", n, "units")
+        return "break"
+
+    def refresh(self):
+        total = self._total()
+        if self.follow:
+            self.first = total - self.rows
+        self.first = max(0, min(self.first, total - self.rows))
+        last = min(total, self.first + self.rows)
+        lines = [self._line(i) for i in range(self.first, last)]
+
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        if total:
+            self.scrollbar.set(self.first / total, last / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.count_label.config(text=f"{len(self.buffer)} lines ({self.buffer.spilled} on disk)")
+
+    def destroy(self):
+        self.buffer.close()
+        super().destroy()
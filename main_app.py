@@ -1,63 +1,18 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext
-import subprocess
+from tkinter import ttk
 import threading
-import sys
 import time
 
-
-
-def animate_arrows(canvas, arrow1, arrow2, color):
-    canvas.itemconfig(arrow1, fill=color, width=3)
-    canvas.update()
-    time.sleep(0.20)
-
-    canvas.itemconfig(arrow2, fill=color, width=3)
-    canvas.update()
-    time.sleep(0.20)
-
-    canvas.itemconfig(arrow1, fill="black", width=2)
-    canvas.itemconfig(arrow2, fill="black", width=2)
-    canvas.update()
-
-
-
-def run_ipc_process(command, output_box, status_label, canvas, arrow1, arrow2, ipc_label_widget):
-
-    ipc_mode = command[-1]   # last argument → --pipe / --queue / --shm / --shm-nolock
-
-    def task():
-        status_label.config(text="Running...", fg="blue")
-        output_box.delete("1.0", tk.END)
-
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        for line in process.stdout:
-            output_box.insert(tk.END, line)
-            output_box.see(tk.END)
-
-           
-            if ipc_mode == "--pipe":
-                animate_arrows(canvas, arrow1, arrow2, "yellow")   # bottleneck demo
-
-            elif ipc_mode == "--queue":
-                animate_arrows(canvas, arrow1, arrow2, "green")
-
-            elif ipc_mode == "--shm":
-                animate_arrows(canvas, arrow1, arrow2, "green")    # safe with lock
-
-            elif ipc_mode == "--shm-nolock":
-                animate_arrows(canvas, arrow1, arrow2, "red")      # race condition
-
-        process.wait()
-        status_label.config(text="Finished", fg="green")
-
-    threading.Thread(target=task).start()
+from async_ingest import RunDashboard
+from backlog_monitor import BacklogMonitor, BacklogPlot, channel_sources
+from frame_renderer import ArrowFlowView, FrameRenderer
+from log_view import LogView
+from deadlock_engine import WaitForGraph
+from dining_philosophers import STRATEGIES, DiningTable
+from graph_canvas import GraphCanvas
+from lock_profiler import LockTimeline
+from proc_attach import ProcScanner, ends_by_role
+from trace_player import TracePlayerControls
 
 
 class DeadlockTab:
@@ -79,29 +34,25 @@ class DeadlockTab:
         self.canvas = tk.Canvas(self.frame, width=900, height=450, bg="white")
         self.canvas.pack(pady=10)
 
-        # Philosopher positions
-        self.positions = [
-            (450, 100),
-            (220, 200),
-            (320, 380),
-            (580, 380),
-            (680, 200),
-        ]
-
-        # Circles (philosophers)
-        self.philosophers = []
-        for x, y in self.positions:
-            p = self.canvas.create_oval(x - 40, y - 40, x + 40, y + 40,
-                                        fill="lightgray", outline="black", width=2)
-            self.philosophers.append(p)
-
-        # State labels under philosophers
-        self.state_labels = []
-        for i, (x, y) in enumerate(self.positions):
-            t = self.canvas.create_text(
-                x, y + 65, text=f"P{i} - thinking", font=("Arial", 11)
-            )
-            self.state_labels.append(t)
+        # Philosophers: layout cached per table size, states drawn once per frame
+        self.graph_view = GraphCanvas(
+            self.canvas,
+            colors={
+                self.THINKING: "lightgray",
+                self.HUNGRY: "yellow",
+                self.EATING: "lightgreen",
+                self.DEADLOCK: "red"
+            },
+            severity=[self.DEADLOCK, self.HUNGRY, self.EATING, self.THINKING],
+            texts={
+                self.THINKING: "thinking",
+                self.HUNGRY: "waiting",
+                self.EATING: "eating",
+                self.DEADLOCK: "deadlocked"
+            },
+        )
+        self.n_philosophers = 5
+        self.graph_view.set_nodes(self.n_philosophers)
 
         # Buttons
         btn_frame = tk.Frame(self.frame)
@@ -117,108 +68,329 @@ class DeadlockTab:
             bg="#4CAF50", fg="white", command=self.resolve_deadlock
         ).grid(row=0, column=1, padx=20)
 
+        # Real run: philosopher threads with one lock per fork
+        self.strategy = tk.StringVar(value=STRATEGIES[0])
+        tk.OptionMenu(btn_frame, self.strategy, *STRATEGIES).grid(row=1, column=0, pady=10)
+        run_row = tk.Frame(btn_frame)
+        run_row.grid(row=1, column=1)
+        tk.Button(run_row, text="Run", width=9, bg="#2196F3", fg="white",
+                  command=self.run_table).pack(side="left", padx=2)
+        tk.Button(run_row, text="Stop", width=9, command=self.stop_table).pack(side="left", padx=2)
+        size_row = tk.Frame(btn_frame)
+        size_row.grid(row=1, column=2, padx=20)
+        tk.Label(size_row, text="Philosophers:").pack(side="left")
+        self.size = tk.Spinbox(size_row, from_=2, to=2000, width=6)
+        self.size.delete(0, "end")
+        self.size.insert(0, "5")
+        self.size.pack(side="left")
+        self.table = None
+        self.renderer = FrameRenderer(self.frame, self._apply_frame)
+        self.renderer.start()
+
+        # Which processes/forks form the cycle, as reported by the engine
+        self.info = tk.Label(self.frame, text="", font=("Arial", 11))
+        self.info.pack()
+
         self.running = False
         self.deadlock_detected = False
+        self.graph = WaitForGraph()
+        self.deadlock = None
 
-        # NEW: store cycle arrows so we can delete after resolve
+        # edges of the cycle currently drawn
         self.cycle_arrows = []
 
     # -------------------------------------------------
     # UPDATE PHILOSOPHER STATE
     # -------------------------------------------------
     def _set_state(self, idx, state):
-        colors = {
-            self.THINKING: "lightgray",
-            self.HUNGRY: "yellow",
-            self.EATING: "lightgreen",
-            self.DEADLOCK: "red"
-        }
-        texts = {
-            self.THINKING: "thinking",
-            self.HUNGRY: "waiting",
-            self.EATING: "eating",
-            self.DEADLOCK: "deadlocked"
-        }
-
-        self.canvas.itemconfig(self.philosophers[idx], fill=colors[state])
-        self.canvas.itemconfig(self.state_labels[idx], text=f"P{idx} - {texts[state]}")
-        self.canvas.update()
+        self.graph_view.set_state(idx, state)
+
+    def _resize(self):
+        """Pick up the table size from the spinbox; rebuilds the drawing if it changed."""
+        try:
+            n = max(2, int(self.size.get()))
+        except ValueError:
+            n = self.n_philosophers
+        if n != self.n_philosophers:
+            self.n_philosophers = n
+            self.cycle_arrows = []
+            self.graph_view.set_nodes(n)
+
+    def _state_of(self, pid):
+        """Philosopher state as the wait-for graph sees it."""
+        if self.graph.in_deadlock(pid):
+            return self.DEADLOCK
+        held = len(self.graph.held.get(pid, ()))
+        if held == 2:
+            return self.EATING
+        if held or pid in self.graph.waiting:
+            return self.HUNGRY
+        return self.THINKING
+
+    def _sync_states(self):
+        for i in range(self.n_philosophers):
+            self._set_state(i, self._state_of(i))
 
     def simulate_deadlock(self):
-        if self.running:
+        if self.running or self.table is not None:
             return
         self.running = True
-        threading.Thread(target=self._simulate_sequence).start()
-
-    def _simulate_sequence(self):
-        # All become hungry → circular wait
-        for i in range(5):
-            self._set_state(i, self.HUNGRY)
-            time.sleep(0.6)
-
-        # Show circular arrows
-        self._show_cycle()
-
-        # All deadlocked
-        for i in range(5):
-            self._set_state(i, self.DEADLOCK)
-
-        self.deadlock_detected = True
-        self.running = False
+        self._resize()
+        self._clear_cycle()
+        self.graph = WaitForGraph()
+        self.deadlock = None
+        self._sync_states()
+        n = self.n_philosophers
+        # Naive order: everyone takes their left fork, then reaches for the right one
+        steps = [(i, i) for i in range(n)] + [(i, (i + 1) % n) for i in range(n)]
+        self.info.config(text="Requesting forks...", fg="black")
+        self._simulate_step(steps, 0)
+
+    def _simulate_step(self, steps, k):
+        if k == len(steps):
+            self.running = False
+            if self.deadlock is None:
+                self.info.config(text="No deadlock detected", fg="green")
+            return
+        pid, fork = steps[k]
+        if pid not in self.graph.waiting:
+            deadlock = self.graph.request(pid, fork)
+            if deadlock:
+                self.deadlock = deadlock
+                self.deadlock_detected = True
+                self._show_cycle(deadlock)
+                self._sync_states()
+            else:
+                self._set_state(pid, self._state_of(pid))
+        # big tables are stepped faster so the setup doesn't take minutes
+        self.frame.after(max(1, 3000 // len(steps)), self._simulate_step, steps, k + 1)
 
-  
     def resolve_deadlock(self):
-        if not self.deadlock_detected:
+        if not self.deadlock_detected or self.deadlock is None or self.table is not None:
             return
-
-        import random
-        chosen = random.randint(0, 4)
-
-        # One philosopher eats (break cycle)
-        self._set_state(chosen, self.EATING)
-        time.sleep(0.5)
-
-        # Others go back to thinking
-        for i in range(5):
-            if i != chosen:
-                self._set_state(i, self.THINKING)
-
-        # NEW: remove all cycle arrows
-        for a in self.cycle_arrows:
-            self.canvas.delete(a)
-
-        self.cycle_arrows = []
-        self.canvas.update()
-
+        victim, freed = self.graph.resolve(self.deadlock)
+        handed = ", ".join(f"F{fork} -> P{pid}" for fork, pid in freed.items() if pid is not None)
+        self.info.config(text=f"Aborted P{victim} (released {', '.join(f'F{f}' for f in freed)}); "
+                              f"{handed or 'no waiters'}", fg="green")
+        self._clear_cycle()
+        self._sync_states()
+        self.deadlock = None
         self.deadlock_detected = False
 
-    def _show_cycle(self):
+    # -------------------------------------------------
+    # REAL EXECUTION (dining_philosophers.DiningTable)
+    # -------------------------------------------------
+    def run_table(self):
+        if self.running or self.table is not None:
+            return
+        self._resize()
+        self._clear_cycle()
+        self.deadlock = None
+        self.deadlock_detected = False
+        strategy = self.strategy.get()
+        post = self.renderer.post
+        self.table = DiningTable(
+            self.n_philosophers, strategy, think_s=0.5, eat_s=0.5, timeout_s=0.4, reach_s=0.3,
+            on_state=lambda pid, state: post(("state", pid, state)),
+            on_deadlock=lambda d: post(("deadlock", d)))
+        self.graph = self.table.graph
+        self.info.config(text=f"Running {strategy}...", fg="blue")
+        table = self.table
+        threading.Thread(target=lambda: post(("done", table.run(duration=30.0))), daemon=True).start()
+
+    def stop_table(self):
+        if self.table is not None:
+            self.table.stop()
+
+    def _apply_frame(self, items):
+        """Once per frame: latest state per philosopher, then any deadlock/result."""
+        latest = {}
+        for item in items:
+            if item[0] == "state":
+                latest[item[1]] = item[2]
+            elif item[0] == "deadlock":
+                self.deadlock = item[1]
+                self._show_cycle(item[1])
+            elif item[0] == "done":
+                row = item[1]
+                self.table = None
+                ttd = row["time_to_deadlock_s"]
+                self.info.config(
+                    text=f"{row['strategy']}: {row['meals']} meals ({row['meals_per_s']:.2f}/s), "
+                         f"wait p99 {row['wait_p99_ns'] / 1e9:.2f}s, starved {row['starved']}"
+                         + (f", deadlock after {ttd:.2f}s" if ttd is not None else ""),
+                    fg="red" if ttd is not None else "green")
+        for pid, state in latest.items():
+            self._set_state(pid, state)
+        self.graph_view.flush()  # already on a frame boundary: draw now
+
+    def _clear_cycle(self):
+        self.graph_view.set_edges([])
         self.cycle_arrows = []
 
-        # create cycle arrows one by one
-        for i in range(5):
-            x1, y1 = self.positions[i]
-            x2, y2 = self.positions[(i + 1) % 5]
-
-            arrow = self.canvas.create_line(
-                x1, y1, x2, y2, arrow=tk.LAST, width=3, fill="orange"
-            )
-            self.cycle_arrows.append(arrow)
-
-            self.canvas.update()
-            time.sleep(0.25)
-
-        # Flash cycle red/orange
-        for _ in range(2):
-            for a in self.cycle_arrows:
-                self.canvas.itemconfig(a, fill="red")
-            self.canvas.update()
-            time.sleep(0.3)
-
-            for a in self.cycle_arrows:
-                self.canvas.itemconfig(a, fill="orange")
-            self.canvas.update()
-            time.sleep(0.3)
+    def _show_cycle(self, deadlock):
+        """Draw the cycle the engine reported: P[i] waits for F[i] held by P[i+1]."""
+        procs, forks = deadlock.processes, deadlock.resources
+        self.cycle_arrows = [(pid, procs[(i + 1) % len(procs)]) for i, pid in enumerate(procs)]
+        self.graph_view.set_edges(self.cycle_arrows)
+        shown = list(zip(procs, forks))[:8]
+        self.info.config(
+            text="Deadlock: " + " -> ".join(f"P{p} (waits F{f})" for p, f in shown)
+                 + (f" -> ... ({len(procs)} processes)" if len(procs) > len(shown) else f" -> P{procs[0]}"),
+            fg="red")
+        self._flash_cycle(4)
+
+    def _flash_cycle(self, remaining):
+        if not remaining or not self.cycle_arrows:
+            return
+        self.graph_view.color_edges("red" if remaining % 2 == 0 else "orange")
+        self.frame.after(300, self._flash_cycle, remaining - 1)
+
+
+class AttachWindow:
+    """Live IPC topology of real processes, drawn as Process A -> IPC -> Process B rows.
+
+    Pipes and Unix sockets between them are sampled for unread bytes by a
+    BacklogMonitor; each row shows its current backlog and the plot below
+    draws every channel that has had one, over time.
+    """
+
+    ROW_H = 70
+    KIND_COLORS = {"pipe": "#FFF3B0", "unix": "#D7E3FC", "shm": "#FFD6A5"}
+
+    def __init__(self, root):
+        self.win = tk.Toplevel(root)
+        self.win.title("Attach to processes")
+        self.win.geometry("1000x760")
+
+        top = tk.Frame(self.win)
+        top.pack(fill="x", pady=5)
+        tk.Label(top, text="PIDs or name filter:").pack(side="left", padx=5)
+        self.target = tk.Entry(top, width=40)
+        self.target.pack(side="left")
+        tk.Label(top, text="Backlog every (s):").pack(side="left", padx=5)
+        self.interval = tk.Entry(top, width=6)
+        self.interval.insert(0, "0.1")
+        self.interval.pack(side="left")
+        tk.Button(top, text="Attach", width=10, bg="#4CAF50", fg="white",
+                  command=self.start).pack(side="left", padx=5)
+        tk.Button(top, text="Detach", width=10, command=self.stop).pack(side="left")
+        self.status = tk.Label(top, text="Idle", font=("Arial", 11))
+        self.status.pack(side="left", padx=10)
+
+        plot_canvas = tk.Canvas(self.win, height=160, bg="white")
+        plot_canvas.pack(side="bottom", fill="x")
+        self.plot = BacklogPlot(plot_canvas, skip_idle=True)
+
+        body = tk.Frame(self.win)
+        body.pack(fill="both", expand=True)
+        self.canvas = tk.Canvas(body, bg="white")
+        scroll = tk.Scrollbar(body, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scroll.set)
+        scroll.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self._stop = threading.Event()
+        self._signature = None
+        self._backlog_items = {}  # channel label -> text item in its row
+        self.renderer = FrameRenderer(self.win, self._apply)
+        self.renderer.start()
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+    def start(self):
+        self.stop()
+        words = self.target.get().split()
+        pids = [int(w) for w in words if w.isdigit()]
+        names = [w for w in words if not w.isdigit()]
+        try:
+            interval = max(0.005, float(self.interval.get()))
+        except ValueError:
+            interval = 0.1
+        self._stop = threading.Event()
+        self._signature = None
+        self.plot.clear()
+        monitor = BacklogMonitor(interval=interval, emit_events=False,
+                                 on_sample=lambda t, readings: self.renderer.post(("backlog", t, readings)))
+        threading.Thread(target=self._poll, args=(ProcScanner(pids, names), monitor, self._stop),
+                         daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        self.renderer.stop()
+        self.win.destroy()
+
+    def _poll(self, scanner, monitor, stop):
+        # This thread owns the monitor, so no source is opened after it stops
+        monitor.start()
+        try:
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                topo = scanner.scan()
+                monitor.set_sources(channel_sources(topo, monitor.sources))
+                self.renderer.post(("scan", topo, time.perf_counter() - t0))
+                stop.wait(1.0)
+        finally:
+            monitor.stop()
+
+    def _apply(self, items):
+        scans = [item for item in items if item[0] == "scan"]
+        if scans:
+            self._apply_scan(*scans[-1][1:])  # only the newest scan matters
+        latest = {}
+        for item in items:
+            if item[0] == "backlog":
+                _, t, readings = item
+                for name, value in readings.items():
+                    self.plot.add(name, t, value)
+                latest.update(readings)
+        for name, value in latest.items():
+            text = self._backlog_items.get(name)
+            if text is not None:
+                self.canvas.itemconfigure(text, text="backlog ?" if value < 0 else f"{value} B unread",
+                                          fill="red" if value > 0 else "gray30")
+        self.plot.redraw()
+
+    def _apply_scan(self, topo, scan_s):
+        self.status.config(text=f"{len(topo.processes)} processes, {len(topo.channels)} channels, "
+                                f"scan {scan_s * 1e3:.1f} ms", fg="blue")
+        signature = (tuple(sorted(topo.processes.items())), topo.channels)
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._draw(topo)
+
+    def _draw(self, topo):
+        c = self.canvas
+        c.delete("all")
+        self._backlog_items = {}
+
+        def label(pids):
+            if not pids:
+                return "?"
+            text = "\n".join(f"{topo.processes.get(p, '?')} ({p})" for p in pids[:3])
+            return text + (f"\n+{len(pids) - 3} more" if len(pids) > 3 else "")
+
+        for row, ch in enumerate(topo.channels):
+            y = 20 + row * self.ROW_H
+            src, dst = ends_by_role(ch)
+            c.create_rectangle(30, y, 260, y + 50, fill="#BDE0FE", outline="black", width=2)
+            c.create_text(145, y + 25, text=label(src), font=("Arial", 9))
+            c.create_rectangle(370, y, 610, y + 50, fill=self.KIND_COLORS[ch.kind], outline="black", width=2)
+            c.create_text(490, y + 18, text=ch.label, font=("Arial", 9, "bold"))
+            if ch.kind != "shm":
+                self._backlog_items[ch.label] = c.create_text(490, y + 36, text="", font=("Arial", 9))
+            c.create_rectangle(720, y, 950, y + 50, fill="#C4F7C3", outline="black", width=2)
+            c.create_text(835, y + 25, text=label(dst), font=("Arial", 9))
+            both = tk.BOTH if ch.kind != "pipe" else tk.LAST
+            c.create_line(260, y + 25, 370, y + 25, arrow=both, width=2)
+            c.create_line(610, y + 25, 720, y + 25, arrow=both, width=2)
+        if not topo.channels:
+            c.create_text(490, 40, text="No shared pipes, sockets or shared memory between these processes",
+                          font=("Arial", 11))
+        c.configure(scrollregion=(0, 0, 980, 40 + len(topo.channels) * self.ROW_H))
 
 
 def main():
@@ -252,41 +424,81 @@ def main():
     arrow1 = canvas.create_line(240, 120, 380, 120, arrow=tk.LAST, width=2)
     arrow2 = canvas.create_line(560, 120, 700, 120, arrow=tk.LAST, width=2)
 
+    # Unread bytes in the pipe over time (FIONREAD samples from the demo)
+    plot_canvas = tk.Canvas(ipc_tab, width=1100, height=140, bg="white")
+    plot_canvas.pack()
+    plot = BacklogPlot(plot_canvas)
+
     # Output area
-    output_box = scrolledtext.ScrolledText(ipc_tab, height=20, width=125)
+    output_box = LogView(ipc_tab, height=14, width=125)
     output_box.pack(pady=10)
 
     status_label = tk.Label(ipc_tab, text="Idle", font=("Arial", 12))
     status_label.pack()
 
+    # Lock profiles (SHM (Lock) runs and the lock comparisons) land on their own tab
+    lock_tab = ttk.Frame(notebook)
+    lock_canvas = tk.Canvas(lock_tab, width=1100, height=650, bg="white")
+    lock_canvas.pack(fill="both", expand=True, padx=10, pady=10)
+    locks = LockTimeline(lock_canvas)
+
+    view = ArrowFlowView(root, output_box, status_label, canvas, (arrow1, arrow2), plot=plot, locks=locks)
+
+    # Every run, however many at once, is read by the dashboard's single ingest
+    # thread (the warm worker when one is running) and recorded to a trace
+    dashboard = RunDashboard(ipc_tab, view)
+
     # Buttons
     btn_frame = tk.Frame(ipc_tab)
     btn_frame.pack(pady=15)
 
     buttons = [
-        ("Pipe", "--pipe", "#4CAF50", "Pipe"),
-        ("Queue", "--queue", "#2196F3", "Queue"),
-        ("SHM (Lock)", "--shm", "#FF9800", "SHM (Lock)"),
-        ("SHM (No Lock)", "--shm-nolock", "#F44336", "SHM (No Lock)"),
+        ("Pipe", ["--pipe", "--backlog-interval", "0.25"], "#4CAF50", "Pipe"),
+        ("Pipe (Slow Reader)", ["--pipe", "--sender-delay", "0.05", "--receiver-delay", "0.3",
+                                "--messages", "30", "--backlog-interval", "0.05"], "#388E3C", "Pipe"),
+        ("Queue", ["--queue"], "#2196F3", "Queue"),
+        ("SHM (Lock)", ["--shm"], "#FF9800", "SHM (Lock)"),
+        ("SHM (No Lock)", ["--shm-nolock"], "#F44336", "SHM (No Lock)"),
     ]
 
+    tk.Button(
+        btn_frame, text="Attach...", width=12, height=2,
+        command=lambda: AttachWindow(root)
+    ).grid(row=0, column=len(buttons), padx=10)
+
     for idx, (btn_text, cmd, color, ipc_text) in enumerate(buttons):
         tk.Button(
-            btn_frame, text=btn_text, width=22, height=2,
+            btn_frame, text=btn_text, width=18, height=2,
             bg=color, fg="white",
-            command=lambda c=cmd, it=ipc_text: [
+            command=lambda c=cmd, it=ipc_text, t=btn_text: [
                 canvas.itemconfig(ipc_label, text=it),
-                run_ipc_process(
-                    [sys.executable, "step1_demo.py", c],
-                    output_box, status_label, canvas, arrow1, arrow2, ipc_label
-                )
+                dashboard.run(c, label=t)
             ]
-        ).grid(row=0, column=idx, padx=15)
+        ).grid(row=0, column=idx, padx=10)
+
+    dashboard.pack(fill="x", padx=10)
+    TracePlayerControls(ipc_tab, view).pack(pady=5)
 
    
     deadlock_tab = DeadlockTab(notebook)
     notebook.add(deadlock_tab.frame, text="Deadlock Visualizer")
 
+    lock_btns = tk.Frame(lock_tab)
+    lock_btns.pack(pady=10)
+    lock_runs = [
+        ("Mutex", ["--lock-profile", "mutex"], "#FF9800"),
+        ("Reader-Writer", ["--lock-profile", "rw"], "#2196F3"),
+        ("Sharded", ["--lock-profile", "sharded"], "#4CAF50"),
+        ("Compare All", ["--lock-profile", "mutex,rw,sharded"], "#9C27B0"),
+        ("SHM (Lock)", ["--shm"], "#795548"),
+    ]
+    for idx, (btn_text, cmd, color) in enumerate(lock_runs):
+        tk.Button(
+            lock_btns, text=btn_text, width=16, height=2, bg=color, fg="white",
+            command=lambda c=cmd, t=btn_text: dashboard.run(c, label=f"Locks: {t}")
+        ).grid(row=0, column=idx, padx=10)
+    notebook.add(lock_tab, text="Lock Contention")
+
     root.mainloop()
 
 
@@ -1,38 +1,194 @@
 # message_queue_sim.py
 # Demonstrates a Queue (FIFO) with maxsize to simulate buffer-full bottleneck.
-from multiprocessing import Process, Queue
+# Items can be batched (N per put, drained with one get) and a sampler records
+# queue depth, producer blocked time and put-timeout drops over time.
+from multiprocessing import Process, Queue, Value
+import queue
+import threading
 import time
 
-def producer(q: Queue, items, produce_delay, put_timeout=1.0):
-    for item in items:
+import ipc_events as ev
+import ipc_bench
+from latency_hist import LatencyHistogram
+
+CHANNEL = "queue"
+
+def producer(q: Queue, items, produce_delay, put_timeout=1.0, batch_size=1,
+             blocked_ns=None, drops=None, quiet=False):
+    """Put items (or lists of batch_size items) stamped with their put time.
+
+    blocked_ns/drops are optional shared Values the sampler reads while we run.
+    """
+    if batch_size > 1:
+        entries = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    else:
+        entries = items
+    for entry in entries:
+        label = entry if batch_size == 1 else f"{entry[0]}..{entry[-1]} ({len(entry)} items)"
+        t0 = time.monotonic_ns()
         try:
-            q.put(item, timeout=put_timeout)
-            print(f"[Producer] put: {item}")
-        except Exception:
-            print(f"⚠️ [Producer] Queue full! couldn't put '{item}' within {put_timeout}s")
-        time.sleep(produce_delay)
-    print("[Producer] done.")
+            q.put((entry, t0), timeout=put_timeout)
+            if not quiet:
+                ev.emit(ev.PUT, CHANNEL, label, size=len(entry))
+        except queue.Full:
+            ev.emit(ev.PUT, CHANNEL, label, size=len(entry),
+                    value=int(put_timeout * 1e9), flags=ev.FLAG_DROP)
+            if drops is not None:
+                drops.value += 1 if batch_size == 1 else len(entry)
+        if blocked_ns is not None:
+            blocked_ns.value += time.monotonic_ns() - t0
+        if produce_delay:
+            time.sleep(produce_delay)
+    ev.emit(ev.DONE, CHANNEL, "Producer")
     # indicate end (special token)
     q.put(None)
 
-def consumer(q: Queue, consume_delay):
+def consumer(q: Queue, consume_delay, quiet=False):
+    hist = LatencyHistogram()
     while True:
-        item = q.get()  # blocks until an item appears
-        if item is None:
-            print("[Consumer] received termination token. Exiting.")
+        entry = q.get()  # blocks until an item appears
+        if entry is None:
+            ev.emit(ev.GET, CHANNEL, flags=ev.FLAG_END)
             break
-        time.sleep(consume_delay)  # simulate slow consumer -> possible queue growth
-        print(f"[Consumer] got: {item}")
-    print("[Consumer] done.")
+        payload, ts = entry
+        latency = time.monotonic_ns() - ts  # time spent waiting in the queue
+        batch = payload if isinstance(payload, list) else [payload]
+        for item in batch:
+            hist.record(latency)
+            if consume_delay:
+                time.sleep(consume_delay)  # simulate slow consumer -> possible queue growth
+            if not quiet:
+                ev.emit(ev.GET, CHANNEL, item, size=len(item), value=latency)
+    ev.latency(CHANNEL, hist)
+    ev.emit(ev.DONE, CHANNEL, "Consumer")
+
+class QueueDepthSampler(threading.Thread):
+    """Samples qsize(), producer blocked time and drops every `interval` seconds.
+
+    samples: list of (t_s, depth, blocked_s, drops). depth is -1 where the
+    platform has no qsize() (macOS).
+    """
+
+    def __init__(self, q, interval, blocked_ns, drops, emit_events=True):
+        super().__init__(daemon=True)
+        self.q = q
+        self.interval = interval
+        self.blocked_ns = blocked_ns
+        self.drops = drops
+        self.emit_events = emit_events
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        t0 = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                depth = self.q.qsize()
+            except NotImplementedError:
+                depth = -1
+            sample = (time.monotonic() - t0, depth,
+                      self.blocked_ns.value / 1e9, self.drops.value)
+            self.samples.append(sample)
+            if self.emit_events:
+                ev.emit(ev.SAMPLE, CHANNEL, "depth", value=depth)
+            self._stop_event.wait(self.interval)
 
-def run_demo(items=None, queue_maxsize=3, produce_delay=0.2, consume_delay=1.0):
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self):
+        depths = [d for _, d, _, _ in self.samples if d >= 0]
+        last = self.samples[-1] if self.samples else (0, 0, 0.0, 0)
+        return {
+            "samples": len(self.samples),
+            "max_depth": max(depths, default=0),
+            "mean_depth": sum(depths) / len(depths) if depths else 0.0,
+            "blocked_s": last[2],
+            "drops": last[3],
+        }
+
+def run_demo(items=None, queue_maxsize=3, produce_delay=0.2, consume_delay=1.0,
+             batch_size=1, sample_interval=0.25, quiet=False):
     if items is None:
         items = [f"msg{i}" for i in range(1, 8)]
     q = Queue(maxsize=queue_maxsize)
-    p = Process(target=producer, args=(q, items, produce_delay))
-    c = Process(target=consumer, args=(q, consume_delay))
+    blocked_ns = Value('q', 0, lock=False)  # only the producer writes these
+    drops = Value('q', 0, lock=False)
+    p = Process(target=producer, args=(q, items, produce_delay, 1.0, batch_size,
+                                           blocked_ns, drops, quiet))
+    c = Process(target=consumer, args=(q, consume_delay, quiet))
+    sampler = QueueDepthSampler(q, sample_interval, blocked_ns, drops, emit_events=not quiet)
+    start = time.monotonic()
     c.start()
     p.start()
+    sampler.start()
     p.join()
     c.join()
-    print("[Queue Demo] finished.")
+    elapsed = time.monotonic() - start
+    sampler.stop()
+
+    stats = sampler.summary()
+    stats.update(items=len(items), batch_size=batch_size, queue_maxsize=queue_maxsize,
+                 produce_delay=produce_delay, elapsed_s=elapsed,
+                 items_per_s=len(items) / elapsed if elapsed else 0.0)
+    ev.info(CHANNEL, f"[Queue Demo] depth max={stats['max_depth']} mean={stats['mean_depth']:.1f}, "
+                     f"producer blocked {stats['blocked_s']:.3f}s, drops={stats['drops']}")
+    ev.result(CHANNEL, stats)
+    ev.info(CHANNEL, "[Queue Demo] finished.")
+    stats["series"] = sampler.samples
+    return stats
+
+def run_batch_comparison(n_items=20000, batch_sizes=(1, 10, 100), maxsizes=(10, 1000),
+                         produce_delays=(0.0,), sample_interval=0.01):
+    """Quantify per-item IPC overhead against batching across maxsize/delay settings."""
+    items = [f"msg{i}" for i in range(n_items)]
+    rows = []
+    for delay in produce_delays:
+        for maxsize in maxsizes:
+            for batch in batch_sizes:
+                stats = run_demo(items, queue_maxsize=maxsize, produce_delay=delay,
+                                 consume_delay=0.0, batch_size=batch,
+                                 sample_interval=sample_interval, quiet=True)
+                stats.pop("series")
+                rows.append(stats)
+    ev.info(CHANNEL, f"{'batch':>6} {'maxsize':>8} {'delay s':>8} {'items/s':>10} "
+                     f"{'us/item':>8} {'max depth':>9} {'blocked s':>9} {'drops':>6}")
+    for r in rows:
+        ev.info(CHANNEL, f"{r['batch_size']:>6} {r['queue_maxsize']:>8} {r['produce_delay']:>8g} "
+                         f"{r['items_per_s']:>10.0f} {1e6 / r['items_per_s']:>8.2f} "
+                         f"{r['max_depth']:>9} {r['blocked_s']:>9.3f} {r['drops']:>6}")
+    return rows
+
+def bench_sender(q, size, count, mode, results):
+    """Benchmark producer: `count` pickled payloads of `size` bytes, stamped with put time."""
+    payload = bytes(size)
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    for _ in range(count):
+        q.put((time.monotonic_ns(), payload))
+    ipc_bench.report("sender", start, time.monotonic_ns(), cpu0, results)
+
+def bench_receiver(q, size, count, mode, results):
+    hist = LatencyHistogram()
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    for _ in range(count):
+        ts, _ = q.get()
+        hist.record(time.monotonic_ns() - ts)
+    ipc_bench.report("receiver", start, time.monotonic_ns(), cpu0, results,
+                     latency=hist.summary())
+
+def run_benchmark(sizes=None, count=None, queue_maxsize=64):
+    """Throughput/latency of multiprocessing.Queue at each size (ipc_bench columns)."""
+    if sizes is None:
+        sizes = ipc_bench.DEFAULT_SIZES
+    results = []
+    for size in sizes:
+        n = count or ipc_bench.default_count(size)
+        q = Queue(maxsize=queue_maxsize)
+        result = ipc_bench.run_pair(CHANNEL, "pickle", bench_sender, bench_receiver, q, q, size, n)
+        ev.info(CHANNEL, f"[Queue Bench] {ipc_bench.format_size(size):>7} x {n}: "
+                         f"{result['msgs_per_s']:.0f} msgs/s, {result['mb_per_s']:.1f} MB/s")
+        results.append(result)
+    return results
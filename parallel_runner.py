@@ -0,0 +1,140 @@
+# parallel_runner.py
+# Runs many scenario instances concurrently over a process pool and merges
+# their headless results into one report. --jobs caps how many run at once;
+# --cpus pins every scenario (and the processes it spawns) to a CPU budget so
+# a regression suite can be squeezed onto part of a host, or deliberately
+# overloaded to see how the IPC mechanisms behave under contention.
+#
+#   python parallel_runner.py pipe queue shm shm-nolock --jobs 4
+#   python parallel_runner.py shm-race --repeat 8 --cpus 2 --jsonl suite.jsonl
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import headless_runner
+
+DEFAULT_SUITE = ["pipe", "queue", "shm", "shm-nolock"]
+
+
+def cpu_budget(cpus):
+    """The first `cpus` CPUs this process may run on (None = no restriction)."""
+    if not cpus or not hasattr(os, "sched_getaffinity"):
+        return None
+    allowed = sorted(os.sched_getaffinity(0))
+    return set(allowed[:max(1, min(cpus, len(allowed)))])
+
+
+def _init_worker(cpu_set):
+    # Children (the demo and every process it spawns) inherit the affinity mask
+    if cpu_set:
+        os.sched_setaffinity(0, cpu_set)
+
+
+def _run_one(index, scenario, params, timeout):
+    result = headless_runner.run_scenario(scenario, params, timeout=timeout)
+    result["instance"] = index
+    return result
+
+
+def merge(results, wall_s, jobs, cpu_set):
+    """Merge per-instance results into one report with per-scenario rollups."""
+    by_scenario = {}
+    for r in results:
+        s = by_scenario.setdefault(r["scenario"], {
+            "runs": 0, "failed": 0, "wall_s_max": 0.0, "wall_s_total": 0.0,
+            "bottlenecks": 0, "drops": 0, "lost_updates": 0, "race_detected": False,
+            "latency_p99_ns_max": 0,
+        })
+        s["runs"] += 1
+        s["failed"] += int(r["returncode"] != 0 or r["timed_out"])
+        s["wall_s_max"] = max(s["wall_s_max"], r["wall_s"])
+        s["wall_s_total"] += r["wall_s"]
+        s["bottlenecks"] += r["bottlenecks"]
+        s["drops"] += r["drops"]
+        s["lost_updates"] += sum(x["lost_updates"] for x in r["races"])
+        s["race_detected"] = s["race_detected"] or r["race_detected"]
+        for summaries in r["latency"].values():
+            for lat in summaries:
+                s["latency_p99_ns_max"] = max(s["latency_p99_ns_max"], lat["p99_ns"])
+
+    serial = sum(r["wall_s"] for r in results)
+    slowest = max(results, key=lambda r: r["wall_s"], default=None)
+    return {
+        "commit": headless_runner.git_commit(),
+        "jobs": jobs,
+        "cpus": sorted(cpu_set) if cpu_set else None,
+        "instances": len(results),
+        "failed": sum(s["failed"] for s in by_scenario.values()),
+        "wall_s": wall_s,
+        "serial_wall_s": serial,
+        "speedup": serial / wall_s if wall_s else 0.0,
+        "slowest": {"scenario": slowest["scenario"], "instance": slowest["instance"],
+                    "wall_s": slowest["wall_s"]} if slowest else None,
+        "by_scenario": by_scenario,
+        "runs": sorted(results, key=lambda r: r["instance"]),
+    }
+
+
+def run_parallel(specs, jobs=None, cpus=None, timeout=None, on_result=None):
+    """Run [(scenario, params), ...] concurrently and return the merged report.
+
+    on_result(result) is called in the parent as each instance finishes.
+    """
+    cpu_set = cpu_budget(cpus)
+    if jobs is None:
+        jobs = len(cpu_set) if cpu_set else (os.cpu_count() or 1)
+    jobs = max(1, min(jobs, len(specs)))
+    results = []
+    t0 = time.monotonic()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(cpu_set,)) as pool:
+        futures = [pool.submit(_run_one, i, scenario, params, timeout)
+                   for i, (scenario, params) in enumerate(specs)]
+        for fut in as_completed(futures):
+            result = fut.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return merge(results, time.monotonic() - t0, jobs, cpu_set)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run IPC scenarios in parallel and merge the results")
+    parser.add_argument("scenarios", nargs="*", default=DEFAULT_SUITE,
+                        help=f"Scenarios to run (default: {' '.join(DEFAULT_SUITE)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Instances of each scenario")
+    parser.add_argument("--jobs", type=int, default=None, help="Max scenarios running at once")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU budget: pin all scenarios to this many CPUs")
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="Parameter passed to every scenario")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-instance timeout in seconds")
+    parser.add_argument("--jsonl", default=None, help="Append the merged report as one line to this file")
+    args = parser.parse_args(argv)
+
+    for name in args.scenarios:
+        if name not in headless_runner.SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+    params = headless_runner.parse_params(args.param)
+    specs = [(name, params) for name in args.scenarios for _ in range(args.repeat)]
+
+    def progress(r):
+        print(f"[Parallel] {r['scenario']}#{r['instance']} finished in {r['wall_s']:.2f}s "
+              f"(rc={r['returncode']})", file=sys.stderr)
+
+    report = run_parallel(specs, jobs=args.jobs, cpus=args.cpus, timeout=args.timeout,
+                          on_result=progress)
+    line = json.dumps(report, separators=(",", ":"))
+    if args.jsonl:
+        with open(args.jsonl, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        print(json.dumps({k: v for k, v in report.items() if k != "runs"}, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,46 +1,139 @@
 # pipe_simulation.py
 # Demonstrates a simple Pipe-based IPC with delay detection (bottleneck).
 from multiprocessing import Process, Pipe
+import struct
 import time
 
+import ipc_events as ev
+import ipc_bench
+from latency_hist import LatencyHistogram
+
 DELAY_THRESHOLD = 2.0  # seconds: if receiving takes longer, flag bottleneck
+CHANNEL = "pipe"
+_STAMP = struct.Struct("<q")  # benchmark payloads carry their send time in the first 8 bytes
 
 def sender(conn, messages, send_delay):
     """Send messages through a pipe, with optional delay between sends."""
     for msg in messages:
         time.sleep(send_delay)  # simulate sender doing work / slow production
-        timestamp = time.time()
+        timestamp = time.monotonic_ns()
         conn.send((msg, timestamp))
-        print(f"[Sender] sent: {msg} (t={timestamp:.3f})")
+        ev.emit(ev.SEND, CHANNEL, msg, size=len(msg))
     conn.close()
-    print("[Sender] done and closed pipe.")
+    ev.emit(ev.DONE, CHANNEL, "Sender")
+
+def receiver(conn, expect_count, recv_delay=0.0):
+    """Receive messages. If delay between send timestamp and now exceeds threshold, warn.
 
-def receiver(conn, expect_count):
-    """Receive messages. If delay between send timestamp and now exceeds threshold, warn."""
+    recv_delay simulates a slow consumer, so unread bytes pile up in the pipe.
+    """
     received = 0
+    hist = LatencyHistogram()
     while received < expect_count:
         try:
             msg, ts = conn.recv()
         except EOFError:
             break
-        now = time.time()
-        latency = now - ts
-        if latency > DELAY_THRESHOLD:
-            print(f"⚠️ [Receiver] Bottleneck detected! latency={latency:.3f}s for message '{msg}'")
-        else:
-            print(f"[Receiver] received: {msg} (latency={latency:.3f}s)")
+        latency = time.monotonic_ns() - ts
+        hist.record(latency)
+        flags = ev.FLAG_BOTTLENECK if latency > DELAY_THRESHOLD * 1e9 else 0
+        ev.emit(ev.RECV, CHANNEL, msg, size=len(msg), value=latency, flags=flags)
         received += 1
+        if recv_delay:
+            time.sleep(recv_delay)
+    conn.close()
+    ev.latency(CHANNEL, hist)
+    ev.emit(ev.DONE, CHANNEL, "Receiver")
+
+def bench_sender(conn, size, count, mode, results):
+    """Benchmark sender: stream `count` payloads of `size` bytes as fast as possible."""
+    payload = bytearray(max(size, _STAMP.size))
+    stamp = _STAMP.pack_into
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    if mode == "pickle":
+        for _ in range(count):
+            stamp(payload, 0, time.monotonic_ns())
+            conn.send(payload)
+    else:
+        for _ in range(count):
+            stamp(payload, 0, time.monotonic_ns())
+            conn.send_bytes(payload)
+    ipc_bench.report("sender", start, time.monotonic_ns(), cpu0, results)
     conn.close()
-    print("[Receiver] done and closed pipe.")
 
-def run_demo(messages=None, sender_delay=0.5):
+def bench_receiver(conn, size, count, mode, results):
+    """Benchmark receiver: pickle mode unpickles each message, bytes mode
+    copies straight into one preallocated buffer with recv_bytes_into."""
+    hist = LatencyHistogram()
+    unstamp = _STAMP.unpack_from
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    if mode == "pickle":
+        for _ in range(count):
+            msg = conn.recv()
+            hist.record(time.monotonic_ns() - unstamp(msg)[0])
+    else:
+        buf = bytearray(max(size, _STAMP.size))
+        for _ in range(count):
+            conn.recv_bytes_into(buf)
+            hist.record(time.monotonic_ns() - unstamp(buf)[0])
+    ipc_bench.report("receiver", start, time.monotonic_ns(), cpu0, results,
+                     latency=hist.summary())
+    conn.close()
+
+def run_benchmark(sizes=None, count=None, modes=("pickle", "bytes"), table=False):
+    """Compare conn.send (pickle) with send_bytes/recv_bytes_into at each size."""
+    if sizes is None:
+        sizes = ipc_bench.DEFAULT_SIZES
+    results = []
+    for size in sizes:
+        n = count or ipc_bench.default_count(size)
+        for mode in modes:
+            parent_conn, child_conn = Pipe()
+            result = ipc_bench.run_pair(CHANNEL, mode, bench_sender, bench_receiver,
+                                        parent_conn, child_conn, size, n)
+            parent_conn.close()
+            child_conn.close()
+            ev.info(CHANNEL, f"[Pipe Bench] {mode:<6} {ipc_bench.format_size(size):>7} x {n}: "
+                             f"{result['msgs_per_s']:.0f} msgs/s, {result['mb_per_s']:.1f} MB/s, "
+                             f"{result['cpu_us_per_msg']:.2f} us CPU/msg")
+            results.append(result)
+    if table:
+        for line in ipc_bench.format_table(results):
+            ev.info(CHANNEL, line)
+    return results
+
+def run_demo(messages=None, sender_delay=0.5, benchmark=False, sizes=None, count=None,
+             receiver_delay=0.0, backlog_interval=None):
+    """Pipe demo; with backlog_interval, a monitor samples the unread bytes
+    waiting for the receiver (FIONREAD on its end, still open in this process)."""
+    if benchmark:
+        return run_benchmark(sizes=sizes, count=count, table=True)
     if messages is None:
         messages = ["hello", "world", "IPC", "pipe", "end"]
     parent_conn, child_conn = Pipe()
     p_send = Process(target=sender, args=(parent_conn, messages, sender_delay))
-    p_recv = Process(target=receiver, args=(child_conn, len(messages)))
+    p_recv = Process(target=receiver, args=(child_conn, len(messages), receiver_delay))
     p_recv.start()
     p_send.start()
+    monitor = None
+    if backlog_interval:  # started after the forks so no child inherits its thread
+        # Imported here: backlog_monitor needs fcntl/termios, which the plain
+        # demo must not depend on.
+        from backlog_monitor import BacklogMonitor, FdSource
+        monitor = BacklogMonitor([FdSource(CHANNEL, child_conn.fileno())], interval=backlog_interval)
+        monitor.start()
     p_send.join()
     p_recv.join()
-    print("[Pipe Demo] finished.")
+    if monitor is not None:
+        monitor.stop()
+        stats = monitor.summary().get(CHANNEL)
+        if stats:
+            ev.info(CHANNEL, f"[Pipe Demo] backlog max={stats['max_bytes']} B "
+                             f"mean={stats['mean_bytes']:.0f} B over {stats['samples']} samples")
+            ev.result(CHANNEL, {"messages": len(messages), "sender_delay": sender_delay,
+                                "receiver_delay": receiver_delay, "backlog_samples": stats["samples"],
+                                "backlog_max_bytes": stats["max_bytes"],
+                                "backlog_mean_bytes": stats["mean_bytes"]})
+    ev.info(CHANNEL, "[Pipe Demo] finished.")
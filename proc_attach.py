@@ -0,0 +1,387 @@
+# proc_attach.py
+# Attach mode: map the real IPC topology of live Linux processes from /proc.
+#
+# For every selected process the scanner reads /proc/<pid>/fd (and fdinfo for
+# the access mode of new fds), /proc/<pid>/maps for mapped /dev/shm segments,
+# and resolves Unix socket peers through sock_diag (falling back to
+# /proc/net/unix paths). Processes that share a pipe inode, the two ends of a
+# Unix socket pair, or a /dev/shm segment become one Channel.
+#
+# Rescans are incremental: an fd whose link target hasn't changed keeps its
+# cached endpoint (no fdinfo read), maps are re-read only when a process's fd
+# set changed or every MAPS_EVERY scans, and the socket table is re-dumped only
+# when an unknown socket inode shows up. A pid whose start time changed is a
+# new process and loses its cache.
+#
+#   python proc_attach.py --name python --interval 1 --count 5
+#   python proc_attach.py --pid 1234 --pid 5678 --json
+import argparse
+import json
+import os
+import socket
+import struct
+import time
+from collections import namedtuple
+
+PROC = "/proc"
+SHM_DIR = "/dev/shm"
+MAPS_EVERY = 10
+
+# kind: "pipe" | "unix" | "shm"; key identifies the shared object;
+# ends: [(pid, role)] with role "read"/"write"/"rw"/"map"
+Channel = namedtuple("Channel", "kind key label ends")
+Endpoint = namedtuple("Endpoint", "kind inode role")
+# processes: {pid: name}; segments: {name: size} of everything in /dev/shm
+Topology = namedtuple("Topology", "processes channels segments")
+
+# ---- sock_diag (netlink) for Unix socket peers and queue lengths ----------
+_NETLINK_SOCK_DIAG = 4
+_SOCK_DIAG_BY_FAMILY = 20
+_NLM_F_REQUEST, _NLM_F_DUMP = 0x1, 0x300
+_NLMSG_DONE, _NLMSG_ERROR = 3, 2
+_UDIAG_SHOW_NAME, _UDIAG_SHOW_PEER, _UDIAG_SHOW_RQLEN = 0x1, 0x4, 0x10
+_UNIX_DIAG_NAME, _UNIX_DIAG_PEER, _UNIX_DIAG_RQLEN = 0, 2, 4
+_NLMSG = struct.Struct("=IHHII")
+_UNIX_REQ = struct.Struct("=BBHIIIII")
+_UNIX_MSG = struct.Struct("=BBBBIII")
+_RTA = struct.Struct("=HH")
+
+UnixSocket = namedtuple("UnixSocket", "inode path peer rqueue wqueue")
+
+
+def unix_sockets():
+    """{inode: UnixSocket} for every Unix socket on the host, via sock_diag.
+
+    Returns None when netlink sock_diag is unavailable.
+    """
+    try:
+        nl = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_SOCK_DIAG)
+    except (OSError, AttributeError):
+        return None
+    out = {}
+    with nl:
+        req = _UNIX_REQ.pack(socket.AF_UNIX, 0, 0, 0xFFFFFFFF, 0,
+                             _UDIAG_SHOW_NAME | _UDIAG_SHOW_PEER | _UDIAG_SHOW_RQLEN, 0, 0)
+        nl.send(_NLMSG.pack(_NLMSG.size + len(req), _SOCK_DIAG_BY_FAMILY,
+                            _NLM_F_REQUEST | _NLM_F_DUMP, 1, 0) + req)
+        while True:
+            data = nl.recv(1 << 16)
+            off = 0
+            while off + _NLMSG.size <= len(data):
+                length, kind = _NLMSG.unpack_from(data, off)[:2]
+                if kind == _NLMSG_DONE:
+                    return out
+                if kind == _NLMSG_ERROR:
+                    return None
+                body = off + _NLMSG.size
+                inode = _UNIX_MSG.unpack_from(data, body)[4]
+                path, peer, rq, wq = "", 0, 0, 0
+                a = body + _UNIX_MSG.size
+                while a + _RTA.size <= off + length:
+                    alen, atype = _RTA.unpack_from(data, a)
+                    if alen < _RTA.size:
+                        break
+                    payload = data[a + _RTA.size:a + alen]
+                    if atype == _UNIX_DIAG_NAME:
+                        path = payload.rstrip(b"\0").replace(b"\0", b"@").decode("utf-8", "replace")
+                    elif atype == _UNIX_DIAG_PEER:
+                        peer = struct.unpack_from("=I", payload)[0]
+                    elif atype == _UNIX_DIAG_RQLEN:
+                        rq, wq = struct.unpack_from("=II", payload)
+                    a += (alen + 3) & ~3
+                out[inode] = UnixSocket(inode, path, peer, rq, wq)
+                off += (length + 3) & ~3
+
+
+def _proc_net_unix():
+    """Fallback without peers: {inode: UnixSocket} from /proc/net/unix."""
+    out = {}
+    try:
+        with open(os.path.join(PROC, "net", "unix")) as f:
+            next(f)
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 7:
+                    inode = int(parts[6])
+                    out[inode] = UnixSocket(inode, parts[7] if len(parts) > 7 else "", 0, 0, 0)
+    except OSError:
+        pass
+    return out
+
+
+# ---- process selection -----------------------------------------------------
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def process_name(pid):
+    comm = _read(f"{PROC}/{pid}/comm")
+    return comm.decode("utf-8", "replace").strip() if comm else "?"
+
+
+def _start_time(pid):
+    stat = _read(f"{PROC}/{pid}/stat")
+    if not stat:
+        return None
+    # field 22, counted after the parenthesised comm (which may contain spaces)
+    return int(stat[stat.rindex(b")") + 2:].split()[19])
+
+
+def find_pids(names=()):
+    """Pids whose comm or command line contains any of `names` (all pids if empty)."""
+    pids = []
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        if names:
+            cmdline = _read(f"{PROC}/{pid}/cmdline") or b""
+            text = process_name(pid) + " " + cmdline.replace(b"\0", b" ").decode("utf-8", "replace")
+            if not any(n in text for n in names):
+                continue
+        pids.append(pid)
+    return pids
+
+
+def _fd_role(pid, fd):
+    info = _read(f"{PROC}/{pid}/fdinfo/{fd}")
+    if not info:
+        return "rw"
+    for line in info.splitlines():
+        if line.startswith(b"flags:"):
+            return ("read", "write", "rw", "rw")[int(line.split()[1], 8) & 3]  # O_ACCMODE
+    return "rw"
+
+
+class _ProcCache:
+    __slots__ = ("start", "name", "fds", "maps", "scans")
+
+    def __init__(self, start, name):
+        self.start = start
+        self.name = name
+        self.fds = {}      # fd -> (link target, Endpoint or None)
+        self.maps = set()  # /dev/shm names mapped into the process
+        self.scans = 0
+
+
+class ProcScanner:
+    """Incremental /proc scanner; call scan() as often as you like."""
+
+    def __init__(self, pids=(), names=()):
+        self.pids = list(pids)
+        self.names = list(names)
+        self._procs = {}
+        self._sockets = {}
+        self._other_sockets = set()  # inet/netlink/... inodes: never in the unix table
+        self._diag = True
+        self.stats = {"scans": 0, "fdinfo_reads": 0, "maps_reads": 0, "socket_dumps": 0}
+
+    def _targets(self):
+        pids = set(self.pids)
+        if self.names or not self.pids:
+            pids.update(find_pids(self.names))
+        if os.getpid() not in self.pids:
+            pids.discard(os.getpid())
+        return sorted(pids)
+
+    def _refresh_sockets(self):
+        self.stats["socket_dumps"] += 1
+        table = unix_sockets() if self._diag else None
+        if table is None:
+            self._diag = False
+            table = _proc_net_unix()
+        self._sockets = table
+
+    def _scan_process(self, pid):
+        start = _start_time(pid)
+        if start is None:
+            return None
+        cache = self._procs.get(pid)
+        if cache is None or cache.start != start:
+            cache = self._procs[pid] = _ProcCache(start, process_name(pid))
+        fd_dir = f"{PROC}/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            return cache  # gone or not ours to inspect
+        changed = len(fds) != len(cache.fds)
+        current = {}
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            old = cache.fds.get(fd)
+            if old is not None and old[0] == target:
+                current[fd] = old
+                continue
+            changed = True
+            current[fd] = (target, self._endpoint(pid, fd, target))
+        cache.fds = current
+        if changed or cache.scans % MAPS_EVERY == 0:
+            cache.maps = self._shm_maps(pid)
+        cache.scans += 1
+        return cache
+
+    def _endpoint(self, pid, fd, target):
+        if target.startswith("pipe:["):
+            self.stats["fdinfo_reads"] += 1
+            return Endpoint("pipe", int(target[6:-1]), _fd_role(pid, fd))
+        if target.startswith("socket:["):
+            return Endpoint("unix", int(target[8:-1]), "rw")
+        if target.startswith(SHM_DIR + "/"):
+            return Endpoint("shm", target[len(SHM_DIR) + 1:], "fd")
+        return None
+
+    def _shm_maps(self, pid):
+        self.stats["maps_reads"] += 1
+        maps = _read(f"{PROC}/{pid}/maps") or b""
+        names = set()
+        marker = (SHM_DIR + "/").encode()
+        for line in maps.splitlines():
+            i = line.find(marker)
+            if i >= 0:
+                names.add(line[i + len(marker):].split(b" ")[0].decode("utf-8", "replace"))
+        return names
+
+    def scan(self):
+        """Rescan and return the current Topology."""
+        self.stats["scans"] += 1
+        pids = self._targets()
+        for pid in list(self._procs):
+            if pid not in pids:
+                del self._procs[pid]
+        procs = {}
+        for pid in pids:
+            cache = self._scan_process(pid)
+            if cache is not None:
+                procs[pid] = cache
+
+        wanted = {ep.inode for c in procs.values() for _, ep in c.fds.values()
+                  if ep is not None and ep.kind == "unix"}
+        unknown = wanted - self._sockets.keys() - self._other_sockets
+        if unknown:
+            self._refresh_sockets()
+            self._other_sockets |= unknown - self._sockets.keys()
+        return self._build(procs)
+
+    def _build(self, procs):
+        pipes, socks, shms = {}, {}, {}
+        for pid, cache in procs.items():
+            for target, ep in cache.fds.values():
+                if ep is None:
+                    continue
+                if ep.kind == "pipe":
+                    pipes.setdefault(ep.inode, set()).add((pid, ep.role))
+                elif ep.kind == "unix" and ep.inode in self._sockets:
+                    socks.setdefault(ep.inode, set()).add((pid, "rw"))
+                elif ep.kind == "shm":
+                    shms.setdefault(ep.inode, set()).add((pid, "fd"))
+            for name in cache.maps:
+                shms.setdefault(name, set()).add((pid, "map"))
+
+        channels = []
+        for inode, ends in pipes.items():
+            if len({p for p, _ in ends}) > 1:
+                channels.append(Channel("pipe", inode, f"pipe:[{inode}]", sorted(ends)))
+        seen = set()
+        for inode, ends in socks.items():
+            if inode in seen:
+                continue
+            sock = self._sockets[inode]
+            key = (inode,)
+            both = set(ends)
+            if sock.peer and sock.peer in socks:
+                seen.add(sock.peer)
+                key = tuple(sorted((inode, sock.peer)))
+                both |= socks[sock.peer]
+            elif sock.path:
+                # no peer info: group by bound path (listener and accepted ends)
+                same = [i for i, s in self._sockets.items() if s.path == sock.path and i in socks]
+                seen.update(same)
+                key = tuple(sorted(same))
+                for i in same:
+                    both |= socks[i]
+            seen.add(inode)
+            if len({p for p, _ in both}) > 1:
+                label = f"unix {sock.path}" if sock.path else f"unix:[{key[0]}]"
+                channels.append(Channel("unix", key, label, sorted(both)))
+        for name, ends in shms.items():
+            pids = {p for p, _ in ends}
+            if len(pids) > 1 or len(procs) == 1:
+                channels.append(Channel("shm", name, f"shm {name}", sorted(ends)))
+        channels.sort(key=lambda c: (c.kind, str(c.key)))
+        return Topology({pid: c.name for pid, c in procs.items()}, channels, shm_segments())
+
+
+def shm_segments():
+    """{name: size} of every segment in /dev/shm (leaked ones included)."""
+    out = {}
+    try:
+        entries = os.scandir(SHM_DIR)
+    except OSError:
+        return out
+    with entries:
+        for e in entries:
+            try:
+                out[e.name] = e.stat().st_size
+            except OSError:
+                pass
+    return out
+
+
+def ends_by_role(channel):
+    """(source pids, sink pids): writers/readers for pipes, sorted halves otherwise."""
+    if channel.kind == "pipe":
+        src = sorted({p for p, r in channel.ends if r in ("write", "rw")})
+        dst = sorted({p for p, r in channel.ends if r in ("read", "rw")})
+        return src, [p for p in dst if p not in src] or dst
+    pids = sorted({p for p, _ in channel.ends})
+    return pids[:1], pids[1:]
+
+
+def format_topology(topo):
+    lines = [f"[Attach] {len(topo.processes)} processes, {len(topo.channels)} shared channels"]
+    for ch in topo.channels:
+        src, dst = ends_by_role(ch)
+        name = lambda ps: ", ".join(f"{topo.processes.get(p, '?')}({p})" for p in ps) or "?"
+        arrow = "->" if ch.kind == "pipe" else "<->"
+        lines.append(f"  {ch.label:<32} {name(src)} {arrow} {name(dst)}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Map the IPC topology of live processes from /proc")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="Process id (repeatable)")
+    parser.add_argument("--name", action="append", default=[], help="Match comm/cmdline substring (repeatable)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between rescans")
+    parser.add_argument("--count", type=int, default=1, help="Number of scans (0 = forever)")
+    parser.add_argument("--json", action="store_true", help="Print each scan as one JSON line")
+    args = parser.parse_args(argv)
+
+    scanner = ProcScanner(args.pid, args.name)
+    n = 0
+    while True:
+        t0 = time.perf_counter()
+        topo = scanner.scan()
+        elapsed = time.perf_counter() - t0
+        if args.json:
+            print(json.dumps({"processes": topo.processes,
+                              "channels": [c._asdict() for c in topo.channels],
+                              "scan_ms": elapsed * 1e3}, default=list), flush=True)
+        else:
+            for line in format_topology(topo):
+                print(line)
+            print(f"[Attach] scan took {elapsed * 1e3:.1f} ms ({scanner.stats})", flush=True)
+        n += 1
+        if args.count and n >= args.count:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# scaling_bench.py
+# Multi-producer / multi-consumer scaling of every transport.
+#
+# The demos wire exactly one sender to one receiver. Here P producers and C
+# consumers, from 1x1 up to the core count each, move `count` stamped
+# messages in total through
+#   queue        one multiprocessing.Queue (feeder thread per producer, shared locks)
+#   simplequeue  one multiprocessing.SimpleQueue (no feeder; put/get take a lock)
+#   pipe         a P x C mesh of one-way Pipes: producers fan out round-robin,
+#                consumers fan in with multiprocessing.connection.wait()
+#   shm-ring     the same mesh of lock-free SPSC shm_ring rings, consumers polling
+# Each point reports aggregate msgs/s (first producer start to last consumer
+# end), end-to-end latency percentiles over all messages, and CPU per message.
+# A text chart per transport shows the scaling curve; ScalingPlot draws the
+# same curves on a Tk canvas (--plot). Where a curve flattens or turns down is
+# where lock contention, feeder threads or plain oversubscription take over.
+#
+#   python scaling_bench.py --transports queue,pipe --max-procs 4 --count 20000
+import argparse
+import os
+import struct
+import time
+from multiprocessing import Barrier, Pipe, Process, Queue, SimpleQueue
+from multiprocessing.connection import wait
+
+import ipc_events as ev
+from ipc_bench import format_size
+from latency_hist import LatencyHistogram
+from shm_ring import BACKOFF_S, SPIN, ShmRing
+
+CHANNEL = "scaling"
+TRANSPORTS = ("queue", "simplequeue", "pipe", "shm-ring")
+DEFAULT_SIZE = 64
+DEFAULT_COUNT = 20000   # messages per point, split over the producers
+QUEUE_MAXSIZE = 1024
+RING_CAPACITY = 256 * 1024
+CHART_WIDTH = 40
+
+_STAMP = struct.Struct("<q")
+_STOP = -1  # stamp of the end-of-stream record
+
+
+def core_count():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def levels(max_procs):
+    """1, 2, 4, ... up to max_procs, with max_procs itself always included."""
+    out = {max_procs}
+    n = 1
+    while n < max_procs:
+        out.add(n)
+        n *= 2
+    return sorted(out)
+
+
+def grid(max_procs):
+    """Every (producers, consumers) point, ordered by total process count."""
+    points = [(p, c) for p in levels(max_procs) for c in levels(max_procs)]
+    return sorted(points, key=lambda pc: (pc[0] + pc[1], pc))
+
+
+# ---- endpoints -------------------------------------------------------------
+class _Out:
+    """Producer side of a transport: send(bytes) round-robin, stop() ends the stream."""
+
+    def __init__(self, transport, endpoint):
+        self.transport = transport
+        self.k = 0
+        if transport in ("queue", "simplequeue"):
+            self.targets = [endpoint]
+        elif transport == "pipe":
+            self.targets = endpoint
+        else:
+            self.targets = [ShmRing.attach(name) for name in endpoint]
+
+    def send(self, data):
+        target = self.targets[self.k % len(self.targets)]
+        self.k += 1
+        if self.transport in ("queue", "simplequeue"):
+            target.put(data)
+        elif self.transport == "pipe":
+            target.send_bytes(data)
+        else:
+            target.write(data)
+
+    def stop(self):
+        """Mesh transports: one stop record per consumer. Queues are stopped by the parent."""
+        if self.transport in ("queue", "simplequeue"):
+            return
+        record = _STAMP.pack(_STOP)
+        for target in self.targets:
+            if self.transport == "pipe":
+                target.send_bytes(record)
+            else:
+                target.write(record)
+
+    def close(self):
+        if self.transport == "shm-ring":
+            for ring in self.targets:
+                ring.close()
+
+
+def _receive(transport, endpoint, producers, size):
+    """Consumer side: yield each payload until every stream has ended."""
+    if transport in ("queue", "simplequeue"):
+        while True:
+            data = endpoint.get()
+            if _STAMP.unpack_from(data)[0] == _STOP:
+                return
+            yield data
+    elif transport == "pipe":
+        active = list(endpoint)
+        while active:
+            for conn in wait(active):
+                data = conn.recv_bytes()
+                if _STAMP.unpack_from(data)[0] == _STOP:
+                    active.remove(conn)
+                else:
+                    yield data
+    else:
+        rings = [ShmRing.attach(name) for name in endpoint]
+        active = list(rings)
+        buf = bytearray(max(size, _STAMP.size))
+        spins = 0
+        try:
+            while active:
+                got = False
+                for ring in list(active):
+                    if ring.try_read_into(buf) < 0:
+                        continue
+                    got = True
+                    if _STAMP.unpack_from(buf)[0] == _STOP:
+                        active.remove(ring)
+                    else:
+                        yield buf
+                if got:
+                    spins = 0
+                else:
+                    spins += 1
+                    if spins > SPIN:
+                        time.sleep(BACKOFF_S)
+        finally:
+            for ring in rings:
+                ring.close()
+
+
+def producer(transport, endpoint, idx, size, count, barrier, results):
+    out = _Out(transport, endpoint)
+    payload = bytearray(max(size, _STAMP.size))
+    barrier.wait()
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    for _ in range(count):
+        _STAMP.pack_into(payload, 0, time.monotonic_ns())
+        # queues pickle later (Queue in its feeder thread), so they need their own copy
+        out.send(bytes(payload) if transport in ("queue", "simplequeue") else payload)
+    out.stop()
+    results.put({"role": "producer", "idx": idx, "sent": count, "start_ns": start,
+                 "end_ns": time.monotonic_ns(), "cpu_s": time.process_time() - cpu0})
+    out.close()
+
+
+def consumer(transport, endpoint, idx, producers, size, barrier, results):
+    hist = LatencyHistogram()
+    received = 0
+    barrier.wait()
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    for data in _receive(transport, endpoint, producers, size):
+        hist.record(time.monotonic_ns() - _STAMP.unpack_from(data)[0])
+        received += 1
+    results.put({"role": "consumer", "idx": idx, "received": received, "start_ns": start,
+                 "end_ns": time.monotonic_ns(), "cpu_s": time.process_time() - cpu0,
+                 "latency": hist.to_bytes()})
+
+
+# ---- one point ---------------------------------------------------------------
+def run_point(transport, producers, consumers, size=DEFAULT_SIZE, count=DEFAULT_COUNT):
+    """P producers x C consumers moving `count` messages in total; returns one result row."""
+    per_producer = [count // producers + (i < count % producers) for i in range(producers)]
+    rings = []
+    if transport == "queue":
+        q = Queue(maxsize=QUEUE_MAXSIZE)
+        outs, ins = [q] * producers, [q] * consumers
+    elif transport == "simplequeue":
+        q = SimpleQueue()
+        outs, ins = [q] * producers, [q] * consumers
+    elif transport == "pipe":
+        mesh = [[Pipe(duplex=False) for _ in range(consumers)] for _ in range(producers)]
+        outs = [[w for _, w in row] for row in mesh]
+        ins = [[mesh[p][c][0] for p in range(producers)] for c in range(consumers)]
+    elif transport == "shm-ring":
+        capacity = max(RING_CAPACITY, 4 * (max(size, _STAMP.size) + 16))
+        mesh = [[ShmRing.create(capacity) for _ in range(consumers)] for _ in range(producers)]
+        rings = [r for row in mesh for r in row]
+        outs = [[r.name for r in row] for row in mesh]
+        ins = [[mesh[p][c].name for p in range(producers)] for c in range(consumers)]
+    else:
+        raise ValueError(f"unknown transport {transport!r} (choose from {', '.join(TRANSPORTS)})")
+
+    results = Queue()
+    barrier = Barrier(producers + consumers)
+    procs = [Process(target=consumer, args=(transport, ins[c], c, producers, size, barrier, results))
+             for c in range(consumers)]
+    procs += [Process(target=producer, args=(transport, outs[p], p, size, per_producer[p], barrier, results))
+              for p in range(producers)]
+    try:
+        for p in procs:
+            p.start()
+        rows = [results.get() for _ in range(producers)]
+        if transport in ("queue", "simplequeue"):
+            # A Queue producer has flushed its feeder thread only once it has
+            # exited; after that, one stop record per consumer ends the run.
+            for p in procs[consumers:]:
+                p.join()
+            for _ in range(consumers):
+                q.put(_STAMP.pack(_STOP))
+        rows += [results.get() for _ in range(consumers)]
+        for p in procs:
+            p.join()
+    finally:
+        for ring in rings:
+            ring.close()
+
+    sent = [r for r in rows if r["role"] == "producer"]
+    got = [r for r in rows if r["role"] == "consumer"]
+    hist = LatencyHistogram()
+    for r in got:
+        hist.merge(LatencyHistogram.from_bytes(r["latency"]))
+    received = sum(r["received"] for r in got)
+    elapsed = max(max(r["end_ns"] for r in got) - min(r["start_ns"] for r in sent), 1) / 1e9
+    summary = hist.summary()
+    row = {
+        "transport": transport,
+        "producers": producers,
+        "consumers": consumers,
+        "size": size,
+        "count": received,
+        "elapsed_s": elapsed,
+        "msgs_per_s": received / elapsed,
+        "mb_per_s": received * size / elapsed / 1e6,
+        "cpu_us_per_msg": sum(r["cpu_s"] for r in rows) / max(received, 1) * 1e6,
+        "p50_ns": summary["p50_ns"],
+        "p99_ns": summary["p99_ns"],
+        "p99.9_ns": summary["p99.9_ns"],
+        "max_ns": summary["max_ns"],
+        "consumer_share": [r["received"] for r in sorted(got, key=lambda r: r["idx"])],
+    }
+    ev.result(CHANNEL, row)
+    return row
+
+
+# ---- sweep, table, chart -----------------------------------------------------
+def format_table(rows):
+    lines = [f"{'transport':<12} {'PxC':>5} {'msgs/s':>10} {'MB/s':>8} {'cpu us/msg':>10} "
+             f"{'p50 us':>9} {'p99 us':>9} {'p99.9 us':>9}"]
+    for r in rows:
+        lines.append(f"{r['transport']:<12} {r['producers']:>2}x{r['consumers']:<2} {r['msgs_per_s']:>10.0f} "
+                     f"{r['mb_per_s']:>8.1f} {r['cpu_us_per_msg']:>10.2f} {r['p50_ns'] / 1e3:>9.1f} "
+                     f"{r['p99_ns'] / 1e3:>9.1f} {r['p99.9_ns'] / 1e3:>9.1f}")
+    return lines
+
+
+def format_chart(rows, width=CHART_WIDTH):
+    """Text scaling curve per transport: one bar of msgs/s per point, plus its peak."""
+    lines = []
+    for transport in dict.fromkeys(r["transport"] for r in rows):
+        points = [r for r in rows if r["transport"] == transport]
+        top = max(r["msgs_per_s"] for r in points) or 1
+        best = max(points, key=lambda r: r["msgs_per_s"])
+        base = points[0]["msgs_per_s"] or 1
+        lines.append(f"{transport}: peak {best['msgs_per_s']:.0f} msgs/s at "
+                     f"{best['producers']}x{best['consumers']} ({best['msgs_per_s'] / base:.2f}x of "
+                     f"{points[0]['producers']}x{points[0]['consumers']})")
+        for r in points:
+            bar = "#" * max(1, round(r["msgs_per_s"] / top * width))
+            lines.append(f"  {r['producers']:>2}x{r['consumers']:<2} {bar:<{width}} {r['msgs_per_s']:>9.0f}"
+                         f"  p99 {r['p99_ns'] / 1e3:.0f}us")
+    return lines
+
+
+def run_scaling(transports=TRANSPORTS, max_procs=None, size=DEFAULT_SIZE, count=DEFAULT_COUNT,
+                table=True):
+    """Sweep every P x C point for each transport; returns all rows."""
+    max_procs = max_procs or core_count()
+    points = grid(max_procs)
+    ev.info(CHANNEL, f"[Scaling] {', '.join(transports)}: {len(points)} points up to "
+                     f"{max_procs}x{max_procs}, {count} x {format_size(size)} messages each "
+                     f"({core_count()} CPU(s) available)")
+    rows = []
+    for transport in transports:
+        for producers, consumers in points:
+            row = run_point(transport, producers, consumers, size, count)
+            ev.info(CHANNEL, f"[Scaling] {transport:<11} {producers}x{consumers}: {row['msgs_per_s']:.0f} msgs/s, "
+                             f"p99 {row['p99_ns'] / 1e3:.0f}us")
+            rows.append(row)
+    if table:
+        for line in format_table(rows) + format_chart(rows):
+            ev.info(CHANNEL, line)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# plotting (works on any Tk canvas; no tkinter import needed here)
+# ---------------------------------------------------------------------------
+PLOT_COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd")
+
+
+class ScalingPlot:
+    """msgs/s over the P x C points, one line per transport."""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+
+    def show(self, rows):
+        c = self.canvas
+        c.delete("scaling")
+        width, height = c.winfo_width(), c.winfo_height()
+        if width <= 1:
+            width, height = int(c.cget("width")), int(c.cget("height"))
+        left, right, top, bottom = 70, width - 130, 25, height - 35
+        points = list(dict.fromkeys((r["producers"], r["consumers"]) for r in rows))
+        top_rate = max((r["msgs_per_s"] for r in rows), default=0) or 1
+        x_step = (right - left) / max(1, len(points) - 1)
+        c.create_line(left, bottom, right, bottom, tags="scaling")
+        c.create_line(left, top, left, bottom, tags="scaling")
+        c.create_text(left - 5, top, anchor="e", text=f"{top_rate:.0f}", font=("Arial", 8), tags="scaling")
+        c.create_text(left - 5, bottom, anchor="e", text="0", font=("Arial", 8), tags="scaling")
+        c.create_text(5, 5, anchor="nw", text="msgs/s by producers x consumers", font=("Arial", 9),
+                      tags="scaling")
+        for i, (p, n) in enumerate(points):
+            c.create_text(left + i * x_step, bottom + 12, text=f"{p}x{n}", font=("Arial", 8), tags="scaling")
+        for k, transport in enumerate(dict.fromkeys(r["transport"] for r in rows)):
+            color = PLOT_COLORS[k % len(PLOT_COLORS)]
+            coords = []
+            for r in rows:
+                if r["transport"] == transport:
+                    i = points.index((r["producers"], r["consumers"]))
+                    coords += [left + i * x_step, bottom - r["msgs_per_s"] / top_rate * (bottom - top)]
+            if len(coords) == 2:
+                coords += coords
+            c.create_line(*coords, fill=color, width=2, tags="scaling")
+            c.create_text(right + 10, top + 14 * k, anchor="w", text=transport, fill=color,
+                          font=("Arial", 9), tags="scaling")
+
+
+def show_plot(rows):
+    import tkinter as tk
+    root = tk.Tk()
+    root.title("IPC scaling: producers x consumers")
+    canvas = tk.Canvas(root, width=900, height=400, bg="white")
+    canvas.pack(fill="both", expand=True)
+    root.update_idletasks()
+    ScalingPlot(canvas).show(rows)
+    root.mainloop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Producers x consumers scaling of the IPC transports")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS))
+    parser.add_argument("--max-procs", type=int, default=None,
+                        help="Largest producer/consumer count (default: CPUs available)")
+    parser.add_argument("--size", default=str(DEFAULT_SIZE), help="Message size, e.g. 64 or 4K")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Messages per point")
+    parser.add_argument("--plot", action="store_true", help="Show the curves in a Tk window")
+    args = parser.parse_args(argv)
+    from ipc_bench import parse_size
+    rows = run_scaling(tuple(args.transports.split(",")), args.max_procs, parse_size(args.size), args.count)
+    if args.plot:
+        show_plot(rows)
+
+
+if __name__ == "__main__":
+    main()
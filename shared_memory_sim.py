@@ -1,71 +1,563 @@
 # shared_memory_sim.py
-from multiprocessing import Process, Lock
-from multiprocessing import shared_memory
+from multiprocessing import Process, Lock, shared_memory
+import importlib.util
+import os
 import time
 import struct
 
-SHM_SIZE = 8  # 64-bit integer
+import ipc_events as ev
+from latency_hist import LatencyHistogram
+from lock_profiler import ProfiledLock, profile, report
 
-def writer_no_lock(name, iterations, write_delay, start_value=0):
-    shm = shared_memory.SharedMemory(name=name)
+SHM_SIZE = 16  # 64-bit value + 64-bit monotonic write timestamp (ns)
+_SLOT = struct.Struct('qq')
+
+def _channel(name):
+    return f"shm:{name}"
+
+def attach(seg):
+    """The SharedMemory a child was given: passed through as is, or opened by name."""
+    if isinstance(seg, shared_memory.SharedMemory):
+        return seg
+    return shared_memory.SharedMemory(name=seg)
+
+class _PlainSegments:
+    """Stand-in for shm_pool.SegmentPool where it can't run (no fcntl, e.g.
+    Windows): a new segment per run, unlinked when it is released."""
+
+    def acquire(self, n):
+        return shared_memory.SharedMemory(create=True, size=max(n, 1))
+
+    def track(self, shm, *procs):
+        pass
+
+    def release(self, shm):
+        shm.close()
+        shm.unlink()
+
+def _pool():
+    # Imported on first use: the pool's POSIX record locks need fcntl, and the
+    # demos themselves must keep running where it doesn't exist.
+    if importlib.util.find_spec("fcntl") is None:
+        return _PlainSegments()
+    from shm_pool import default_pool
+    return default_pool()
+
+class _Staleness:
+    """Write-to-first-read latency: recorded once per newly observed write."""
+
+    def __init__(self):
+        self.hist = LatencyHistogram()
+        self.last_ts = 0
+
+    def observe(self, ts):
+        if ts and ts != self.last_ts:
+            self.hist.record(time.monotonic_ns() - ts)
+            self.last_ts = ts
+
+def writer_no_lock(seg, iterations, write_delay, start_value=0):
+    shm = attach(seg)
+    name = shm.name
     for i in range(iterations):
         val = start_value + i
-        shm.buf[:8] = struct.pack('q', val)
-        print(f"[Writer-NoLock] wrote {val}")
+        _SLOT.pack_into(shm.buf, 0, val, time.monotonic_ns())
+        ev.emit(ev.WRITE, _channel(name), size=8, value=val, flags=ev.FLAG_UNSYNC)
         time.sleep(write_delay)
     shm.close()
-    print("[Writer-NoLock] done.")
+    ev.emit(ev.DONE, _channel(name), "Writer-NoLock")
 
-def reader_no_lock(name, iterations, read_delay):
-    shm = shared_memory.SharedMemory(name=name)
+def reader_no_lock(seg, iterations, read_delay):
+    shm = attach(seg)
+    name = shm.name
+    seen = _Staleness()
     for _ in range(iterations):
-        raw = bytes(shm.buf[:8])
-        val = struct.unpack('q', raw)[0]
-        print(f"[Reader-NoLock] read {val}")
+        raw = bytes(shm.buf[:SHM_SIZE])
+        val, ts = _SLOT.unpack(raw)
+        seen.observe(ts)
+        ev.emit(ev.READ, _channel(name), size=8, value=val, flags=ev.FLAG_UNSYNC)
         time.sleep(read_delay)
     shm.close()
-    print("[Reader-NoLock] done.")
+    ev.latency(_channel(name), seen.hist)
+    ev.emit(ev.DONE, _channel(name), "Reader-NoLock")
+
+def _acquire(lock, name, role):
+    lock.acquire()
+    ev.emit(ev.LOCK_ACQUIRE, _channel(name), role, value=lock.last_wait_ns)
 
-def writer_with_lock(name, lock, iterations, write_delay, start_value=1000):
-    shm = shared_memory.SharedMemory(name=name)
+def writer_with_lock(seg, lock, iterations, write_delay, start_value=1000):
+    shm = attach(seg)
+    name = shm.name
     for i in range(iterations):
-        with lock:
+        _acquire(lock, name, "Writer-Lock")
+        try:
             val = start_value + i
-            shm.buf[:8] = struct.pack('q', val)
-            print(f"[Writer-Lock] wrote {val}")
+            _SLOT.pack_into(shm.buf, 0, val, time.monotonic_ns())
+            ev.emit(ev.WRITE, _channel(name), size=8, value=val)
+        finally:
+            lock.release()
         time.sleep(write_delay)
     shm.close()
-    print("[Writer-Lock] done.")
+    ev.emit(ev.DONE, _channel(name), "Writer-Lock")
 
-def reader_with_lock(name, lock, iterations, read_delay):
-    shm = shared_memory.SharedMemory(name=name)
+def reader_with_lock(seg, lock, iterations, read_delay):
+    shm = attach(seg)
+    name = shm.name
+    seen = _Staleness()
     for _ in range(iterations):
-        with lock:
-            raw = bytes(shm.buf[:8])
-            val = struct.unpack('q', raw)[0]
-            print(f"[Reader-Lock] read {val}")
+        _acquire(lock, name, "Reader-Lock")
+        try:
+            raw = bytes(shm.buf[:SHM_SIZE])
+            val, ts = _SLOT.unpack(raw)
+            seen.observe(ts)
+            ev.emit(ev.READ, _channel(name), size=8, value=val)
+        finally:
+            lock.release()
         time.sleep(read_delay)
     shm.close()
-    print("[Reader-Lock] done.")
+    ev.latency(_channel(name), seen.hist)
+    ev.emit(ev.DONE, _channel(name), "Reader-Lock")
 
 def run_demo(iterations=6, rw_delay=0.5, use_lock_demo=True):
-    shm = shared_memory.SharedMemory(create=True, size=SHM_SIZE)
-    shm.buf[:8] = struct.pack('q', 0)
-    print(f"[Main] created shared memory name={shm.name}")
+    # The segment comes from the process-wide pool: a repeated run reuses the
+    # same mapping instead of creating and unlinking one, and the children get
+    # the SharedMemory object itself rather than reopening it by name. The
+    # lock is profiled: wait/hold times per process go to a contention summary.
+    pool = _pool()
+    shm = pool.acquire(SHM_SIZE)
+    ev.info(_channel(shm.name), f"[Main] using pooled shared memory name={shm.name}")
+    try:
+        if use_lock_demo:
+            lock = ProfiledLock()
+            w = Process(target=writer_with_lock, args=(shm, lock, iterations, rw_delay))
+            r = Process(target=reader_with_lock, args=(shm, lock, iterations, rw_delay))
+        else:
+            w = Process(target=writer_no_lock, args=(shm, iterations, rw_delay))
+            r = Process(target=reader_no_lock, args=(shm, iterations, rw_delay))
 
+        start = time.monotonic()
+        r.start()
+        w.start()
+        pool.track(shm, r, w)
+        w.join()
+        r.join()
+        elapsed = time.monotonic() - start
+    finally:
+        pool.release(shm)
     if use_lock_demo:
+        report(profile(lock.stats, "mutex", elapsed, roles={w.pid: "Writer-Lock", r.pid: "Reader-Lock"}),
+               _channel(shm.name))
+    ev.info(_channel(shm.name), "[Shared Memory Demo] finished. (segment returned to the pool)")
+
+
+# ---------------------------------------------------------------------------
+# Seqlock mode: a multi-word record guarded by a sequence counter instead of a
+# Lock. The writer makes seq odd, writes every word, then makes it even again;
+# readers copy the record and retry if seq was odd or changed meanwhile. Every
+# word of a record holds the same value, so a copy with mixed values is a torn
+# read. run_seqlock_comparison() runs the same load under "lock", "seqlock" and
+# "nolock" and reports reads/s, retry rate and torn reads for each.
+# ---------------------------------------------------------------------------
+SEQ_WORDS = 16
+_U64 = struct.Struct('Q')
+_SEQ_OFF, _STOP_OFF, _REC_OFF = 0, 8, 64
+
+def _record_struct(words):
+    return struct.Struct(f'{words}q')
+
+def seq_writer(seg, mode, lock, words, write_delay, results):
+    shm = attach(seg)
+    name = shm.name
+    buf = shm.buf
+    rec = _record_struct(words)
+    seq = 0
+    writes = 0
+    start = time.monotonic()
+    while not _U64.unpack_from(buf, _STOP_OFF)[0]:
+        writes += 1
+        values = (writes,) * words
+        if mode == "seqlock":
+            seq += 1
+            _U64.pack_into(buf, _SEQ_OFF, seq)          # odd: write in progress
+            rec.pack_into(buf, _REC_OFF, *values)
+            seq += 1
+            _U64.pack_into(buf, _SEQ_OFF, seq)          # even: record stable
+        elif mode == "lock":
+            with lock:
+                rec.pack_into(buf, _REC_OFF, *values)
+        else:
+            rec.pack_into(buf, _REC_OFF, *values)
+        if write_delay:
+            time.sleep(write_delay)
+    elapsed = time.monotonic() - start
+    del buf
+    shm.close()
+    results.put({"role": "writer", "writes": writes, "elapsed_s": elapsed})
+    ev.emit(ev.DONE, _channel(name), f"Writer-{mode}")
+
+def seq_reader(seg, mode, lock, words, results):
+    shm = attach(seg)
+    name = shm.name
+    buf = shm.buf
+    rec = _record_struct(words)
+    end = _REC_OFF + rec.size
+    reads = retries = torn = 0
+    start = time.monotonic()
+    while not _U64.unpack_from(buf, _STOP_OFF)[0]:
+        if mode == "seqlock":
+            s1 = _U64.unpack_from(buf, _SEQ_OFF)[0]
+            if s1 & 1:
+                retries += 1
+                continue
+            raw = bytes(buf[_REC_OFF:end])
+            if _U64.unpack_from(buf, _SEQ_OFF)[0] != s1:
+                retries += 1
+                continue
+        elif mode == "lock":
+            with lock:
+                raw = bytes(buf[_REC_OFF:end])
+        else:
+            raw = bytes(buf[_REC_OFF:end])
+        values = rec.unpack(raw)
+        if values.count(values[0]) != words:
+            torn += 1
+        reads += 1
+    elapsed = time.monotonic() - start
+    del buf
+    shm.close()
+    results.put({"role": "reader", "reads": reads, "retries": retries, "torn": torn,
+                 "elapsed_s": elapsed})
+    ev.emit(ev.DONE, _channel(name), f"Reader-{mode}")
+
+def run_seqlock_mode(mode, duration=2.0, words=SEQ_WORDS, readers=1, write_delay=0.0):
+    """Run one writer and `readers` readers for `duration` seconds under `mode`."""
+    from multiprocessing import Queue
+    pool = _pool()
+    shm = pool.acquire(_REC_OFF + 8 * words)  # zeroed
+    try:
         lock = Lock()
-        w = Process(target=writer_with_lock, args=(shm.name, lock, iterations, rw_delay))
-        r = Process(target=reader_with_lock, args=(shm.name, lock, iterations, rw_delay))
+        results = Queue()
+        w = Process(target=seq_writer, args=(shm, mode, lock, words, write_delay, results))
+        rs = [Process(target=seq_reader, args=(shm, mode, lock, words, results))
+              for _ in range(readers)]
+        for r in rs:
+            r.start()
+        w.start()
+        pool.track(shm, w, *rs)
+        time.sleep(duration)
+        _U64.pack_into(shm.buf, _STOP_OFF, 1)
+        rows = [results.get() for _ in range(readers + 1)]
+        writer = next(r for r in rows if r["role"] == "writer")
+        rows = [r for r in rows if r["role"] == "reader"]
+        w.join()
+        for r in rs:
+            r.join()
+    finally:
+        pool.release(shm)
+
+    reads = sum(r["reads"] for r in rows)
+    retries = sum(r["retries"] for r in rows)
+    elapsed = max(r["elapsed_s"] for r in rows)
+    row = {
+        "mode": mode,
+        "readers": readers,
+        "words": words,
+        "reads": reads,
+        "reads_per_s": reads / elapsed if elapsed else 0.0,
+        "writes_per_s": writer["writes"] / writer["elapsed_s"] if writer["elapsed_s"] else 0.0,
+        "retries": retries,
+        "retry_rate": retries / (reads + retries) if reads + retries else 0.0,
+        "torn_reads": sum(r["torn"] for r in rows),
+    }
+    ev.result(_channel(shm.name), row)
+    return row
+
+def run_seqlock_comparison(duration=2.0, words=SEQ_WORDS, readers=1, write_delay=0.0,
+                           modes=("lock", "seqlock", "nolock")):
+    rows = [run_seqlock_mode(m, duration, words, readers, write_delay) for m in modes]
+    channel = "shm"
+    ev.info(channel, f"[Seqlock] {words}-word record, {readers} reader(s), {duration:g}s per mode")
+    ev.info(channel, f"{'mode':<8} {'reads/s':>10} {'writes/s':>10} {'retry rate':>10} {'torn reads':>10}")
+    for r in rows:
+        ev.info(channel, f"{r['mode']:<8} {r['reads_per_s']:>10.0f} {r['writes_per_s']:>10.0f} "
+                         f"{r['retry_rate']:>10.2%} {r['torn_reads']:>10}")
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Lost-update race detector: K processes each do N read-modify-write increments
+# of one shared 64-bit counter. Without a lock, increments that interleave
+# overwrite each other; the final counter falls short of K*N by exactly the
+# number of lost updates.
+# ---------------------------------------------------------------------------
+_I64 = struct.Struct('q')
+MAX_RACE_TOTAL = 2**32 - 1  # the RACE event carries procs * increments in its u32 size field
+
+def counter_worker(seg, lock, increments, idx, barrier, results):
+    shm = attach(seg)
+    buf = shm.buf
+    unpack, pack = _I64.unpack_from, _I64.pack_into
+    barrier.wait()  # start together to maximise overlap
+    start = time.monotonic()
+    if lock is None:
+        for _ in range(increments):
+            pack(buf, 0, unpack(buf, 0)[0] + 1)
+    else:
+        for _ in range(increments):
+            with lock:
+                pack(buf, 0, unpack(buf, 0)[0] + 1)
+    elapsed = time.monotonic() - start
+    del buf
+    shm.close()
+    results.put({"worker": idx, "pid": os.getpid(), "increments": increments,
+                 "elapsed_s": elapsed, "ops_per_s": increments / elapsed if elapsed else 0.0})
+
+def run_counter_race(procs=4, increments=1_000_000, use_lock=False):
+    """Run one variant and return expected/final/lost counts plus per-process rows."""
+    from multiprocessing import Barrier, Queue
+    if procs * increments > MAX_RACE_TOTAL:
+        raise ValueError(f"{procs} procs x {increments} increments is over {MAX_RACE_TOTAL} in total")
+    variant = "lock" if use_lock else "no-lock"
+    pool = _pool()
+    shm = pool.acquire(8)  # zeroed counter
+    try:
+        lock = Lock() if use_lock else None
+        barrier = Barrier(procs)
+        results = Queue()
+        workers = [Process(target=counter_worker,
+                           args=(shm, lock, increments, i, barrier, results))
+                   for i in range(procs)]
+        start = time.monotonic()
+        for w in workers:
+            w.start()
+        pool.track(shm, *workers)
+        per_process = sorted((results.get() for _ in workers), key=lambda r: r["worker"])
+        for w in workers:
+            w.join()
+        elapsed = time.monotonic() - start
+        final = _I64.unpack_from(shm.buf, 0)[0]
+    finally:
+        pool.release(shm)
+
+    expected = procs * increments
+    lost = expected - final
+    channel = _channel(shm.name)
+    for row in per_process:
+        ev.info(channel, f"[Race] {variant} worker {row['worker']} (pid {row['pid']}): "
+                         f"{row['increments']} increments in {row['elapsed_s']:.3f}s "
+                         f"({row['ops_per_s']:.0f}/s)")
+    ev.emit(ev.RACE, channel, f"{variant}, {procs} procs x {increments}",
+            size=expected, value=lost, flags=0 if use_lock else ev.FLAG_UNSYNC)
+    row = {
+        "variant": variant,
+        "procs": procs,
+        "increments": increments,
+        "expected": expected,
+        "final": final,
+        "lost_updates": lost,
+        "elapsed_s": elapsed,
+        "ops_per_s": expected / elapsed if elapsed else 0.0,
+        "per_process": per_process,
+    }
+    ev.result(channel, row)
+    return row
+
+def run_race_comparison(procs=4, increments=1_000_000):
+    rows = [run_counter_race(procs, increments, use_lock=False),
+            run_counter_race(procs, increments, use_lock=True)]
+    ev.info("shm", f"{'variant':<8} {'expected':>10} {'final':>10} {'lost':>10} {'ops/s':>10}")
+    for r in rows:
+        ev.info("shm", f"{r['variant']:<8} {r['expected']:>10} {r['final']:>10} "
+                       f"{r['lost_updates']:>10} {r['ops_per_s']:>10.0f}")
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Wakeup modes: how a reader learns that the writer published a new value.
+# "poll" re-reads the slot every poll interval, so it pays up to a full period
+# of latency, can miss values overwritten between polls and burns CPU on empty
+# polls. The notification modes have the writer ring after every write:
+#   event      multiprocessing.Event (reader waits, clears, reads)
+#   condition  multiprocessing.Condition around the slot, notify_all per write
+#   pipe       one-way Pipe per reader, one byte per write
+#   eventfd    Linux eventfd per reader (counter; one read drains any backlog)
+# The reader stamps write-to-observe latency, missed values and empty wakeups;
+# CPU time of the reader shows what each mode costs while idle-waiting.
+# ---------------------------------------------------------------------------
+WAKE_MODES = ("event", "condition", "pipe", "eventfd")
+_WAKE_STOP_OFF = _SLOT.size
+_WAKE_SIZE = _SLOT.size + 8
+_WAIT_S = 0.5  # notification waits time out so a lost wakeup can't hang a run
+
+def wake_modes():
+    """Notification modes available on this platform."""
+    return tuple(m for m in WAKE_MODES if m != "eventfd" or hasattr(os, "eventfd"))
+
+def _ring(mode, bell, doorbells):
+    if mode == "event":
+        bell.set()
+    elif mode == "condition":
+        bell.notify_all()
+    elif mode == "pipe":
+        for conn in doorbells:
+            conn.send_bytes(b"\x01")
+    elif mode == "eventfd":
+        for fd in doorbells:
+            os.eventfd_write(fd, 1)
+
+def wake_writer(seg, mode, bell, doorbells, duration, write_interval, results):
+    shm = attach(seg)
+    name = shm.name
+    buf = shm.buf
+    writes = 0
+    cpu0 = time.process_time()
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        writes += 1
+        if mode == "condition":
+            with bell:
+                _SLOT.pack_into(buf, 0, writes, time.monotonic_ns())
+                bell.notify_all()
+        else:
+            _SLOT.pack_into(buf, 0, writes, time.monotonic_ns())
+            _ring(mode, bell, doorbells)
+        time.sleep(write_interval)
+    _U64.pack_into(buf, _WAKE_STOP_OFF, 1)
+    if mode == "condition":
+        with bell:
+            bell.notify_all()
     else:
-        w = Process(target=writer_no_lock, args=(shm.name, iterations, rw_delay))
-        r = Process(target=reader_no_lock, args=(shm.name, iterations, rw_delay))
+        _ring(mode, bell, doorbells)
+    del buf
+    shm.close()
+    results.put({"role": "writer", "writes": writes, "cpu_s": time.process_time() - cpu0})
+    ev.emit(ev.DONE, _channel(name), f"Writer-{mode}")
 
-    r.start()
-    w.start()
-    w.join()
-    r.join()
+def _wait(mode, bell, doorbell, buf, last, poll_interval):
+    """Block until the writer (probably) published something new; returns the slot."""
+    if mode == "poll":
+        time.sleep(poll_interval)
+    elif mode == "event":
+        bell.wait(_WAIT_S)
+        bell.clear()
+    elif mode == "condition":
+        with bell:
+            bell.wait_for(lambda: _SLOT.unpack_from(buf, 0)[0] != last
+                          or _U64.unpack_from(buf, _WAKE_STOP_OFF)[0], _WAIT_S)
+            return _SLOT.unpack_from(buf, 0)
+    elif mode == "pipe":
+        if doorbell.poll(_WAIT_S):
+            while doorbell.poll():
+                doorbell.recv_bytes()
+    elif mode == "eventfd":
+        os.eventfd_read(doorbell)  # returns and resets the pending count
+    return _SLOT.unpack_from(buf, 0)
 
+def wake_reader(seg, mode, bell, doorbell, poll_interval, results):
+    shm = attach(seg)
+    name = shm.name
+    buf = shm.buf
+    hist = LatencyHistogram()
+    last = wakeups = empty = missed = 0
+    cpu0 = time.process_time()
+    start = time.monotonic()
+    while True:
+        val, ts = _wait(mode, bell, doorbell, buf, last, poll_interval)
+        wakeups += 1
+        if val != last:
+            hist.record(time.monotonic_ns() - ts)
+            missed += val - last - 1
+            last = val
+        else:
+            empty += 1
+        if _U64.unpack_from(buf, _WAKE_STOP_OFF)[0]:
+            break
+    elapsed = time.monotonic() - start
+    cpu_s = time.process_time() - cpu0
+    del buf
     shm.close()
-    shm.unlink()
-    print("[Shared Memory Demo] finished. (unlinked shared memory)")
+    results.put({"role": "reader", "wakeups": wakeups, "empty": empty, "missed": missed,
+                 "cpu_s": cpu_s, "elapsed_s": elapsed, "latency": hist.to_bytes()})
+    ev.emit(ev.DONE, _channel(name), f"Reader-{mode}")
+
+def run_wakeup_mode(mode, poll_interval=0.01, duration=2.0, write_interval=0.005, readers=1):
+    """One writer publishing every `write_interval` s for `duration` s, read under `mode`."""
+    import multiprocessing
+    ctx = multiprocessing.get_context("fork") if mode == "eventfd" else multiprocessing
+    results = ctx.Queue()
+    bell, doorbells, ends = None, [None] * readers, []
+    if mode == "event":
+        bell = ctx.Event()
+    elif mode == "condition":
+        bell = ctx.Condition()
+    elif mode == "pipe":
+        pairs = [ctx.Pipe(duplex=False) for _ in range(readers)]
+        doorbells, ends = [r for r, _ in pairs], [w for _, w in pairs]
+    elif mode == "eventfd":
+        doorbells = [os.eventfd(0) for _ in range(readers)]  # inherited across fork
+        ends = doorbells
+    elif mode != "poll":
+        raise ValueError(f"unknown wakeup mode {mode!r}")
+
+    pool = _pool()
+    shm = pool.acquire(_WAKE_SIZE)  # zeroed
+    try:
+        rs = [ctx.Process(target=wake_reader, args=(shm, mode, bell, doorbells[i], poll_interval, results))
+              for i in range(readers)]
+        w = ctx.Process(target=wake_writer, args=(shm, mode, bell, ends, duration, write_interval, results))
+        for r in rs:
+            r.start()
+        w.start()
+        pool.track(shm, w, *rs)
+        rows = [results.get() for _ in range(readers + 1)]
+        w.join()
+        for r in rs:
+            r.join()
+    finally:
+        pool.release(shm)
+        if mode == "eventfd":
+            for fd in doorbells:
+                os.close(fd)
+    channel = _channel(shm.name)
+
+    writer = next(r for r in rows if r["role"] == "writer")
+    rows = [r for r in rows if r["role"] == "reader"]
+    hist = LatencyHistogram()
+    for r in rows:
+        hist.merge(LatencyHistogram.from_bytes(r["latency"]))
+    label = f"poll {poll_interval * 1e3:g}ms" if mode == "poll" else mode
+    ev.latency(channel, hist)
+    cpu_s = sum(r["cpu_s"] for r in rows)
+    elapsed = max(r["elapsed_s"] for r in rows)
+    summary = hist.summary()
+    row = {
+        "mode": label,
+        "readers": readers,
+        "writes": writer["writes"],
+        "observed": summary["count"],
+        "missed": sum(r["missed"] for r in rows),
+        "wakeups": sum(r["wakeups"] for r in rows),
+        "empty_wakeups": sum(r["empty"] for r in rows),
+        "reader_cpu_s": cpu_s,
+        "reader_cpu_pct": 100.0 * cpu_s / (elapsed * readers) if elapsed else 0.0,
+        "writer_cpu_s": writer["cpu_s"],
+        "p50_ns": summary["p50_ns"],
+        "p99_ns": summary["p99_ns"],
+        "max_ns": summary["max_ns"],
+    }
+    ev.result(channel, row)
+    return row
+
+def run_wakeup_comparison(duration=2.0, write_interval=0.005, readers=1,
+                          poll_intervals=(0.001, 0.01, 0.05), modes=None):
+    """Polling at each interval vs every notification mode, one table."""
+    rows = [run_wakeup_mode("poll", p, duration, write_interval, readers) for p in poll_intervals]
+    rows += [run_wakeup_mode(m, 0.0, duration, write_interval, readers) for m in (modes or wake_modes())]
+    channel = "shm"
+    ev.info(channel, f"[Wakeup] writer every {write_interval * 1e3:g}ms for {duration:g}s, {readers} reader(s)")
+    ev.info(channel, f"{'mode':<12} {'writes':>7} {'missed':>7} {'empty':>7} "
+                     f"{'p50 us':>9} {'p99 us':>9} {'max us':>9} {'cpu %':>7}")
+    for r in rows:
+        ev.info(channel, f"{r['mode']:<12} {r['writes']:>7} {r['missed']:>7} {r['empty_wakeups']:>7} "
+                         f"{r['p50_ns'] / 1e3:>9.1f} {r['p99_ns'] / 1e3:>9.1f} {r['max_ns'] / 1e3:>9.1f} "
+                         f"{r['reader_cpu_pct']:>7.2f}")
+    return rows
@@ -0,0 +1,434 @@
+# shm_pool.py
+# Reusable SharedMemory segments with lifecycle tracking, and a /dev/shm scan
+# for leaked segments.
+#
+# A plain run creates a segment (shm_open + ftruncate + mmap), lets its
+# children reopen it by name, and unlinks it at the end, unless the run dies
+# first and the segment leaks. SegmentPool keeps released segments mapped and
+# hands them out again, zeroed, to the next run in the same process. Children
+# get the SharedMemory object itself: under fork they inherit the mapping and
+# open nothing; under spawn it pickles to its name and
+# shared_memory_sim.attach() reopens it. shared_memory_sim imports this module
+# only where fcntl exists; elsewhere its runs use plain segments unlinked after
+# each run.
+#
+# Pooled segments are named PREFIX<size>_<id>, and the process using one
+# holds a POSIX record lock (lockf) on it. The kernel drops that lock when the
+# process exits, crashes included. A segment left behind by a dead process is
+# therefore simply free again: the next pool in any process adopts it instead
+# of creating a new one. A new segment is built under a temporary name and
+# locked before it is renamed into its size class, so no other pool can adopt
+# it half made. At exit a pool leaves at most MAX_IDLE free segments per size
+# class in /dev/shm, counting those of other processes, and unlinks the rest.
+# reclaim() trims free pooled segments unused for IDLE_TTL and unlinks
+# orphans: segments no process maps or has open.
+#
+#   python shm_pool.py scan
+#   python shm_pool.py reclaim --all
+#   python shm_pool.py bench --cycles 2000
+import argparse
+import atexit
+import fcntl
+import os
+import time
+import uuid
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+
+import ipc_events as ev
+from proc_attach import PROC, SHM_DIR, find_pids
+
+CHANNEL = "shm-pool"
+PREFIX = "ipcsim_"
+MIN_SEGMENT = 4096
+MAX_IDLE = 4             # idle segments per size class: mapped per process, free in /dev/shm
+IDLE_TTL = 3600.0        # reclaim(): free pooled segments unused this long are unlinked
+ORPHAN_AGE = 60.0        # reclaim(): leave orphans younger than this alone
+ORPHAN_PREFIXES = ("psm_", PREFIX)  # multiprocessing's default names and ours
+
+# status: "in use" (mapped/open by a process, or locked by a pool),
+# "idle" (pooled, free for reuse) or "orphaned" (nobody has it; a leak)
+ShmEntry = namedtuple("ShmEntry", "name size resident age pids status")
+
+_held = set()  # names this process holds a pool lock on
+
+
+def segment_size(n):
+    """Size class of an n-byte request: the next power of two, at least a page."""
+    return max(MIN_SEGMENT, 1 << (max(n, 1) - 1).bit_length())
+
+
+def _path(name):
+    return os.path.join(SHM_DIR, name)
+
+
+def _untrack(shm):
+    # The pool, not multiprocessing's resource tracker, decides when a pooled
+    # segment is unlinked; the tracker would unlink it when this process exits.
+    resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def _try_lock(name):
+    """An fd holding the pool lock on `name`, or None if another process has it."""
+    try:
+        fd = os.open(_path(name), os.O_RDWR)
+    except OSError:
+        return None
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class _Lease:
+    __slots__ = ("shm", "lock_fd", "size", "procs", "uses")
+
+    def __init__(self, shm, lock_fd, size):
+        self.shm = shm
+        self.lock_fd = lock_fd
+        self.size = size
+        self.procs = []
+        self.uses = 0
+
+
+class SegmentPool:
+    """Hands out zeroed SharedMemory segments and takes them back for reuse.
+
+    acquire(n) -> SharedMemory of at least n bytes; track(shm, *processes)
+    records the children it was given to; release(shm) returns it. A segment
+    whose tracked children are still running when it is released is not
+    reused by this process; one whose children crashed is zeroed and reused.
+    """
+
+    def __init__(self, prefix=PREFIX, max_idle=MAX_IDLE):
+        self.prefix = prefix
+        self.max_idle = max_idle
+        self._idle = {}    # size -> [_Lease]
+        self._leases = {}  # name -> _Lease handed out
+        self.stats = {"created": 0, "reused": 0, "adopted": 0, "crashed": 0, "abandoned": 0}
+
+    def _adopt(self, size):
+        """Lock a free pooled segment of this size class left by another (possibly dead) process."""
+        head = f"{self.prefix}{size}_"
+        try:
+            names = [n for n in os.listdir(SHM_DIR) if n.startswith(head) and n not in _held]
+        except OSError:
+            return None
+        for name in names:
+            fd = _try_lock(name)
+            if fd is None:
+                continue
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            except (OSError, ValueError):  # ValueError: still empty, not a usable segment
+                os.close(fd)
+                continue
+            _untrack(shm)
+            if shm.size < size:
+                shm.close()
+                os.close(fd)
+                continue
+            self.stats["adopted"] += 1
+            return _Lease(shm, fd, size)
+        return None
+
+    def _create(self, size):
+        # Made and locked under a name _adopt() never looks at, then renamed into
+        # the size class: the lock follows the file, so it is never adoptable unlocked.
+        key = uuid.uuid4().hex[:12]
+        name = f"{self.prefix}{size}_{key}"
+        tmp = _path(f"{self.prefix}new_{key}")
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            os.ftruncate(fd, size)
+            os.rename(tmp, _path(name))
+        except OSError:
+            os.close(fd)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        shm = shared_memory.SharedMemory(name=name)
+        _untrack(shm)
+        self.stats["created"] += 1
+        return _Lease(shm, fd, size)
+
+    def acquire(self, n):
+        size = segment_size(n)
+        idle = self._idle.get(size)
+        if idle:
+            lease = idle.pop()
+            self.stats["reused"] += 1
+        else:
+            lease = self._adopt(size) or self._create(size)
+            _held.add(lease.shm.name)
+        lease.shm.buf[:n] = bytes(n)
+        lease.procs = []
+        lease.uses += 1
+        self._leases[lease.shm.name] = lease
+        return lease.shm
+
+    def track(self, shm, *procs):
+        """Record the processes (multiprocessing.Process) that were handed `shm`."""
+        self._leases[shm.name].procs.extend(procs)
+
+    def attached(self, shm):
+        """Pids of tracked processes that are still running."""
+        return [p.pid for p in self._leases[shm.name].procs if p.is_alive()]
+
+    def release(self, shm):
+        lease = self._leases.pop(shm.name)
+        running = [p for p in lease.procs if p.is_alive()]
+        crashed = [p for p in lease.procs if p.exitcode not in (None, 0)]
+        if crashed:
+            self.stats["crashed"] += 1
+            ev.info(CHANNEL, f"[Pool] {shm.name}: pid(s) {', '.join(str(p.pid) for p in crashed)} "
+                             f"exited abnormally; segment reclaimed")
+        if running:
+            # Still attached: drop it from this pool (and unlink it, so a later
+            # run can't get it) but leave the mapping to those processes.
+            self.stats["abandoned"] += 1
+            ev.info(CHANNEL, f"[Pool] {shm.name}: still attached by pid(s) "
+                             f"{', '.join(str(p.pid) for p in running)}; not reused")
+            self._discard(lease, unlink=True)
+            return
+        idle = self._idle.setdefault(lease.size, [])
+        if len(idle) >= self.max_idle:
+            self._discard(lease, unlink=True)
+        else:
+            idle.append(lease)
+
+    def _discard(self, lease, unlink):
+        name = lease.shm.name
+        lease.shm.close()
+        if unlink:
+            try:
+                os.unlink(_path(name))
+            except OSError:
+                pass
+        if lease.lock_fd is not None:
+            os.close(lease.lock_fd)
+        _held.discard(name)
+
+    def close(self, unlink=False):
+        """Unmap every idle segment; without unlink up to max_idle per size class
+        stay in /dev/shm for later runs."""
+        for size, idle in self._idle.items():
+            for lease in idle:
+                try:
+                    os.utime(_path(lease.shm.name))  # age for reclaim()'s IDLE_TTL
+                except OSError:
+                    pass
+                self._discard(lease, unlink)
+            if not unlink:
+                self._trim(size)
+        self._idle.clear()
+
+    def _trim(self, size):
+        """Unlink free segments of this size class beyond max_idle, whoever left them."""
+        head = f"{self.prefix}{size}_"
+        try:
+            names = sorted(n for n in os.listdir(SHM_DIR) if n.startswith(head) and n not in _held)
+        except OSError:
+            return
+        free = 0
+        for name in names:
+            fd = _try_lock(name)
+            if fd is None:
+                continue  # in use by another pool
+            free += 1
+            if free > self.max_idle:
+                try:
+                    os.unlink(_path(name))
+                except OSError:
+                    pass
+            os.close(fd)
+
+
+_default = None
+_default_pid = None
+
+
+def default_pool():
+    """The process-wide pool the simulations share; closed at interpreter exit."""
+    global _default, _default_pid
+    if _default is None or _default_pid != os.getpid():
+        # a forked child starts its own pool: the parent's locks aren't inherited
+        _default, _default_pid = SegmentPool(), os.getpid()
+        atexit.register(_default.close)
+    return _default
+
+
+# ---------------------------------------------------------------------------
+# /dev/shm scan
+# ---------------------------------------------------------------------------
+def shm_attachments():
+    """{segment name: {pid}} of every process that maps a segment or has it open."""
+    out = {}
+    marker = (SHM_DIR + "/").encode()
+    for pid in find_pids():
+        try:
+            with open(f"{PROC}/{pid}/maps", "rb") as f:
+                maps = f.read()
+        except OSError:
+            maps = b""
+        for line in maps.splitlines():
+            i = line.find(marker)
+            if i >= 0:
+                name = line[i + len(marker):].split(b" ")[0].decode("utf-8", "replace")
+                out.setdefault(name, set()).add(pid)
+        fd_dir = f"{PROC}/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if target.startswith(SHM_DIR + "/"):
+                out.setdefault(target[len(SHM_DIR) + 1:], set()).add(pid)
+    return out
+
+
+def scan(prefix=PREFIX):
+    """Every /dev/shm segment with its size, attached pids and status."""
+    attached = shm_attachments()
+    now = time.time()
+    entries = []
+    try:
+        dir_entries = list(os.scandir(SHM_DIR))
+    except OSError:
+        return entries
+    for e in dir_entries:
+        try:
+            st = e.stat()
+        except OSError:
+            continue
+        pids = sorted(attached.get(e.name, ()))
+        if pids or e.name in _held:
+            status = "in use"
+        elif e.name.startswith(prefix):
+            fd = _try_lock(e.name)
+            if fd is None:
+                status = "in use"
+            else:
+                os.close(fd)
+                status = "idle"
+        else:
+            status = "orphaned"
+        entries.append(ShmEntry(e.name, st.st_size, st.st_blocks * 512, now - st.st_mtime, pids, status))
+    entries.sort(key=lambda s: (s.status, -s.size))
+    return entries
+
+
+def reclaim(entries=None, prefixes=ORPHAN_PREFIXES, min_age=ORPHAN_AGE, idle_ttl=IDLE_TTL):
+    """Unlink orphans named with one of `prefixes` (all if None) that are older than
+    min_age, and idle pooled segments unused for idle_ttl; returns what was removed."""
+    removed = []
+    for s in scan() if entries is None else entries:
+        if s.status == "orphaned":
+            if s.age < min_age or (prefixes is not None and not s.name.startswith(tuple(prefixes))):
+                continue
+        elif s.status == "idle":
+            if s.age < idle_ttl:
+                continue
+            fd = _try_lock(s.name)  # don't pull it away from a pool adopting it right now
+            if fd is None:
+                continue
+            os.close(fd)
+        else:
+            continue
+        try:
+            os.unlink(_path(s.name))
+        except OSError:
+            continue
+        removed.append(s)
+    return removed
+
+
+def format_scan(entries):
+    from ipc_bench import format_size
+    lines = [f"{'status':<9} {'size':>9} {'resident':>9} {'age':>9}  {'pids':<16} name"]
+    for s in entries:
+        pids = ",".join(map(str, s.pids[:4])) + ("..." if len(s.pids) > 4 else "")
+        lines.append(f"{s.status:<9} {format_size(s.size):>9} {format_size(s.resident):>9} "
+                     f"{s.age:>8.0f}s  {pids or '-':<16} {s.name}")
+    leaked = [s for s in entries if s.status == "orphaned"]
+    lines.append(f"{len(entries)} segments, {len(leaked)} orphaned "
+                 f"({format_size(sum(s.resident for s in leaked))} resident)")
+    return lines
+
+
+def report(reclaim_orphans=False, all_prefixes=False):
+    """Scan /dev/shm into ev.info lines and one RESULT; optionally reclaim first."""
+    removed = []
+    if reclaim_orphans:
+        removed = reclaim(prefixes=None if all_prefixes else ORPHAN_PREFIXES)
+        for s in removed:
+            ev.info(CHANNEL, f"[Pool] unlinked {s.status} {s.name} ({s.size} bytes)")
+    entries = scan()
+    for line in format_scan(entries):
+        ev.info(CHANNEL, line)
+    orphans = [s for s in entries if s.status == "orphaned"]
+    row = {"segments": len(entries),
+           "orphaned": len(orphans),
+           "orphaned_bytes": sum(s.size for s in orphans),
+           "idle": sum(s.status == "idle" for s in entries),
+           "reclaimed": len(removed),
+           "reclaimed_bytes": sum(s.size for s in removed)}
+    ev.result(CHANNEL, row)
+    return row
+
+
+# ---------------------------------------------------------------------------
+# benchmark: a fresh segment per run vs the pool
+# ---------------------------------------------------------------------------
+def bench(cycles=2000, size=16):
+    """Per-run cost of create + map + unlink vs acquire/release from a pool."""
+    t0 = time.perf_counter()
+    for _ in range(cycles):
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        shm.close()
+        shm.unlink()
+    fresh = (time.perf_counter() - t0) / cycles
+
+    pool = SegmentPool(prefix=PREFIX + "bench_")
+    t0 = time.perf_counter()
+    for _ in range(cycles):
+        pool.release(pool.acquire(size))
+    pooled = (time.perf_counter() - t0) / cycles
+    pool.close(unlink=True)
+    row = {"cycles": cycles, "size": size, "fresh_us": fresh * 1e6, "pooled_us": pooled * 1e6,
+           "speedup": fresh / pooled if pooled else 0.0, "created": pool.stats["created"]}
+    ev.info(CHANNEL, f"[Pool] {cycles} runs of a {size}-byte segment: fresh {row['fresh_us']:.1f} us/run, "
+                     f"pooled {row['pooled_us']:.2f} us/run ({row['speedup']:.0f}x, "
+                     f"{row['created']} segment created)")
+    ev.result(CHANNEL, row)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared-memory segment pool and /dev/shm leak scan")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("scan", help="List /dev/shm segments with size, attached pids and status")
+    p = sub.add_parser("reclaim", help="Unlink orphaned and long-idle segments, then scan")
+    p.add_argument("--all", action="store_true", help="Orphans of any name, not only psm_*/ipcsim_*")
+    p = sub.add_parser("bench", help="Fresh segment per run vs pooled")
+    p.add_argument("--cycles", type=int, default=2000)
+    p.add_argument("--size", type=int, default=16)
+    args = parser.parse_args(argv)
+    if args.cmd == "bench":
+        bench(args.cycles, args.size)
+    else:
+        report(reclaim_orphans=args.cmd == "reclaim", all_prefixes=getattr(args, "all", False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# shm_ring.py
+# Lock-free single-producer/single-consumer ring buffer in a SharedMemory segment.
+#
+# Layout (all little-endian u64 counters, each on its own cache line):
+#   [0]   head      total bytes ever written   (only the producer stores it)
+#   [64]  tail      total bytes ever consumed  (only the consumer stores it)
+#   [128] capacity  size of the data area in bytes (multiple of 8)
+#   [192] data area
+# Records are a u32 length followed by the payload, padded to 8 bytes. A record
+# never straddles the end of the data area: the producer writes a WRAP marker
+# and continues at offset 0. The producer publishes a record by storing head
+# only after the payload is written; the consumer frees space by storing tail
+# only after it is done with the payload. That ordering is what makes SPSC safe
+# without a lock on x86-64 (TSO); weakly ordered CPUs would need real fences,
+# which pure Python cannot issue.
+from multiprocessing import shared_memory
+import struct
+import time
+
+import ipc_events as ev
+import ipc_bench
+from latency_hist import LatencyHistogram
+
+CHANNEL = "shm-ring"
+HEADER = 192
+DEFAULT_CAPACITY = 1 << 20
+WRAP = 0xFFFFFFFF
+SPIN = 200          # busy checks before backing off to sleep
+BACKOFF_S = 50e-6
+
+_U64 = struct.Struct("<Q")
+_U32 = struct.Struct("<I")
+_STAMP = struct.Struct("<q")
+_HEAD, _TAIL, _CAP = 0, 64, 128
+
+
+def _record_size(n):
+    return (_U32.size + n + 7) & ~7
+
+
+class ShmRing:
+    """One end of an SPSC ring. Use create() in the parent, attach() in the children."""
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.buf = shm.buf
+        self.owner = owner
+        self.capacity = _U64.unpack_from(self.buf, _CAP)[0]
+        self.data = self.buf[HEADER:HEADER + self.capacity]
+
+    @classmethod
+    def create(cls, capacity=DEFAULT_CAPACITY):
+        capacity = (capacity + 7) & ~7
+        shm = shared_memory.SharedMemory(create=True, size=HEADER + capacity)
+        shm.buf[:HEADER] = bytes(HEADER)
+        _U64.pack_into(shm.buf, _CAP, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def max_record(self):
+        return self.capacity // 2 - _U32.size
+
+    def used(self):
+        return _U64.unpack_from(self.buf, _HEAD)[0] - _U64.unpack_from(self.buf, _TAIL)[0]
+
+    # ---- producer side --------------------------------------------------
+    def try_write(self, data):
+        """Append one record; False if there is not enough free space right now."""
+        n = len(data)
+        if n > self.max_record():
+            raise ValueError(f"record of {n} bytes exceeds ring limit {self.max_record()}")
+        rec = _record_size(n)
+        head = _U64.unpack_from(self.buf, _HEAD)[0]
+        tail = _U64.unpack_from(self.buf, _TAIL)[0]
+        pos = head % self.capacity
+        to_end = self.capacity - pos
+        need = rec if rec <= to_end else to_end + rec
+        if self.capacity - (head - tail) < need:
+            return False
+        if rec > to_end:
+            _U32.pack_into(self.data, pos, WRAP)
+            head += to_end
+            pos = 0
+        _U32.pack_into(self.data, pos, n)
+        self.data[pos + 4:pos + 4 + n] = data
+        _U64.pack_into(self.buf, _HEAD, head + rec)  # publish
+        return True
+
+    def write(self, data):
+        """Blocking append: spins, then backs off, until there is room."""
+        spins = 0
+        while not self.try_write(data):
+            spins += 1
+            if spins > SPIN:
+                time.sleep(BACKOFF_S)
+
+    # ---- consumer side --------------------------------------------------
+    def _next(self):
+        """(pos, length) of the next record, skipping WRAP markers, or None if empty."""
+        while True:
+            tail = _U64.unpack_from(self.buf, _TAIL)[0]
+            if tail == _U64.unpack_from(self.buf, _HEAD)[0]:
+                return None
+            pos = tail % self.capacity
+            n = _U32.unpack_from(self.data, pos)[0]
+            if n != WRAP:
+                return pos, n
+            _U64.pack_into(self.buf, _TAIL, tail + self.capacity - pos)
+
+    def _release(self, n):
+        tail = _U64.unpack_from(self.buf, _TAIL)[0]
+        _U64.pack_into(self.buf, _TAIL, tail + _record_size(n))
+
+    def try_read_into(self, out):
+        """Copy the next record into `out`; returns its length or -1 if empty."""
+        nxt = self._next()
+        if nxt is None:
+            return -1
+        pos, n = nxt
+        out[:n] = self.data[pos + 4:pos + 4 + n]
+        self._release(n)
+        return n
+
+    def read_into(self, out):
+        spins = 0
+        while True:
+            n = self.try_read_into(out)
+            if n >= 0:
+                return n
+            spins += 1
+            if spins > SPIN:
+                time.sleep(BACKOFF_S)
+
+    def read(self):
+        """Blocking read of the next record as bytes."""
+        spins = 0
+        while True:
+            nxt = self._next()
+            if nxt is not None:
+                pos, n = nxt
+                data = bytes(self.data[pos + 4:pos + 4 + n])
+                self._release(n)
+                return data
+            spins += 1
+            if spins > SPIN:
+                time.sleep(BACKOFF_S)
+
+    def close(self):
+        self.data.release()
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ---- benchmark transport (plugs into ipc_bench.run_pair) ------------------
+def bench_sender(name, size, count, mode, results):
+    ring = ShmRing.attach(name)
+    payload = bytearray(max(size, _STAMP.size))
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    for _ in range(count):
+        _STAMP.pack_into(payload, 0, time.monotonic_ns())
+        ring.write(payload)
+    ipc_bench.report("sender", start, time.monotonic_ns(), cpu0, results)
+    ring.close()
+
+
+def bench_receiver(name, size, count, mode, results):
+    ring = ShmRing.attach(name)
+    hist = LatencyHistogram()
+    buf = bytearray(max(size, _STAMP.size))
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    for _ in range(count):
+        ring.read_into(buf)
+        hist.record(time.monotonic_ns() - _STAMP.unpack_from(buf)[0])
+    ipc_bench.report("receiver", start, time.monotonic_ns(), cpu0, results,
+                     latency=hist.summary())
+    ring.close()
+
+
+def run_benchmark(sizes=None, count=None, capacity=None):
+    """Throughput/latency of the ring at each size, same columns as the pipe benchmark."""
+    if sizes is None:
+        sizes = ipc_bench.DEFAULT_SIZES
+    results = []
+    for size in sizes:
+        n = count or ipc_bench.default_count(size)
+        ring = ShmRing.create(capacity or max(DEFAULT_CAPACITY, 4 * _record_size(max(size, 8))))
+        try:
+            result = ipc_bench.run_pair(CHANNEL, "bytes", bench_sender, bench_receiver,
+                                        ring.name, ring.name, size, n)
+        finally:
+            ring.close()
+        ev.info(CHANNEL, f"[Ring Bench] {ipc_bench.format_size(size):>7} x {n}: "
+                         f"{result['msgs_per_s']:.0f} msgs/s, {result['mb_per_s']:.1f} MB/s")
+        results.append(result)
+    return results
@@ -0,0 +1,322 @@
+# shm_slab.py
+# Zero-copy transfer of large payloads through pooled SharedMemory slabs.
+#
+# The sender writes a payload once into a block of a slab segment; only a
+# SlabRef(segment, offset, length) descriptor travels through the Pipe or
+# Queue. The receiver maps each segment once and gets a memoryview of the
+# block, with no copy, then releases the block for reuse.
+#
+# Blocks come in power-of-two size classes; a class's segments are created on
+# demand and reused for the lifetime of the pool, so steady-state transfers
+# never create or map anything. A class holds at most max_blocks blocks (and
+# max_bytes): when all are in flight the sender waits for the receiver, which
+# is the pool's backpressure. Allocation is first-fit, so the same few blocks
+# keep being reused and their pages stay mapped and warm on both sides instead
+# of every payload faulting in fresh tmpfs pages. Segment layout:
+#   [0]   magic u32, block size u32, block count u32, data offset u32
+#   [16]  one state byte per block (FREE / BUSY)
+#   [data offset]  the blocks, page aligned
+# The sender sets a block BUSY before handing it out and only the receiver
+# sets it FREE again, so each state byte has one writer at a time and no lock
+# is needed (same x86-64 store-ordering argument as shm_ring.py).
+#
+# dumps()/loads() add pickle protocol 5 on top: every out-of-band buffer of
+# at least OOB_THRESHOLD bytes goes into a slab instead of the pickle stream.
+# A pickle.PickleBuffer arrives as a memoryview of the slab (zero-copy);
+# bytearray and similar types are rebuilt from it with one copy.
+#
+#   python shm_slab.py --sizes 1K,64K,1M,16M,100M
+import argparse
+import pickle
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import Pipe, Queue, resource_tracker, shared_memory
+
+import ipc_events as ev
+import ipc_bench
+from latency_hist import LatencyHistogram
+
+CHANNEL = "slab"
+MIN_BLOCK = 4096
+SEGMENT_BYTES = 64 * 1024 * 1024   # target segment size; bigger blocks get one segment each
+MAX_BLOCKS = 32                    # blocks in flight per size class
+MAX_BYTES = 512 * 1024 * 1024      # per size class
+OOB_THRESHOLD = 64 * 1024
+PAGE = 4096
+SPIN = 200
+BACKOFF_S = 50e-6
+BENCH_ALLOC_TIMEOUT_S = 30.0       # a receiver that stopped releasing blocks is gone
+SLAB_SIZES = [1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024, 100 * 1024 * 1024]
+
+FREE, BUSY = 0, 1
+_FREE, _BUSY = bytes([FREE]), bytes([BUSY])
+_MAGIC = 0x534C4142  # "SLAB"
+_HEADER = struct.Struct("<IIII")
+_STAMP = struct.Struct("<q")
+
+SlabRef = namedtuple("SlabRef", "segment offset length")
+
+
+def size_class(n):
+    """Block size for an n-byte payload: the next power of two, at least MIN_BLOCK."""
+    return max(MIN_BLOCK, 1 << (max(n, 1) - 1).bit_length())
+
+
+class _Segment:
+    def __init__(self, shm, block, count, base):
+        self.shm = shm
+        self.block = block
+        self.count = count
+        self.base = base
+
+
+class SlabPool:
+    """Sender side: allocates blocks and writes payloads into them."""
+
+    def __init__(self, segment_bytes=SEGMENT_BYTES, max_blocks=MAX_BLOCKS, max_bytes=MAX_BYTES):
+        self.segment_bytes = segment_bytes
+        self.max_blocks = max_blocks
+        self.max_bytes = max_bytes
+        self._classes = {}  # block size -> [_Segment]
+        self.stats = {"segments": 0, "allocs": 0, "waits": 0}
+
+    def _limit(self, block):
+        return max(1, min(self.max_blocks, self.max_bytes // block))
+
+    def _new_segment(self, block):
+        count = max(1, min(self._limit(block), self.segment_bytes // block))
+        base = (_HEADER.size + count + PAGE - 1) // PAGE * PAGE
+        shm = shared_memory.SharedMemory(create=True, size=base + count * block)
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, block, count, base)
+        shm.buf[_HEADER.size:_HEADER.size + count] = bytes(count)
+        self.stats["segments"] += 1
+        return _Segment(shm, block, count, base)
+
+    def _states(self, seg):
+        return bytes(seg.shm.buf[_HEADER.size:_HEADER.size + seg.count])
+
+    def _find_free(self, segments):
+        for seg in segments:
+            states = self._states(seg)
+            i = states.find(_FREE)
+            if i >= 0:
+                return seg, i
+        return None
+
+    def alloc(self, n, timeout=None):
+        """(SlabRef, writable memoryview of n bytes) in a block now owned by the caller.
+
+        With every block of the size class in flight this waits for a receiver
+        to release one; with a timeout (seconds) it raises TimeoutError instead
+        of waiting forever.
+        """
+        block = size_class(n)
+        segments = self._classes.setdefault(block, [])
+        spins = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            found = self._find_free(segments)
+            if found is None and sum(s.count for s in segments) < self._limit(block):
+                segments.append(self._new_segment(block))
+                found = segments[-1], 0
+            if found is not None:
+                break
+            spins += 1
+            if spins == 1:
+                self.stats["waits"] += 1
+            if spins > SPIN:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"no free {block}-byte slab block within {timeout}s "
+                                       f"({self._limit(block)} in flight)")
+                time.sleep(BACKOFF_S)
+        seg, i = found
+        seg.shm.buf[_HEADER.size + i] = BUSY
+        offset = seg.base + i * block
+        self.stats["allocs"] += 1
+        return SlabRef(seg.shm.name, offset, n), seg.shm.buf[offset:offset + n]
+
+    def put(self, data, timeout=None):
+        """Copy a bytes-like payload into a new block; returns its SlabRef."""
+        view = memoryview(data).cast("B")
+        ref, dest = self.alloc(view.nbytes, timeout)
+        dest[:] = view
+        dest.release()
+        return ref
+
+    def in_use(self):
+        return sum(self._states(seg).count(_BUSY) for segs in self._classes.values() for seg in segs)
+
+    def close(self, wait=True, timeout=10.0):
+        """Unlink every segment; with wait, first give receivers time to release their blocks."""
+        deadline = time.monotonic() + timeout
+        while wait and self.in_use() and time.monotonic() < deadline:
+            time.sleep(BACKOFF_S)
+        for segs in self._classes.values():
+            for seg in segs:
+                seg.shm.close()
+                seg.shm.unlink()
+        self._classes.clear()
+
+
+class SlabReader:
+    """Receiver side: maps segments once and hands out memoryviews of blocks."""
+
+    def __init__(self):
+        self._segments = {}  # name -> (SharedMemory, block, base)
+
+    def _segment(self, name):
+        seg = self._segments.get(name)
+        if seg is None:
+            shm = shared_memory.SharedMemory(name=name)
+            magic, block, _, base = _HEADER.unpack_from(shm.buf, 0)
+            if magic != _MAGIC:
+                shm.close()
+                raise ValueError(f"{name} is not a slab segment")
+            seg = self._segments[name] = (shm, block, base)
+        return seg
+
+    def view(self, ref):
+        """Read-only memoryview of the payload, backed by the slab (no copy)."""
+        shm = self._segment(ref.segment)[0]
+        return shm.buf[ref.offset:ref.offset + ref.length].toreadonly()
+
+    def release(self, ref):
+        """Give the block back to the sender; views of it must no longer be used."""
+        shm, block, base = self._segment(ref.segment)
+        shm.buf[_HEADER.size + (ref.offset - base) // block] = FREE
+
+    def close(self):
+        for shm, _, _ in self._segments.values():
+            shm.close()
+        self._segments.clear()
+
+
+def dumps(obj, pool, threshold=OOB_THRESHOLD, timeout=None):
+    """Pickle obj with protocol 5; large out-of-band buffers go to slabs.
+
+    Returns the small message to send: (pickle bytes, [SlabRef]).
+    """
+    refs = []
+
+    def to_slab(buf):
+        raw = buf.raw()
+        if raw.nbytes < threshold:
+            return True  # small: keep it in the pickle stream
+        refs.append(pool.put(raw, timeout))
+        return False
+
+    return pickle.dumps(obj, protocol=5, buffer_callback=to_slab), refs
+
+
+def loads(message, reader):
+    """Inverse of dumps(); returns (obj, refs) and the caller releases refs when done."""
+    data, refs = message
+    return pickle.loads(data, buffers=[reader.view(r) for r in refs]), refs
+
+
+def _send(endpoint, msg):
+    (endpoint.send if hasattr(endpoint, "send") else endpoint.put)(msg)
+
+
+def _recv(endpoint):
+    return endpoint.recv() if hasattr(endpoint, "recv") else endpoint.get()
+
+
+# ---- benchmark transport (plugs into ipc_bench.run_pair) ------------------
+def bench_sender(endpoint, size, count, mode, results):
+    """mode "slab": put the payload in a slab, send (ts, SlabRef);
+    mode "oob": send (ts, dumps({"data": PickleBuffer(payload)}))."""
+    pool = SlabPool()
+    payload = bytearray(max(size, _STAMP.size))
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    try:
+        for _ in range(count):
+            ts = time.monotonic_ns()
+            _STAMP.pack_into(payload, 0, ts)
+            if mode == "slab":
+                _send(endpoint, (ts, pool.put(payload, BENCH_ALLOC_TIMEOUT_S)))
+            else:
+                _send(endpoint, (ts, dumps({"data": pickle.PickleBuffer(payload)}, pool,
+                                           timeout=BENCH_ALLOC_TIMEOUT_S)))
+    except TimeoutError:
+        pool.close(wait=False)  # don't leave the segments in /dev/shm
+        raise
+    ipc_bench.report("sender", start, time.monotonic_ns(), cpu0, results,
+                     segments=pool.stats["segments"], pool_waits=pool.stats["waits"])
+    pool.close()
+
+
+def bench_receiver(endpoint, size, count, mode, results):
+    reader = SlabReader()
+    hist = LatencyHistogram()
+    cpu0 = time.process_time()
+    start = time.monotonic_ns()
+    for _ in range(count):
+        ts, msg = _recv(endpoint)
+        if mode == "slab":
+            view = reader.view(msg)
+            refs = (msg,)
+        else:
+            obj, refs = loads(msg, reader)
+            view = obj["data"]
+        _STAMP.unpack_from(view)  # the consumer touches the payload in place
+        if isinstance(view, memoryview):
+            view.release()  # small "oob" payloads stay in-band and arrive as a bytearray
+        for ref in refs:
+            reader.release(ref)
+        hist.record(time.monotonic_ns() - ts)
+    ipc_bench.report("receiver", start, time.monotonic_ns(), cpu0, results,
+                     latency=hist.summary())
+    reader.close()
+
+
+def run_benchmark(sizes=None, count=None, transports=("pipe", "queue"), modes=("slab", "oob"),
+                  baseline=True, table=False):
+    """Slab and pickle-5 out-of-band transfer over Pipe/Queue, next to plain pickling."""
+    if sizes is None:
+        sizes = SLAB_SIZES
+    # Forked sender and receiver must share one resource tracker: attaching a
+    # segment registers it too, and a tracker of the receiver's own would warn
+    # about (and try to unlink) every segment the sender already cleaned up.
+    resource_tracker.ensure_running()
+    results = []
+    if baseline:
+        if "pipe" in transports:
+            from pipe_simulation import run_benchmark as pipe_bench
+            results.extend(pipe_bench(sizes=sizes, count=count, modes=("pickle",)))
+        if "queue" in transports:
+            from message_queue_sim import run_benchmark as queue_bench
+            results.extend(queue_bench(sizes=sizes, count=count))
+    for size in sizes:
+        n = count or ipc_bench.default_count(size)
+        for transport in transports:
+            for mode in modes:
+                if transport == "pipe":
+                    tx, rx = Pipe()
+                else:
+                    tx = rx = Queue(maxsize=64)
+                result = ipc_bench.run_pair(transport, mode, bench_sender, bench_receiver, tx, rx, size, n)
+                ev.info(CHANNEL, f"[Slab Bench] {transport:<5} {mode:<4} {ipc_bench.format_size(size):>7} x {n}: "
+                                 f"{result['mb_per_s']:.1f} MB/s, {result['cpu_us_per_msg']:.2f} us CPU/msg")
+                results.append(result)
+    results.sort(key=lambda r: (r["size"], r["transport"], r["mode"]))
+    if table:
+        for line in ipc_bench.format_table(results):
+            ev.info(CHANNEL, line)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zero-copy slab transfer vs pickling")
+    parser.add_argument("--sizes", default=None, help="Comma-separated sizes (default 1K,64K,1M,16M,100M)")
+    parser.add_argument("--count", type=int, default=None)
+    parser.add_argument("--transports", default="pipe,queue")
+    args = parser.parse_args(argv)
+    sizes = [ipc_bench.parse_size(s) for s in args.sizes.split(",")] if args.sizes else None
+    run_benchmark(sizes=sizes, count=args.count, transports=tuple(args.transports.split(",")), table=True)
+
+
+if __name__ == "__main__":
+    main()
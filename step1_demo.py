@@ -1,41 +1,238 @@
 # step1_demo.py
 # Launcher to run each demo interactively from CLI.
 import argparse
+import os
 import time
 
-def run_pipe():
+import ipc_events as ev
+
+def run_pipe(sender_delay=1.5, messages=None, receiver_delay=0.0, backlog_interval=0.0):
+    from pipe_simulation import run_demo as pipe_run
+    ev.info("pipe", f"Running Pipe demo (sender_delay={sender_delay} => simulates bottleneck)...")
+    pipe_run(messages=messages, sender_delay=sender_delay, receiver_delay=receiver_delay,
+             backlog_interval=backlog_interval)
+
+def run_pipe_bench(sizes=None, count=None):
     from pipe_simulation import run_demo as pipe_run
-    print("Running Pipe demo (sender_delay=1.5 => simulates bottleneck)...")
-    pipe_run(sender_delay=1.5)
+    ev.info("pipe", "Running Pipe benchmark (pickle send vs send_bytes/recv_bytes_into)...")
+    pipe_run(benchmark=True, sizes=sizes, count=count)
+
+def run_transport_bench(transports, sizes=None, count=None):
+    from ipc_bench import run_comparison
+    ev.info("bench", f"Running transport comparison ({', '.join(transports)})...")
+    run_comparison(transports, sizes=sizes, count=count)
 
-def run_queue():
+def run_slab_bench(sizes=None, count=None):
+    from shm_slab import run_benchmark as slab_run
+    ev.info("slab", "Running slab benchmark (shared-memory descriptors vs pickling over Pipe/Queue)...")
+    slab_run(sizes=sizes, count=count, table=True)
+
+def run_scaling(transports, max_procs=None, size=None, count=None):
+    from scaling_bench import DEFAULT_COUNT, DEFAULT_SIZE, run_scaling as scaling_run
+    ev.info("scaling", f"Running producers x consumers scaling sweep ({', '.join(transports)})...")
+    scaling_run(transports, max_procs=max_procs, size=size or DEFAULT_SIZE, count=count or DEFAULT_COUNT)
+
+def run_queue(batch_size=1, queue_maxsize=3, produce_delay=0.1, consume_delay=1.0, items=None):
     from message_queue_sim import run_demo as queue_run
-    print("Running Queue demo (producer fast, consumer slow => queue can fill)...")
-    queue_run(queue_maxsize=3, produce_delay=0.1, consume_delay=1.0)
+    ev.info("queue", "Running Queue demo (producer fast, consumer slow => queue can fill)...")
+    queue_run(items=items, queue_maxsize=queue_maxsize, produce_delay=produce_delay,
+              consume_delay=consume_delay, batch_size=batch_size)
 
-def run_shared(lock_demo=True):
-    from shared_memory_sim import run_demo as shm_run
-    print(f"Running Shared Memory demo (use_lock_demo={lock_demo})...")
-    shm_run(use_lock_demo=lock_demo, iterations=6, rw_delay=0.3)
+def run_queue_bench(count=None):
+    from message_queue_sim import run_batch_comparison
+    ev.info("queue", "Running Queue batching comparison (per-item put/get vs batched)...")
+    run_batch_comparison(n_items=count or 20000)
 
-if __name__ == "__main__":
+def run_shared(lock_demo=True, iterations=6, rw_delay=0.3):
+    from shared_memory_sim import run_demo as shm_run, run_counter_race
+    ev.info("shm", f"Running Shared Memory demo (use_lock_demo={lock_demo})...")
+    shm_run(use_lock_demo=lock_demo, iterations=iterations, rw_delay=rw_delay)
+    # Measure instead of assuming: a short lost-update run decides the race verdict
+    run_counter_race(procs=2, increments=200_000, use_lock=lock_demo)
+
+def run_shared_race(procs=4, increments=1_000_000):
+    from shared_memory_sim import run_race_comparison
+    ev.info("shm", f"Running lost-update race detector ({procs} procs x {increments} increments)...")
+    run_race_comparison(procs=procs, increments=increments)
+
+def run_shared_seqlock(duration=2.0, readers=1):
+    from shared_memory_sim import run_seqlock_comparison
+    ev.info("shm", "Running Shared Memory seqlock comparison (lock vs seqlock vs no lock)...")
+    run_seqlock_comparison(duration=duration, readers=readers)
+
+def run_shared_wakeup(duration=2.0, readers=1, write_interval=0.005, poll_intervals=None):
+    from shared_memory_sim import run_wakeup_comparison
+    ev.info("shm", "Running Shared Memory wakeup comparison (sleep-polling vs writer notifications)...")
+    run_wakeup_comparison(duration=duration, write_interval=write_interval, readers=readers,
+                          poll_intervals=poll_intervals or (0.001, 0.01, 0.05))
+
+def run_lock_profile(variants, procs=4, duration=2.0, read_ratio=None, shards=None):
+    from lock_profiler import DEFAULT_READ_RATIO, SHARDS, run_comparison
+    ev.info("locks", f"Running lock contention profile ({', '.join(variants)}) on a shared record table...")
+    run_comparison(variants, procs=procs, duration=duration,
+                   read_ratio=DEFAULT_READ_RATIO if read_ratio is None else read_ratio,
+                   shards=shards or SHARDS)
+
+def run_shm_scan(reclaim=False):
+    from shm_pool import report
+    ev.info("shm-pool", "Scanning /dev/shm for pooled, in-use and orphaned segments...")
+    report(reclaim_orphans=reclaim)
+
+def run_dining(strategies, philosophers=5, duration=2.0, think_s=0.01, eat_s=0.01, reach_s=None):
+    from dining_philosophers import REACH_S, run_comparison
+    ev.info("dining", f"Running dining philosophers ({', '.join(strategies)}) with real fork locks...")
+    run_comparison(strategies, n=philosophers, duration=duration, think_s=think_s, eat_s=eat_s,
+                   reach_s=REACH_S if reach_s is None else reach_s)
+
+def run_all_parallel(jobs, cpus=None):
+    """Run the four basic demos concurrently; wall time ~ the slowest one."""
+    from parallel_runner import DEFAULT_SUITE, run_parallel
+
+    def finished(r):
+        ev.info("demo", f"[Parallel] {r['scenario']} finished in {r['wall_s']:.2f}s: "
+                        f"{r['bottlenecks']} bottleneck(s), {r['drops']} drop(s), "
+                        f"race detected={r['race_detected']}")
+
+    report = run_parallel([(name, {}) for name in DEFAULT_SUITE], jobs=jobs, cpus=cpus,
+                          on_result=finished)
+    ev.info("demo", f"[Parallel] {report['instances']} scenarios in {report['wall_s']:.2f}s "
+                    f"(serial would take {report['serial_wall_s']:.2f}s, speedup {report['speedup']:.1f}x)")
+    return report
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="IPC Debugger Step1 Demos")
     parser.add_argument("--pipe", action="store_true", help="Run pipe demo")
     parser.add_argument("--queue", action="store_true", help="Run queue demo")
     parser.add_argument("--shm", action="store_true", help="Run shared memory demo (with lock)")
     parser.add_argument("--shm-nolock", action="store_true", help="Run shared memory demo (no lock)")
-    args = parser.parse_args()
+    parser.add_argument("--shm-seqlock", action="store_true",
+                        help="Compare Lock, seqlock and unsynchronized reads of a multi-word record")
+    parser.add_argument("--shm-race", action="store_true",
+                        help="Count lost updates on a shared counter with and without Lock")
+    parser.add_argument("--shm-wakeup", action="store_true",
+                        help="Compare sleep-polling readers with Event/Condition/pipe/eventfd notification")
+    parser.add_argument("--shm-scan", action="store_true",
+                        help="List /dev/shm segments with size, attached pids and leak status")
+    parser.add_argument("--shm-reclaim", action="store_true",
+                        help="Unlink orphaned and long-idle segments, then scan /dev/shm")
+    parser.add_argument("--lock-profile", default=None, metavar="VARIANTS",
+                        help="Profile lock wait/hold/contention, e.g. mutex,rw,sharded")
+    parser.add_argument("--read-ratio", type=float, default=None,
+                        help="Lock profile: share of operations that only read (default 0.8)")
+    parser.add_argument("--shards", type=int, default=None, help="Lock profile: locks of the sharded variant (default 4)")
+    parser.add_argument("--write-interval", type=float, default=0.005,
+                        help="Wakeup comparison: seconds between writes (default 0.005)")
+    parser.add_argument("--poll-intervals", default=None,
+                        help="Wakeup comparison: comma-separated poll intervals in seconds (default 0.001,0.01,0.05)")
+    parser.add_argument("--dining", default=None, metavar="STRATEGIES",
+                        help="Dining philosophers with real locks, e.g. naive,ordered,waiter,timeout,chandy_misra")
+    parser.add_argument("--philosophers", type=int, default=5, help="Dining philosophers: table size (default 5)")
+    parser.add_argument("--think", type=float, default=0.01, help="Dining philosophers: mean think time in seconds")
+    parser.add_argument("--eat", type=float, default=0.01, help="Dining philosophers: mean eat time in seconds")
+    parser.add_argument("--reach", type=float, default=None,
+                        help="Dining philosophers: pause between first and second fork (default 0.005)")
+    parser.add_argument("--procs", type=int, default=4,
+                        help="Worker processes for the race detector and lock profile (default 4)")
+    parser.add_argument("--increments", type=int, default=1_000_000,
+                        help="Increments per worker for the race detector (default 1000000)")
+    parser.add_argument("--duration", type=float, default=2.0,
+                        help="Seconds per mode for timed scenarios (default 2)")
+    parser.add_argument("--readers", type=int, default=1,
+                        help="Reader processes for the seqlock and wakeup comparisons (default 1)")
+    parser.add_argument("--pipe-bench", action="store_true", help="Run pipe throughput benchmark")
+    parser.add_argument("--bench", default=None, metavar="TRANSPORTS",
+                        help="Compare transports at equal sizes, e.g. pipe,queue,shm-ring")
+    parser.add_argument("--slab-bench", action="store_true",
+                        help="Compare zero-copy shared-memory slabs with pickling over Pipe and Queue")
+    parser.add_argument("--scaling", default=None, metavar="TRANSPORTS",
+                        help="Producers x consumers sweep, e.g. queue,simplequeue,pipe,shm-ring "
+                             "(message size: first of --sizes, messages per point: --count)")
+    parser.add_argument("--max-procs", type=int, default=None,
+                        help="Scaling sweep: largest producer/consumer count (default: CPUs available)")
+    parser.add_argument("--sizes", default=None,
+                        help="Comma-separated benchmark message sizes, e.g. 8,1K,64K,4M")
+    parser.add_argument("--count", type=int, default=None,
+                        help="Messages per benchmark size (default: scaled to the size)")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="Items per put for the queue demo (default 1)")
+    parser.add_argument("--queue-bench", action="store_true",
+                        help="Compare per-item and batched queue transfer at several maxsize settings")
+    parser.add_argument("--sender-delay", type=float, default=1.5, help="Pipe demo: seconds between sends")
+    parser.add_argument("--messages", type=int, default=None, help="Pipe demo: number of messages")
+    parser.add_argument("--receiver-delay", type=float, default=0.0,
+                        help="Pipe demo: seconds the receiver spends per message (slow consumer)")
+    parser.add_argument("--backlog-interval", type=float, default=0.0,
+                        help="Pipe demo: seconds between FIONREAD backlog samples (default 0 = off)")
+    parser.add_argument("--queue-maxsize", type=int, default=3, help="Queue demo: Queue(maxsize=...)")
+    parser.add_argument("--produce-delay", type=float, default=0.1, help="Queue demo: seconds between puts")
+    parser.add_argument("--consume-delay", type=float, default=1.0, help="Queue demo: seconds per item consumed")
+    parser.add_argument("--items", type=int, default=None, help="Queue demo: number of items")
+    parser.add_argument("--iterations", type=int, default=6, help="Shared memory demo: reads/writes per process")
+    parser.add_argument("--rw-delay", type=float, default=0.3, help="Shared memory demo: seconds between accesses")
+    parser.add_argument("--parallel", type=int, default=None, metavar="JOBS",
+                        help="With no demo flag: run all demos concurrently with up to JOBS at once")
+    parser.add_argument("--cpus", type=int, default=None,
+                        help="With --parallel: pin the demos to this many CPUs")
+    parser.add_argument("--events", action="store_true",
+                        help="Write binary event frames to stdout instead of text (see ipc_events.py)")
+    args = parser.parse_args(argv)
+    if args.shm_race:
+        from shared_memory_sim import MAX_RACE_TOTAL
+        if args.procs * args.increments > MAX_RACE_TOTAL:
+            parser.error(f"--procs x --increments must be at most {MAX_RACE_TOTAL}")
+
+    if args.events:
+        os.environ[ev.ENV_MODE] = "binary"
+
+    sizes = None
+    if args.sizes:
+        from ipc_bench import parse_size
+        sizes = [parse_size(s) for s in args.sizes.split(",")]
+
+    messages = [f"msg{i}" for i in range(1, args.messages + 1)] if args.messages else None
+    items = [f"msg{i}" for i in range(1, args.items + 1)] if args.items else None
 
     if args.pipe:
-        run_pipe()
+        run_pipe(sender_delay=args.sender_delay, messages=messages, receiver_delay=args.receiver_delay,
+                 backlog_interval=args.backlog_interval)
+    elif args.pipe_bench:
+        run_pipe_bench(sizes=sizes, count=args.count)
+    elif args.bench:
+        run_transport_bench(args.bench.split(","), sizes=sizes, count=args.count)
+    elif args.slab_bench:
+        run_slab_bench(sizes=sizes, count=args.count)
+    elif args.scaling:
+        run_scaling(args.scaling.split(","), max_procs=args.max_procs, size=sizes[0] if sizes else None,
+                    count=args.count)
     elif args.queue:
-        run_queue()
+        run_queue(batch_size=args.batch, queue_maxsize=args.queue_maxsize,
+                  produce_delay=args.produce_delay, consume_delay=args.consume_delay, items=items)
+    elif args.queue_bench:
+        run_queue_bench(count=args.count)
     elif args.shm:
-        run_shared(lock_demo=True)
+        run_shared(lock_demo=True, iterations=args.iterations, rw_delay=args.rw_delay)
     elif args.shm_nolock:
-        run_shared(lock_demo=False)
+        run_shared(lock_demo=False, iterations=args.iterations, rw_delay=args.rw_delay)
+    elif args.shm_race:
+        run_shared_race(procs=args.procs, increments=args.increments)
+    elif args.shm_seqlock:
+        run_shared_seqlock(duration=args.duration, readers=args.readers)
+    elif args.shm_wakeup:
+        poll_intervals = [float(p) for p in args.poll_intervals.split(",")] if args.poll_intervals else None
+        run_shared_wakeup(duration=args.duration, readers=args.readers,
+                          write_interval=args.write_interval, poll_intervals=poll_intervals)
+    elif args.lock_profile:
+        run_lock_profile(args.lock_profile.split(","), procs=args.procs, duration=args.duration,
+                         read_ratio=args.read_ratio, shards=args.shards)
+    elif args.shm_scan or args.shm_reclaim:
+        run_shm_scan(reclaim=args.shm_reclaim)
+    elif args.dining:
+        run_dining(args.dining.split(","), philosophers=args.philosophers, duration=args.duration,
+                   think_s=args.think, eat_s=args.eat, reach_s=args.reach)
+    elif args.parallel:
+        run_all_parallel(args.parallel, cpus=args.cpus)
     else:
-        print("No option provided. Running all demos one by one (pipe, queue, shm with lock, shm no lock)")
+        ev.info("demo", "No option provided. Running all demos one by one (pipe, queue, shm with lock, shm no lock)")
         run_pipe()
         time.sleep(1)
         run_queue()
@@ -43,3 +240,6 @@ if __name__ == "__main__":
         run_shared(lock_demo=True)
         time.sleep(1)
         run_shared(lock_demo=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+# trace_file.py
+# Compact append-only binary traces of IPC event runs, for replay without
+# rerunning the processes.
+#
+# File layout (little-endian):
+#   header   magic "IPCTRACE", version u16, record size u16, reserved u32
+#   chunks   chunk header: type u8, 3 pad, count u32, nbytes u32,
+#                          first_ts i64, last_ts i64   (min/max ts_ns of a records chunk)
+#            then nbytes of payload
+#   STRINGS  payload: count x (u32 length + utf-8); string ids continue from
+#            the previous STRINGS chunk, so the table is only ever appended to
+#   RECORDS  payload: count fixed-size records
+#            kind u8, flags u8, pad u16, pid u32, ts_ns i64, size u32, value i64,
+#            channel id u32, label id u32
+# A RECORDS chunk only refers to strings defined before it. The writer fills
+# one preallocated chunk buffer with pack_into and writes it (new strings
+# first) when it is full, so recording costs one struct pack and one dict
+# lookup per event. A crash loses at most the unwritten chunk; a truncated
+# last chunk is ignored on reading.
+#
+#   python trace_file.py record run.ipctrace -- --pipe --sender-delay 0.1
+#   python trace_file.py dump run.ipctrace --limit 20
+#   python trace_file.py bench --events 1000000
+import argparse
+import bisect
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+import ipc_events as ev
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRACE_DIR = os.environ.get("IPC_TRACE_DIR") or os.path.join(HERE, "traces")
+SUFFIX = ".ipctrace"
+
+MAGIC = b"IPCTRACE"
+VERSION = 1
+CHUNK_RECORDS = 4096
+STRINGS, RECORDS = 1, 2
+
+HEADER = struct.Struct("<8sHHI")
+CHUNK = struct.Struct("<BxxxIIqq")
+RECORD = struct.Struct("<BBxxIqIqII")
+_U32 = struct.Struct("<I")
+
+
+class TraceError(ValueError):
+    pass
+
+
+def check_header(path):
+    """Raise TraceError unless `path` starts with a trace header this version reads."""
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+    if len(head) < HEADER.size:
+        raise TraceError(f"{path}: not a trace file (too short)")
+    magic, version, rec_size, _ = HEADER.unpack(head)
+    if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+        raise TraceError(f"{path}: not a version {VERSION} trace file")
+
+
+def new_trace_path(argv, directory=None):
+    """A fresh file name in TRACE_DIR for a run of `step1_demo.py <argv>`."""
+    directory = directory or TRACE_DIR
+    os.makedirs(directory, exist_ok=True)
+    flags = [a.lstrip("-") for a in argv if a.startswith("--") and a != "--events"]
+    name = re.sub(r"[^\w.-]+", "_", flags[0] if flags else "run")
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"{stamp}-{name}{SUFFIX}")
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(directory, f"{stamp}-{name}-{n}{SUFFIX}")
+    return path
+
+
+class TraceWriter:
+    """Appends ipc_events.Event records to a trace file; use as a context manager.
+
+    With index, a trace_index sidecar is built from the chunks as they are
+    written and saved next to the trace on close.
+    """
+
+    def __init__(self, path, chunk_records=CHUNK_RECORDS, index=True):
+        self.path = path
+        self._f = open(path, "wb", buffering=1 << 20)
+        self._f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        self._ids = {}
+        self._new_strings = []
+        self._cap = chunk_records
+        self._buf = bytearray(chunk_records * RECORD.size)
+        self._n = 0
+        self._lo = self._hi = 0
+        self.count = 0
+        # called as listener(kind, payload offset, count, first_ts, last_ts, payload)
+        self.chunk_listeners = []
+        self._index = None
+        if index:
+            from trace_index import TraceIndexBuilder
+            self._index = TraceIndexBuilder()
+            self.chunk_listeners.append(self._index.add_chunk)
+
+    def _intern(self, text):
+        sid = self._ids.get(text)
+        if sid is None:
+            sid = self._ids[text] = len(self._ids)
+            self._new_strings.append(text)
+        return sid
+
+    def write(self, event):
+        ts = event.ts_ns
+        if self._n == 0:
+            self._lo = self._hi = ts
+        elif ts < self._lo:
+            self._lo = ts
+        elif ts > self._hi:
+            self._hi = ts
+        RECORD.pack_into(self._buf, self._n * RECORD.size, event.kind, event.flags, event.pid, ts,
+                         event.size, event.value, self._intern(event.channel), self._intern(event.label))
+        self._n += 1
+        if self._n == self._cap:
+            self.flush()
+
+    def flush(self):
+        """Write the pending chunk (and the strings it needs) to the file."""
+        if self._new_strings:
+            payload = b"".join(_U32.pack(len(b)) + b
+                               for b in (s.encode("utf-8") for s in self._new_strings))
+            self._f.write(CHUNK.pack(STRINGS, len(self._new_strings), len(payload), 0, 0))
+            for listener in self.chunk_listeners:
+                listener(STRINGS, self._f.tell(), len(self._new_strings), 0, 0, payload)
+            self._f.write(payload)
+            self._new_strings = []
+        if self._n:
+            nbytes = self._n * RECORD.size
+            self._f.write(CHUNK.pack(RECORDS, self._n, nbytes, self._lo, self._hi))
+            data = memoryview(self._buf)[:nbytes]
+            for listener in self.chunk_listeners:
+                listener(RECORDS, self._f.tell(), self._n, self._lo, self._hi, data)
+            self._f.write(data)
+            self.count += self._n
+            self._n = 0
+        self._f.flush()
+
+    def close(self):
+        if self._f.closed:
+            return
+        self.flush()
+        size = self._f.tell()
+        self._f.close()
+        if self._index is not None:
+            self._index.save(self.path, size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Strings:
+    """String table decoded lazily, one STRINGS chunk at a time, on first use."""
+
+    def __init__(self, mm, chunks):
+        self._mm = mm
+        self._chunks = chunks  # [(payload offset, count)]
+        self._first = []
+        total = 0
+        for _, count in chunks:
+            self._first.append(total)
+            total += count
+        self._loaded = {}
+
+    def __len__(self):
+        return self._first[-1] + self._chunks[-1][1] if self._chunks else 0
+
+    def _load(self, c):
+        off, count = self._chunks[c]
+        out = []
+        for _ in range(count):
+            (n,) = _U32.unpack_from(self._mm, off)
+            out.append(self._mm[off + 4:off + 4 + n].decode("utf-8", "replace"))
+            off += 4 + n
+        self._loaded[c] = out
+        return out
+
+    def __getitem__(self, sid):
+        c = bisect.bisect_right(self._first, sid) - 1
+        if c < 0:
+            raise IndexError(sid)
+        table = self._loaded.get(c) or self._load(c)
+        return table[sid - self._first[c]]
+
+
+class TraceReader:
+    """Random access to a trace file through mmap.
+
+    Opening walks the chunk headers only (records are not decoded until
+    asked for), or nothing at all when given a trace_index.TraceIndex;
+    len(), reader[i] and events(start) then work by event index, and
+    index_at(ts_ns) finds the first event at or after a time.
+    """
+
+    def __init__(self, path, index=None):
+        self.path = path
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        if size < HEADER.size:
+            self._f.close()
+            raise TraceError(f"{path}: not a trace file (too short)")
+        # Only the pages actually touched (headers, needed chunks) are ever read
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rec_size, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            self.close()
+            raise TraceError(f"{path}: not a version {VERSION} trace file")
+        self.index = index
+        if index is not None:
+            string_chunks, self.chunks = index.string_chunks, index.chunks
+        else:
+            string_chunks, self.chunks = self._walk(size)
+        self.strings = _Strings(self._mm, string_chunks)
+        self._starts = []  # event index of each chunk's first record
+        self._ts_max = []  # running max of last_ts, for time lookup
+        total = 0
+        for _, count, _, hi in self.chunks:
+            self._starts.append(total)
+            self._ts_max.append(max(hi, self._ts_max[-1]) if self._ts_max else hi)
+            total += count
+        self.count = total
+
+    def _walk(self, size):
+        """(string chunks, record chunks) by walking every chunk header."""
+        strings, chunks = [], []  # (payload offset, count) / (payload offset, count, first_ts, last_ts)
+        off = HEADER.size
+        while off + CHUNK.size <= size:
+            kind, count, nbytes, lo, hi = CHUNK.unpack_from(self._mm, off)
+            body = off + CHUNK.size
+            if body + nbytes > size:
+                break  # truncated by a crash mid-write
+            if kind == STRINGS:
+                strings.append((body, count))
+            elif kind == RECORDS:
+                chunks.append((body, count, lo, hi))
+            off = body + nbytes
+        return strings, chunks
+
+    def __len__(self):
+        return self.count
+
+    def _event(self, rec):
+        kind, flags, pid, ts, size, value, channel, label = rec
+        return ev.Event(kind, flags, pid, ts, size, value, self.strings[channel], self.strings[label])
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        c = bisect.bisect_right(self._starts, i) - 1
+        off = self.chunks[c][0] + (i - self._starts[c]) * RECORD.size
+        return self._event(RECORD.unpack_from(self._mm, off))
+
+    def records(self, c, first=0, last=None):
+        """Raw record tuples first..last-1 of record chunk c."""
+        off, count = self.chunks[c][0], self.chunks[c][1]
+        last = count if last is None else last
+        # a copied slice, so an abandoned generator never pins the mmap open
+        return RECORD.iter_unpack(self._mm[off + first * RECORD.size:off + last * RECORD.size])
+
+    def events(self, start=0, stop=None):
+        """Yield events start..stop-1 in recorded order."""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+        c = bisect.bisect_right(self._starts, start) - 1
+        i = start
+        while i < stop:
+            first = i - self._starts[c]
+            last = min(self.chunks[c][1], stop - self._starts[c])
+            for rec in self.records(c, first, last):
+                yield self._event(rec)
+            i += last - first
+            c += 1
+
+    def index_at(self, ts_ns):
+        """Index of the first event with ts_ns >= the given time (len() if none)."""
+        c = bisect.bisect_left(self._ts_max, ts_ns)
+        if c >= len(self.chunks):
+            return self.count
+        i = self._starts[c]
+        for rec in self.records(c):
+            if rec[3] >= ts_ns:
+                return i
+            i += 1
+        return i
+
+    def time_range(self):
+        """(first ts_ns, last ts_ns) over the whole trace, or (0, 0) if empty."""
+        if not self.chunks:
+            return 0, 0
+        return min(c[2] for c in self.chunks), self._ts_max[-1]
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record(argv, path, use_worker=False):
+    """Run `step1_demo.py <argv>` and record its events to path; returns the event count."""
+    import worker_daemon
+    with TraceWriter(path) as writer:
+        for event in worker_daemon.stream_events(["--events"] + list(argv), use_worker=use_worker):
+            writer.write(event)
+    return writer.count
+
+
+def bench(n):
+    """Per-event cost of recording n synthetic events, and the resulting bytes per event."""
+    import tempfile
+    events = [ev.Event(ev.RECV, 0, 1000 + i % 4, i * 1000, 5, i, "pipe", f"msg{i % 1000}")
+              for i in range(min(n, 100_000))]
+    fd, path = tempfile.mkstemp(suffix=SUFFIX)
+    os.close(fd)
+    try:
+        t0 = time.perf_counter()
+        with TraceWriter(path) as w:
+            for i in range(n):
+                w.write(events[i % len(events)])
+        elapsed = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        t0 = time.perf_counter()
+        with TraceReader(path) as r:
+            read = sum(1 for _ in r.events())
+        read_s = time.perf_counter() - t0
+    finally:
+        for p in (path, path + ".idx"):
+            if os.path.exists(p):
+                os.unlink(p)
+    return {"events": n, "write_ns_per_event": elapsed / n * 1e9, "bytes_per_event": size / n,
+            "read_ns_per_event": read_s / read * 1e9 if read else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record, dump and benchmark binary IPC traces")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="Run a step1_demo scenario and record it")
+    rec.add_argument("path")
+    rec.add_argument("demo_args", nargs=argparse.REMAINDER, help="-- followed by step1_demo.py arguments")
+    dump = sub.add_parser("dump", help="Print a trace as text")
+    dump.add_argument("path")
+    dump.add_argument("--start", type=int, default=0)
+    dump.add_argument("--limit", type=int, default=None)
+    b = sub.add_parser("bench", help="Measure recording overhead")
+    b.add_argument("--events", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "record":
+        demo_args = [a for a in args.demo_args if a != "--"] or ["--pipe"]
+        n = record(demo_args, args.path)
+        print(f"[Trace] recorded {n} events to {args.path} ({os.path.getsize(args.path)} bytes)")
+    elif args.cmd == "dump":
+        with TraceReader(args.path) as reader:
+            stop = None if args.limit is None else args.start + args.limit
+            for event in reader.events(args.start, stop):
+                print(f"{event.ts_ns} {event.pid} {ev.format_event(event)}")
+    else:
+        r = bench(args.events)
+        print(f"[Trace] {r['events']} events: write {r['write_ns_per_event']:.0f} ns/event, "
+              f"{r['bytes_per_event']:.1f} bytes/event, read {r['read_ns_per_event']:.0f} ns/event")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
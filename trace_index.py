@@ -0,0 +1,358 @@
+# trace_index.py
+# Sidecar index for trace_file traces (<trace>.idx), so a trace of tens of
+# millions of events opens, seeks and filters without reading it through.
+#
+# The index holds, per RECORDS chunk of the trace: its payload offset, event
+# count and min/max ts_ns (the sparse time checkpoints, one per chunk); the
+# offsets of the STRINGS chunks; and posting lists (chunk, matching events)
+# per pid and per channel. Opening a trace with its index reads only the
+# index; seeking to a time bisects the checkpoints and decodes one chunk;
+# filtering to a process or channel visits only the chunks on its posting
+# list. The trace itself stays memory-mapped, so only those pages are read.
+#
+# The index is built while recording (TraceWriter feeds a TraceIndexBuilder
+# chunk by chunk) or afterwards in one streaming pass with build_index().
+# It records the trace size it describes; a stale index is ignored.
+#
+#   python trace_index.py build run.ipctrace
+#   python trace_index.py query run.ipctrace --at 1.5 --pid 1234 --limit 10
+#   python trace_index.py bench --events 10000000
+import argparse
+import bisect
+import os
+import struct
+import sys
+import time
+from collections import Counter
+
+from trace_file import CHUNK, HEADER, RECORDS, STRINGS, TraceReader, TraceWriter, check_header
+
+SUFFIX = ".idx"
+MAGIC = b"IPCTIDX\0"
+VERSION = 1
+
+_IHEADER = struct.Struct("<8sHxxQQIIII")  # magic, version, trace size, events, chunks, string chunks, pids, channels
+_ICHUNK = struct.Struct("<QIqq")          # payload offset, count, first_ts, last_ts
+_ISTRINGS = struct.Struct("<QI")          # payload offset, count
+_IKEY = struct.Struct("<IQI")             # key (pid or channel string id), first posting, postings
+_IPOST = struct.Struct("<II")             # record chunk number, matching events in it
+_PID_CHANNEL = struct.Struct("<4xI20xI4x")  # just (pid, channel id) out of a RECORD
+
+
+def index_path(trace_path):
+    return trace_path + SUFFIX
+
+
+class TraceIndexBuilder:
+    """Collects index entries chunk by chunk; a TraceWriter chunk listener."""
+
+    def __init__(self):
+        self.chunks = []
+        self.string_chunks = []
+        self.pids = {}      # pid -> [(chunk, count)]
+        self.channels = {}  # channel string id -> [(chunk, count)]
+        self.count = 0
+
+    def add_chunk(self, kind, offset, count, lo, hi, payload):
+        if kind == STRINGS:
+            self.string_chunks.append((offset, count))
+            return
+        c = len(self.chunks)
+        self.chunks.append((offset, count, lo, hi))
+        self.count += count
+        pairs = Counter(_PID_CHANNEL.iter_unpack(payload))
+        per_pid, per_channel = Counter(), Counter()
+        for (pid, channel), n in pairs.items():
+            per_pid[pid] += n
+            per_channel[channel] += n
+        for pid, n in per_pid.items():
+            self.pids.setdefault(pid, []).append((c, n))
+        for channel, n in per_channel.items():
+            self.channels.setdefault(channel, []).append((c, n))
+
+    def save(self, trace_path, trace_size):
+        """Write the sidecar atomically (a reader never sees half an index)."""
+        path = index_path(trace_path)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_IHEADER.pack(MAGIC, VERSION, trace_size, self.count, len(self.chunks),
+                                  len(self.string_chunks), len(self.pids), len(self.channels)))
+            f.write(b"".join(_ICHUNK.pack(*c) for c in self.chunks))
+            f.write(b"".join(_ISTRINGS.pack(*c) for c in self.string_chunks))
+            postings = []
+            for table in (self.pids, self.channels):
+                for key, plist in sorted(table.items()):
+                    f.write(_IKEY.pack(key, len(postings), len(plist)))
+                    postings.extend(plist)
+            f.write(b"".join(_IPOST.pack(*p) for p in postings))
+        os.replace(tmp, path)
+        return path
+
+
+class TraceIndex:
+    """A loaded sidecar: chunk checkpoints, string chunks and posting lists."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _IHEADER.size:
+            raise ValueError(f"{path}: not a trace index")
+        magic, version, self.trace_size, self.count, n_chunks, n_strings, n_pids, n_channels = \
+            _IHEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} trace index")
+        off = _IHEADER.size
+        end = off + n_chunks * _ICHUNK.size
+        self.chunks = list(_ICHUNK.iter_unpack(data[off:end]))
+        off, end = end, end + n_strings * _ISTRINGS.size
+        self.string_chunks = list(_ISTRINGS.iter_unpack(data[off:end]))
+        off, end = end, end + (n_pids + n_channels) * _IKEY.size
+        keys = list(_IKEY.iter_unpack(data[off:end]))
+        self._pids = {k: (first, n) for k, first, n in keys[:n_pids]}
+        self._channels = {k: (first, n) for k, first, n in keys[n_pids:]}
+        self._postings = memoryview(data)[end:]
+
+    def _plist(self, entry):
+        if entry is None:
+            return []
+        first, n = entry
+        return list(_IPOST.iter_unpack(self._postings[first * _IPOST.size:(first + n) * _IPOST.size]))
+
+    def pids(self):
+        return sorted(self._pids)
+
+    def pid_postings(self, pid):
+        return self._plist(self._pids.get(pid))
+
+    def channel_ids(self):
+        return sorted(self._channels)
+
+    def channel_postings(self, channel_id):
+        return self._plist(self._channels.get(channel_id))
+
+
+def load_index(trace_path):
+    """The trace's sidecar index, or None if it is missing, unreadable or stale."""
+    try:
+        index = TraceIndex(index_path(trace_path))
+        size = os.path.getsize(trace_path)
+    except (OSError, ValueError):
+        return None
+    return index if index.trace_size == size else None
+
+
+def build_index(trace_path, bufsize=1 << 20):
+    """Index an existing trace in one sequential pass (records are read chunk by chunk)."""
+    builder = TraceIndexBuilder()
+    with open(trace_path, "rb", buffering=bufsize) as f:
+        size = os.fstat(f.fileno()).st_size
+        off = f.seek(HEADER.size)
+        while off + CHUNK.size <= size:
+            kind, count, nbytes, lo, hi = CHUNK.unpack(f.read(CHUNK.size))
+            body = off + CHUNK.size
+            if body + nbytes > size:
+                break
+            if kind == RECORDS:
+                builder.add_chunk(kind, body, count, lo, hi, f.read(nbytes))
+            else:
+                if kind == STRINGS:
+                    builder.add_chunk(kind, body, count, 0, 0, None)
+                f.seek(nbytes, os.SEEK_CUR)
+            off = body + nbytes
+    builder.save(trace_path, size)
+    return builder
+
+
+def open_trace(path, build=True):
+    """TraceReader backed by the sidecar index, (re)building it first when build is set.
+
+    Without a usable index (none, or its sidecar can't be written, e.g. in a
+    read-only directory) the reader walks the chunk headers instead.
+    """
+    check_header(path)  # never write a sidecar next to a file that isn't a trace
+    index = load_index(path)
+    if index is None and build:
+        try:
+            build_index(path)
+        except OSError:
+            return TraceReader(path)
+        index = load_index(path)
+    return TraceReader(path, index=index)
+
+
+class TraceView:
+    """The events of one pid or one channel, with the TraceReader interface a player needs.
+
+    Built from a posting list, so len() is exact without decoding anything and
+    events(start) skips whole chunks by count.
+    """
+
+    def __init__(self, reader, postings, field, key):
+        self.reader = reader
+        self.postings = postings  # [(chunk, matching events)]
+        self._field = field       # position in the raw RECORD tuple: 2 = pid, 6 = channel id
+        self._key = key
+        self._starts = []
+        self._ts_max = []
+        total = 0
+        for c, n in postings:
+            self._starts.append(total)
+            hi = reader.chunks[c][3]
+            self._ts_max.append(max(hi, self._ts_max[-1]) if self._ts_max else hi)
+            total += n
+        self.count = total
+
+    def __len__(self):
+        return self.count
+
+    def _matching(self, c):
+        field, key = self._field, self._key
+        return (rec for rec in self.reader.records(c) if rec[field] == key)
+
+    def events(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+        p = bisect.bisect_right(self._starts, start) - 1
+        i = self._starts[p]
+        for c, _ in self.postings[p:]:
+            for rec in self._matching(c):
+                if i >= stop:
+                    return
+                if i >= start:
+                    yield self.reader._event(rec)
+                i += 1
+
+    def index_at(self, ts_ns):
+        p = bisect.bisect_left(self._ts_max, ts_ns)
+        if p >= len(self.postings):
+            return self.count
+        i = self._starts[p]
+        for rec in self._matching(self.postings[p][0]):
+            if rec[3] >= ts_ns:
+                return i
+            i += 1
+        return i
+
+    def time_range(self):
+        if not self.postings:
+            return 0, 0
+        return min(self.reader.chunks[c][2] for c, _ in self.postings), self._ts_max[-1]
+
+    def close(self):
+        self.reader.close()
+
+
+def filter_trace(reader, pid=None, channel=None):
+    """TraceView of reader restricted to one pid or one channel name."""
+    index = reader.index
+    if index is None:
+        raise ValueError("filtering needs the trace index (open with open_trace)")
+    if pid is not None:
+        return TraceView(reader, index.pid_postings(pid), 2, pid)
+    for sid in index.channel_ids():
+        if reader.strings[sid] == channel:
+            return TraceView(reader, index.channel_postings(sid), 6, sid)
+    return TraceView(reader, [], 6, -1)
+
+
+# ---------------------------------------------------------------------------
+# CLI / benchmark
+# ---------------------------------------------------------------------------
+def _synthetic(path, n, pids=8, channels=("pipe", "queue", "shm", "bench")):
+    from ipc_events import RECV, Event
+    with TraceWriter(path) as w:
+        for i in range(n):
+            w.write(Event(RECV, 0, 1000 + i % pids, i * 1000, 5, i, channels[i % len(channels)],
+                          f"msg{i % 997}"))
+
+
+def bench(n, directory=None):
+    """Open / seek / filter times on an n-event synthetic trace, indexed vs header walk."""
+    import tempfile
+    fd, path = tempfile.mkstemp(suffix=".ipctrace", dir=directory)
+    os.close(fd)
+    out = {"events": n}
+    try:
+        t0 = time.perf_counter()
+        _synthetic(path, n)
+        out["record_s"] = time.perf_counter() - t0
+        out["trace_mb"] = os.path.getsize(path) / 1e6
+        out["index_kb"] = os.path.getsize(index_path(path)) / 1e3
+        t0 = time.perf_counter()
+        build_index(path)
+        out["rebuild_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        walked = TraceReader(path)
+        out["open_walk_ms"] = (time.perf_counter() - t0) * 1e3
+        walked.close()
+        t0 = time.perf_counter()
+        reader = open_trace(path, build=False)
+        out["open_indexed_ms"] = (time.perf_counter() - t0) * 1e3
+
+        lo, hi = reader.time_range()
+        t0 = time.perf_counter()
+        i = reader.index_at(lo + (hi - lo) * 2 // 3)
+        first = next(reader.events(i))
+        out["seek_ms"] = (time.perf_counter() - t0) * 1e3
+        t0 = time.perf_counter()
+        view = filter_trace(reader, pid=first.pid)
+        j = view.index_at(first.ts_ns)
+        got = list(view.events(j, j + 100))
+        out["filter_pid_ms"] = (time.perf_counter() - t0) * 1e3
+        out["filter_ok"] = all(e.pid == first.pid for e in got) and len(got) == 100
+        t0 = time.perf_counter()
+        view = filter_trace(reader, channel="shm")
+        got = list(view.events(len(view) // 2, len(view) // 2 + 100))
+        out["filter_channel_ms"] = (time.perf_counter() - t0) * 1e3
+        out["filter_ok"] = out["filter_ok"] and all(e.channel == "shm" for e in got)
+        reader.close()
+    finally:
+        for p in (path, index_path(path)):
+            if os.path.exists(p):
+                os.unlink(p)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query trace sidecar indexes")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="(Re)build the index of a trace in one pass")
+    b.add_argument("path")
+    q = sub.add_parser("query", help="Print events from a time, optionally for one pid or channel")
+    q.add_argument("path")
+    q.add_argument("--at", type=float, default=0.0, help="Seconds from the start of the trace")
+    q.add_argument("--pid", type=int, default=None)
+    q.add_argument("--channel", default=None)
+    q.add_argument("--limit", type=int, default=20)
+    bb = sub.add_parser("bench", help="Open/seek/filter timings on a synthetic trace")
+    bb.add_argument("--events", type=int, default=2_000_000)
+    bb.add_argument("--dir", default=None, help="Directory for the temporary trace")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        builder = build_index(args.path)
+        print(f"[Index] {builder.count} events in {len(builder.chunks)} chunks, {len(builder.pids)} pids, "
+              f"{len(builder.channels)} channels in {time.perf_counter() - t0:.2f}s -> {index_path(args.path)}")
+    elif args.cmd == "query":
+        from ipc_events import format_event
+        with open_trace(args.path) as reader:
+            target = reader
+            if args.pid is not None or args.channel is not None:
+                target = filter_trace(reader, pid=args.pid, channel=args.channel)
+            start = target.index_at(reader.time_range()[0] + int(args.at * 1e9))
+            for event in target.events(start, start + args.limit):
+                print(f"{event.ts_ns} {event.pid} {format_event(event)}")
+    else:
+        r = bench(args.events, args.dir)
+        print(f"[Index] {r['events']} events ({r['trace_mb']:.0f} MB trace, {r['index_kb']:.0f} KB index): "
+              f"recorded in {r['record_s']:.1f}s, rebuilt in {r['rebuild_s']:.2f}s")
+        print(f"[Index] open {r['open_indexed_ms']:.1f} ms indexed vs {r['open_walk_ms']:.1f} ms header walk; "
+              f"seek {r['seek_ms']:.2f} ms; first 100 of one pid {r['filter_pid_ms']:.1f} ms, "
+              f"of one channel {r['filter_channel_ms']:.1f} ms; correct={r['filter_ok']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# trace_player.py
+# Replays a recorded trace (trace_file.py) into any view with post/clear/status,
+# i.e. the ArrowFlowView every IPC GUI already draws through, so a replay
+# looks exactly like the live run. Playback is driven from the Tk main loop
+# once per frame: trace time advances by the elapsed wall time x speed and
+# every event up to it is posted; step() posts exactly one event. Traces are
+# opened through their trace_index sidecar, so jumping to a time or filtering
+# to one process/channel stays fast on very large files.
+import math
+import os
+import time
+import tkinter as tk
+from tkinter import filedialog
+
+from frame_renderer import FRAME_MS, MAX_ITEMS_PER_FRAME
+from trace_file import SUFFIX, TRACE_DIR, TraceError
+from trace_index import filter_trace, open_trace
+
+MIN_SPEED, MAX_SPEED = 0.1, 100.0
+
+
+class TracePlayer:
+    """Position, speed and clock of one replay; no Tk here.
+
+    reader is a TraceReader or a trace_index.TraceView of one pid/channel.
+    """
+
+    def __init__(self, reader, post):
+        self.reader = reader
+        self.post = post
+        self.speed = 1.0
+        self.playing = False
+        self.pos = 0
+        self.cursor_ns = 0
+        self._it = None
+        self._next = None
+
+    def _peek(self):
+        if self._next is None and self.pos < len(self.reader):
+            if self._it is None:
+                self._it = self.reader.events(self.pos)
+            self._next = next(self._it)
+        return self._next
+
+    def _take(self):
+        event = self._peek()
+        self._next = None
+        self.pos += 1
+        self.post(event)
+        return event
+
+    @property
+    def finished(self):
+        return self.pos >= len(self.reader)
+
+    def set_speed(self, speed):
+        self.speed = min(MAX_SPEED, max(MIN_SPEED, speed))
+
+    def seek(self, index):
+        self.pos = min(max(0, index), len(self.reader))
+        self._it = self._next = None
+        nxt = self._peek()
+        self.cursor_ns = nxt.ts_ns if nxt is not None else 0
+
+    def play(self):
+        if self.finished:
+            self.seek(0)
+        nxt = self._peek()
+        if nxt is not None and not self.cursor_ns:
+            self.cursor_ns = nxt.ts_ns
+        self.playing = True
+
+    def pause(self):
+        self.playing = False
+
+    def step(self):
+        """Post the next event regardless of time; returns it (None at the end)."""
+        self.playing = False
+        if self.finished:
+            return None
+        event = self._take()
+        self.cursor_ns = event.ts_ns
+        return event
+
+    def advance(self, elapsed_s):
+        """Post every event due after elapsed_s of wall time; returns how many."""
+        if not self.playing:
+            return 0
+        self.cursor_ns += int(elapsed_s * self.speed * 1e9)
+        posted = 0
+        while True:
+            nxt = self._peek()
+            if nxt is None:
+                self.playing = False
+                break
+            if nxt.ts_ns > self.cursor_ns:
+                break
+            if posted == MAX_ITEMS_PER_FRAME:
+                self.cursor_ns = nxt.ts_ns  # frame budget used up: the clock waits for the backlog
+                break
+            self._take()
+            posted += 1
+        return posted
+
+
+class TracePlayerControls:
+    """Open / Play / Pause / Step / speed / position controls for replaying into `view`."""
+
+    def __init__(self, parent, view, bg=None):
+        self.view = view
+        self.player = None
+        self.trace = None  # the open TraceReader; the player may replay a filtered view of it
+        self._after_id = None
+        self._last = None
+        self.frame = tk.Frame(parent, bg=bg)
+        tk.Button(self.frame, text="Open trace...", command=self.open).pack(side="left", padx=4)
+        self.play_btn = tk.Button(self.frame, text="Play", width=6, command=self.toggle, state="disabled")
+        self.play_btn.pack(side="left", padx=2)
+        self.step_btn = tk.Button(self.frame, text="Step", width=6, command=self.step, state="disabled")
+        self.step_btn.pack(side="left", padx=2)
+        tk.Label(self.frame, text="Speed", bg=bg).pack(side="left", padx=(10, 2))
+        # log10 of the speed, so 0.1x..100x is evenly spread over the slider
+        self.speed = tk.Scale(self.frame, from_=math.log10(MIN_SPEED), to=math.log10(MAX_SPEED),
+                              resolution=0.05, orient="horizontal", showvalue=False, length=120,
+                              command=self._speed_changed, bg=bg)
+        self.speed.set(0)
+        self.speed.pack(side="left")
+        self.speed_label = tk.Label(self.frame, text="1.0x", width=6, bg=bg)
+        self.speed_label.pack(side="left")
+        self.position = tk.Scale(self.frame, from_=0, to=0, orient="horizontal", showvalue=False,
+                                 length=200, bg=bg)
+        self.position.bind("<ButtonRelease-1>", lambda e: self.seek(int(self.position.get())))
+        self.position.pack(side="left", padx=5)
+        tk.Label(self.frame, text="Go to (s)", bg=bg).pack(side="left")
+        self.goto = tk.Entry(self.frame, width=6)
+        self.goto.bind("<Return>", lambda e: self.seek_time(self.goto.get()))
+        self.goto.pack(side="left", padx=2)
+        tk.Label(self.frame, text="Filter pid/channel", bg=bg).pack(side="left")
+        self.filter = tk.Entry(self.frame, width=8)
+        self.filter.bind("<Return>", lambda e: self.set_filter(self.filter.get()))
+        self.filter.pack(side="left", padx=2)
+        self.info = tk.Label(self.frame, text="No trace", bg=bg)
+        self.info.pack(side="left", padx=5)
+
+    def pack(self, **kw):
+        self.frame.pack(**kw)
+
+    def grid(self, **kw):
+        self.frame.grid(**kw)
+
+    def open(self, path=None):
+        path = path or filedialog.askopenfilename(
+            initialdir=TRACE_DIR if os.path.isdir(TRACE_DIR) else None,
+            filetypes=[("IPC traces", "*" + SUFFIX), ("All files", "*")])
+        if not path:
+            return
+        try:
+            reader = open_trace(path)
+        except (OSError, TraceError) as e:
+            self.view.status(f"Cannot open trace: {e}", "red")
+            return
+        self.close()
+        self.trace = reader
+        self.view.status(f"Trace {os.path.basename(path)}: {len(reader)} events", "purple")
+        self._load(reader)
+
+    def _load(self, source):
+        """Replay `source` (the trace or a filtered view of it) from its start."""
+        self.pause()
+        self.player = TracePlayer(source, self.view.post)
+        self.player.set_speed(10 ** float(self.speed.get()))
+        self.position.configure(to=max(0, len(source) - 1))
+        self.play_btn.configure(state="normal")
+        self.step_btn.configure(state="normal")
+        self.view.clear()
+        self.player.seek(0)
+        self._show()
+
+    def close(self):
+        self.pause()
+        self.player = None
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def set_filter(self, text):
+        """Replay only one pid (a number) or one channel (a name); empty shows everything."""
+        if self.trace is None:
+            return
+        text = text.strip()
+        if not text:
+            self._load(self.trace)
+            return
+        try:
+            source = filter_trace(self.trace, pid=int(text)) if text.isdigit() else \
+                filter_trace(self.trace, channel=text)
+        except ValueError as e:  # opened without its index (read-only dir, index build failed)
+            self.view.status(f"Cannot filter: {e}", "red")
+            return
+        self.view.status(f"Filter {text}: {len(source)} events", "purple")
+        self._load(source)
+
+    def seek_time(self, text):
+        """Jump to the first event at or after `text` seconds from the start of the trace."""
+        if self.player is None:
+            return
+        try:
+            seconds = float(text)
+        except ValueError:
+            return
+        source = self.player.reader
+        self.seek(source.index_at(self.trace.time_range()[0] + int(seconds * 1e9)))
+
+    def toggle(self):
+        if self.player is None:
+            return
+        if self.player.playing:
+            self.pause()
+        else:
+            self.player.play()
+            self.play_btn.configure(text="Pause")
+            self._last = None
+            self._tick()
+
+    def pause(self):
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+            self._after_id = None
+        if self.player is not None:
+            self.player.pause()
+        self.play_btn.configure(text="Play")
+
+    def step(self):
+        if self.player is None:
+            return
+        self.pause()
+        if self.player.step() is None:
+            self.view.status("End of trace", "purple")
+        self._show()
+
+    def seek(self, index):
+        if self.player is None:
+            return
+        self.view.clear()
+        self.player.seek(index)
+        self._last = None
+        self._show()
+
+    def _speed_changed(self, value):
+        speed = 10 ** float(value)
+        self.speed_label.configure(text=f"{speed:.3g}x")
+        if self.player is not None:
+            self.player.set_speed(speed)
+
+    def _tick(self):
+        now = time.monotonic()
+        elapsed = FRAME_MS / 1000 if self._last is None else now - self._last
+        self._last = now
+        self.player.advance(elapsed)
+        self._show()
+        if self.player.playing:
+            self._after_id = self.frame.after(FRAME_MS, self._tick)
+        else:
+            self._after_id = None
+            self.play_btn.configure(text="Play")
+            if self.player.finished:
+                self.view.status("Replay finished", "green")
+
+    def _show(self):
+        p = self.player
+        first, last = self.trace.time_range()
+        t = min(max(p.cursor_ns, first), last) - first
+        self.position.set(p.pos)
+        self.info.configure(text=f"event {p.pos}/{len(p.reader)}  t=+{t / 1e9:.3f}s")
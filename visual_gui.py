@@ -1,54 +1,9 @@
 import tkinter as tk
-from tkinter import scrolledtext
-import subprocess
-import sys
-import threading
-import time
-
-
-def animate_arrow(canvas, arrow_id, color):
-    canvas.itemconfig(arrow_id, fill=color, width=3)
-    canvas.update()
-    time.sleep(0.3)
-    canvas.itemconfig(arrow_id, fill="black", width=2)
-    canvas.update()
-    time.sleep(0.3)
-
-
-def run_ipc_process(command, output_box, status_label, canvas, arrow_id):
-
-    def task():
-        status_label.config(text="Running...", fg="blue")
-        output_box.delete("1.0", tk.END)
-
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        for line in process.stdout:
-            output_box.insert(tk.END, line)
-            output_box.see(tk.END)
-
-            # Color logic for arrow animation
-            lower_line = line.lower()
-
-            if "bottleneck" in lower_line:
-                animate_arrow(canvas, arrow_id, "yellow")
-
-            elif "race" in lower_line or "overwritten" in lower_line:
-                animate_arrow(canvas, arrow_id, "red")
-
-            else:
-                animate_arrow(canvas, arrow_id, "green")
-
-        process.wait()
-        status_label.config(text="Finished", fg="green")
-
-    threading.Thread(target=task).start()
 
+from async_ingest import RunDashboard
+from frame_renderer import ArrowFlowView
+from log_view import LogView
+from trace_player import TracePlayerControls
 
 
 def main_gui():
@@ -84,7 +39,7 @@ def main_gui():
     # Arrow between A → IPC → B
     arrow_id = canvas.create_line(200, 100, 350, 100, arrow=tk.LAST, width=2)
 
-    output_box = scrolledtext.ScrolledText(root, height=15, width=100)
+    output_box = LogView(root, height=15, width=100)
     output_box.pack(pady=10)
 
     # Status label
@@ -94,6 +49,12 @@ def main_gui():
     )
     status_label.pack(pady=5)
 
+    view = ArrowFlowView(root, output_box, status_label, canvas, (arrow_id,))
+
+    # step1_demo.py subprocesses, all read (stdout and stderr) and recorded on
+    # one ingest thread; each run gets a card on the dashboard
+    dashboard = RunDashboard(root, view, bg="white", use_worker=False)
+
  
     frame = tk.Frame(root, bg="white")
     frame.pack(pady=10)
@@ -108,10 +69,7 @@ def main_gui():
         height=2,
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Pipe"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--pipe"],
-                output_box, status_label, canvas, arrow_id
-            )
+            dashboard.run(["--pipe"])
         ]
     ).grid(row=0, column=0, padx=10)
 
@@ -125,10 +83,7 @@ def main_gui():
         height=2,
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Queue"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--queue"],
-                output_box, status_label, canvas, arrow_id
-            )
+            dashboard.run(["--queue"])
         ]
     ).grid(row=0, column=1, padx=10)
 
@@ -142,10 +97,7 @@ def main_gui():
         height=2,
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Shared Memory (Lock)"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--shm"],
-                output_box, status_label, canvas, arrow_id
-            )
+            dashboard.run(["--shm"])
         ]
     ).grid(row=1, column=0, padx=10, pady=10)
 
@@ -159,13 +111,13 @@ def main_gui():
         height=2,
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Shared Memory (NO Lock)"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--shm-nolock"],
-                output_box, status_label, canvas, arrow_id
-            )
+            dashboard.run(["--shm-nolock"])
         ]
     ).grid(row=1, column=1, padx=10, pady=10)
 
+    dashboard.pack(fill="x", padx=10)
+    TracePlayerControls(root, view, bg="white").pack(pady=5)
+
     root.mainloop()
 
 
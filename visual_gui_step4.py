@@ -1,64 +1,9 @@
 import tkinter as tk
-from tkinter import scrolledtext
-import subprocess
-import threading
-import sys
-import time
-
-
-
-def animate_arrows(canvas, arrow1, arrow2, color):
-    # A → IPC
-    canvas.itemconfig(arrow1, fill=color, width=3)
-    canvas.update()
-    time.sleep(0.20)
-
-    # IPC → B
-    canvas.itemconfig(arrow2, fill=color, width=3)
-    canvas.update()
-    time.sleep(0.20)
-
-    # Reset arrows
-    canvas.itemconfig(arrow1, fill="black", width=2)
-    canvas.itemconfig(arrow2, fill="black", width=2)
-    canvas.update()
-
-
-
-def run_ipc_process(command, output_box, status_label, canvas, arrow1, arrow2, ipc_label_widget):
-
-    def task():
-        status_label.config(text="Running...", fg="blue")
-        output_box.delete("1.0", tk.END)
-
-        # Run command
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        for line in process.stdout:
-            output_box.insert(tk.END, line)
-            output_box.see(tk.END)
-
-            l = line.lower()
-
-            if "bottleneck" in l:
-                animate_arrows(canvas, arrow1, arrow2, "yellow")
-
-            elif "race" in l or "overwrite" in l or "no lock" in l:
-                animate_arrows(canvas, arrow1, arrow2, "red")
-
-            else:
-                animate_arrows(canvas, arrow1, arrow2, "green")
-
-        process.wait()
-        status_label.config(text="Finished", fg="green")
-
-    threading.Thread(target=task).start()
 
+from async_ingest import RunDashboard
+from frame_renderer import ArrowFlowView
+from log_view import LogView
+from trace_player import TracePlayerControls
 
 
 def main_gui():
@@ -96,13 +41,19 @@ def main_gui():
     arrow2 = canvas.create_line(560, 120, 700, 120, arrow=tk.LAST, width=2)  # IPC → B
 
  
-    output_box = scrolledtext.ScrolledText(root, height=18, width=115)
+    output_box = LogView(root, height=18, width=115)
     output_box.pack(pady=10)
 
     # Status bar
     status_label = tk.Label(root, text="Idle", fg="black", bg="white", font=("Arial", 13))
     status_label.pack(pady=5)
 
+    view = ArrowFlowView(root, output_box, status_label, canvas, (arrow1, arrow2))
+
+    # step1_demo.py subprocesses, all read (stdout and stderr) and recorded on
+    # one ingest thread; each run gets a card on the dashboard
+    dashboard = RunDashboard(root, view, bg="white", use_worker=False)
+
     # -------------------------------------
     # BUTTONS (ALL 4 IN ONE ROW)
     # -------------------------------------
@@ -115,10 +66,7 @@ def main_gui():
         bg="#4CAF50", fg="white",
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Pipe"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--pipe"],
-                output_box, status_label, canvas, arrow1, arrow2, ipc_label
-            )
+            dashboard.run(["--pipe"])
         ]
     ).grid(row=0, column=0, padx=18, pady=10)
 
@@ -128,10 +76,7 @@ def main_gui():
         bg="#2196F3", fg="white",
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Queue"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--queue"],
-                output_box, status_label, canvas, arrow1, arrow2, ipc_label
-            )
+            dashboard.run(["--queue"])
         ]
     ).grid(row=0, column=1, padx=18, pady=10)
 
@@ -141,10 +86,7 @@ def main_gui():
         bg="#FF9800", fg="white",
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Shared Memory (Lock)"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--shm"],
-                output_box, status_label, canvas, arrow1, arrow2, ipc_label
-            )
+            dashboard.run(["--shm"])
         ]
     ).grid(row=0, column=2, padx=18, pady=10)
 
@@ -154,13 +96,13 @@ def main_gui():
         bg="#F44336", fg="white",
         command=lambda: [
             canvas.itemconfig(ipc_label, text="Shared Memory (No Lock)"),
-            run_ipc_process(
-                [sys.executable, "step1_demo.py", "--shm-nolock"],
-                output_box, status_label, canvas, arrow1, arrow2, ipc_label
-            )
+            dashboard.run(["--shm-nolock"])
         ]
     ).grid(row=0, column=3, padx=18, pady=10)
 
+    dashboard.pack(fill="x", padx=10)
+    TracePlayerControls(root, view, bg="white").pack(pady=5)
+
     root.mainloop()
 
 
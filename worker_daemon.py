@@ -0,0 +1,326 @@
+# worker_daemon.py
+# Long-lived warm worker: keeps the scenario modules imported and runs
+# step1_demo scenarios on request, so a GUI click no longer pays interpreter
+# startup + imports before the demo even begins.
+#
+# Protocol (multiprocessing.connection over a Unix socket, or a named pipe on
+# Windows), one run per connection. Messages are pickles, so only the user who
+# runs the daemon may talk to it: the socket lives in a directory that must be
+# theirs alone (mode 0700), and both ends prove they hold the per-user secret
+# in that directory (authkey, mode 0600) before anything is unpickled.
+#   client -> ("run", argv)          start `step1_demo.main(argv)` in a forked child
+#   server -> ("data", bytes)        raw event frames from the child's stdout
+#   server -> ("exit", returncode)   child finished (or was cancelled)
+#   client -> ("cancel",)            kill the run's whole process group
+#   client -> ("shutdown",)          stop the daemon
+#
+#   python worker_daemon.py serve &
+#   python worker_daemon.py latency --shm-race --increments 1000
+import argparse
+import multiprocessing
+import os
+import secrets
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import ipc_events as ev
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEMO = os.path.join(HERE, "step1_demo.py")
+CHUNK = 64 * 1024
+BACKLOG = 64  # pending connections: a dashboard may start many runs at once
+KEY_BYTES = 32
+_PRELOAD = ("step1_demo", "pipe_simulation", "message_queue_sim", "shared_memory_sim",
+            "shm_ring", "ipc_bench", "latency_hist")
+
+
+def run_dir():
+    """This user's private directory for the socket and the secret.
+
+    $XDG_RUNTIME_DIR/ipc_debugger when set, else <tmp>/ipc_debugger-<uid>.
+    Raises PermissionError unless it is a real directory (not a symlink)
+    owned by this user and closed to everyone else, e.g. one another user
+    created first to plant their own socket.
+    """
+    if sys.platform == "win32":
+        path = os.path.join(tempfile.gettempdir(), "ipc_debugger")
+        os.makedirs(path, exist_ok=True)
+        return path
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base and os.path.isdir(base):
+        path = os.path.join(base, "ipc_debugger")
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"ipc_debugger-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a private directory of uid {os.getuid()}; "
+                              f"refusing to use it for the worker socket")
+    return path
+
+
+def authkey():
+    """The per-user secret both ends of a worker connection must hold (created on first use)."""
+    directory = run_dir()
+    path = os.path.join(directory, "authkey")
+    nofollow = getattr(os, "O_NOFOLLOW", 0)
+    if not os.path.exists(path):
+        # Written under a unique name and linked into place, so no one ever
+        # reads a half-written key and a concurrent creator can't replace it.
+        tmp = os.path.join(directory, f"authkey.{os.getpid()}.{secrets.token_hex(4)}")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | nofollow, 0o600)
+        try:
+            os.write(fd, secrets.token_bytes(KEY_BYTES))
+        finally:
+            os.close(fd)
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    fd = os.open(path, os.O_RDONLY | nofollow)
+    try:
+        st = os.fstat(fd)
+        if sys.platform != "win32" and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+            raise PermissionError(f"{path} must be owned by uid {os.getuid()} with mode 0600")
+        key = os.read(fd, KEY_BYTES)
+    finally:
+        os.close(fd)
+    if len(key) != KEY_BYTES:
+        raise PermissionError(f"{path} does not hold a {KEY_BYTES}-byte key")
+    return key
+
+
+def default_address():
+    if sys.platform == "win32":
+        return r"\\.\pipe\ipc_debugger_worker"
+    return os.path.join(run_dir(), "worker.sock")
+
+
+def connect(address=None):
+    """An authenticated connection to the worker (OSError or AuthenticationError if there is none)."""
+    return Client(address or default_address(), authkey=authkey())
+
+
+# ---------------------------------------------------------------------------
+# server side
+# ---------------------------------------------------------------------------
+def _run_child(write_fd, argv):
+    """Body of the forked run: own process group, stdout -> pipe to the daemon."""
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()  # so cancel can kill the demo and everything it spawned
+    os.dup2(write_fd, 1)
+    os.close(write_fd)
+    os.environ[ev.ENV_MODE] = "binary"
+    ev._sink = None  # re-resolve the sink for the new stdout
+    import step1_demo
+    step1_demo.main(argv)
+    sys.stdout.flush()
+
+
+def _kill_run(proc):
+    if proc.pid is None or proc.exitcode is not None:
+        return
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+    except ProcessLookupError:
+        pass
+
+
+def _serve_connection(conn, ctx, stop, address):
+    try:
+        msg = conn.recv()
+    except EOFError:
+        return
+    if msg[0] == "shutdown":
+        stop.set()
+        connect(address).close()  # wake the accept() loop so it sees `stop`
+        return
+    if msg[0] != "run":
+        return
+
+    read_fd, write_fd = os.pipe()
+    proc = ctx.Process(target=_run_child, args=(write_fd, list(msg[1])))
+    proc.start()
+    os.close(write_fd)
+    send_lock = threading.Lock()
+
+    def pump():
+        with os.fdopen(read_fd, "rb", buffering=0) as out:
+            while True:
+                chunk = out.read(CHUNK)
+                if not chunk:
+                    break
+                with send_lock:
+                    conn.send(("data", chunk))
+        proc.join()
+        with send_lock:
+            conn.send(("exit", proc.exitcode))
+
+    pumper = threading.Thread(target=pump, daemon=True)
+    pumper.start()
+    try:
+        while pumper.is_alive():
+            if conn.poll(0.1) and conn.recv()[0] == "cancel":
+                _kill_run(proc)
+    except (EOFError, OSError):
+        _kill_run(proc)  # client went away: don't leave the run behind
+    pumper.join()
+    conn.close()
+
+
+def serve(address=None):
+    """Preload the scenario modules and serve runs until a shutdown request."""
+    for name in _PRELOAD:
+        __import__(name)
+    address = address or default_address()
+    if sys.platform != "win32" and os.path.exists(address):
+        os.unlink(address)
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    stop = threading.Event()
+    listener = Listener(address, backlog=BACKLOG, authkey=authkey())
+    print(f"[Worker] listening on {address} (pid {os.getpid()})", flush=True)
+    try:
+        while not stop.is_set():
+            try:
+                conn = listener.accept()  # includes the authkey challenge both ways
+            except (OSError, EOFError, AuthenticationError):
+                continue  # a client without the key (or one that hung up) is not served
+            threading.Thread(target=_serve_connection, args=(conn, ctx, stop, address),
+                             daemon=True).start()
+    finally:
+        listener.close()
+        print("[Worker] stopped.", flush=True)
+
+
+# ---------------------------------------------------------------------------
+# client side
+# ---------------------------------------------------------------------------
+class WorkerRun:
+    """One scenario run on the warm worker; iterate events(), cancel() from any thread."""
+
+    def __init__(self, argv, address=None):
+        self.conn = connect(address)
+        self.returncode = None
+        self._send_lock = threading.Lock()
+        self.conn.send(("run", list(argv)))
+
+    def events(self):
+        decoder = ev.EventDecoder()
+        try:
+            while True:
+                msg = self.conn.recv()
+                if msg[0] == "data":
+                    yield from decoder.feed(msg[1])
+                elif msg[0] == "exit":
+                    self.returncode = msg[1]
+                    return
+        except EOFError:
+            return
+        finally:
+            self.conn.close()
+
+    def cancel(self):
+        with self._send_lock:
+            try:
+                self.conn.send(("cancel",))
+            except OSError:
+                pass
+
+
+def available(address=None):
+    """True if a worker daemon is accepting connections."""
+    try:
+        address = address or default_address()
+        if sys.platform != "win32" and not os.path.exists(address):
+            return False
+        connect(address).close()
+    except (OSError, EOFError, AuthenticationError):
+        return False
+    return True
+
+
+def shutdown(address=None):
+    conn = connect(address)
+    conn.send(("shutdown",))
+    conn.close()
+
+
+def stream_events(argv, use_worker=True):
+    """Yield the events of `step1_demo.py <argv>`.
+
+    Uses the warm worker when one is running, otherwise a fresh interpreter.
+    """
+    if use_worker and available():
+        yield from WorkerRun(argv).events()
+        return
+    process = subprocess.Popen([sys.executable, DEMO] + list(argv), cwd=HERE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        yield from ev.read_events(process.stdout)
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def first_event_latency(argv, use_worker):
+    """Seconds from request to the first decoded event (the "click to first event" cost)."""
+    t0 = time.perf_counter()
+    first = None
+    for _ in stream_events(argv, use_worker=use_worker):
+        if first is None:
+            first = time.perf_counter() - t0
+    return first
+
+
+def compare_latency(argv, repeat=3):
+    """Click-to-first-event for the subprocess path vs the warm worker."""
+    cold = [first_event_latency(argv, use_worker=False) for _ in range(repeat)]
+    warm = [first_event_latency(argv, use_worker=True) for _ in range(repeat)] if available() else []
+    return {"subprocess_s": min(cold), "worker_s": min(warm) if warm else None,
+            "saved_s": min(cold) - min(warm) if warm else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm scenario worker for the IPC Debugger GUIs")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("serve", help="Run the worker in the foreground")
+    sub.add_parser("stop", help="Ask a running worker to shut down")
+    lat = sub.add_parser("latency", help="Compare click-to-first-event: subprocess vs worker")
+    lat.add_argument("--repeat", type=int, default=3)
+    # Any further arguments are passed to step1_demo.py (default: --shm-race --increments 1000)
+    args, demo_args = parser.parse_known_args(argv)
+    if demo_args and args.cmd != "latency":
+        parser.error(f"unrecognized arguments: {' '.join(demo_args)}")
+
+    if args.cmd == "serve":
+        serve()
+    elif args.cmd == "stop":
+        shutdown()
+    else:
+        demo_args = demo_args or ["--shm-race", "--increments", "1000"]
+        result = compare_latency(["--events"] + demo_args, repeat=args.repeat)
+        print(f"[Worker] subprocess path: {result['subprocess_s'] * 1e3:.1f} ms to first event")
+        if result["worker_s"] is None:
+            print("[Worker] no worker running (start one with: python worker_daemon.py serve)")
+        else:
+            print(f"[Worker] warm worker:     {result['worker_s'] * 1e3:.1f} ms to first event "
+                  f"(saves {result['saved_s'] * 1e3:.1f} ms per click)")
+
+
+if __name__ == "__main__":
+    main()